@@ -30,7 +30,6 @@ df_escolas: Escola, Numero_Regiao, F, M, F_1, M_1, F_2, M_2, JAN, JUL
 from typing import Dict, List, Tuple
 import pandas as pd
 import numpy as np
-from collections import defaultdict
 
 # Constantes de score
 SCORE_PRIMEIRA_ESCOLA = -1000.0
@@ -38,6 +37,9 @@ SCORE_MESMA_REGIAO = -500.0
 SCORE_OUTRA_REGIAO = 3.0
 SCORE_NAO_ALOCADO = 999999.0
 
+# Semente padrão do gerador aleatório (dispersão por nome)
+SEMENTE_PADRAO = 42
+
 
 def alocar_estudantes(df_alunos: pd.DataFrame, df_escolas: pd.DataFrame, config: Dict) -> pd.DataFrame:
     """
@@ -51,6 +53,10 @@ def alocar_estudantes(df_alunos: pd.DataFrame, df_escolas: pd.DataFrame, config:
             - 'ordem_grupos': lista de grupos por prioridade
             - 'agrupar_por_nome': bool, se True agrupa alunos com mesmo nome (padrão: False)
             - 'dispersar_por_cidade': bool, se True dispersa alunos da mesma cidade (padrão: False)
+            - 'semente_aleatoria': int, semente do gerador usado na dispersão por nome (padrão: 42)
+    
+    Cada execução usa seu próprio numpy.random.Generator, então execuções simultâneas
+    (várias sessões, cenários em threads) não interferem entre si e continuam reprodutíveis.
     
     Returns:
         DataFrame com alocações e scores
@@ -67,11 +73,13 @@ def alocar_estudantes(df_alunos: pd.DataFrame, df_escolas: pd.DataFrame, config:
     )
     
     # Passo 2: Alocar alunos em escolas
+    rng = np.random.default_rng(config.get('semente_aleatoria', SEMENTE_PADRAO))
     return _alocar_em_escolas(
         df_com_intake, 
         df_escolas.copy(),
         agrupar_por_nome=config.get('agrupar_por_nome', False),
-        dispersar_por_cidade=config.get('dispersar_por_cidade', False)
+        dispersar_por_cidade=config.get('dispersar_por_cidade', False),
+        rng=rng
     )
 
 
@@ -157,7 +165,8 @@ def _alocar_em_escolas(
     df_alunos: pd.DataFrame, 
     df_escolas: pd.DataFrame,
     agrupar_por_nome: bool = False,
-    dispersar_por_cidade: bool = False
+    dispersar_por_cidade: bool = False,
+    rng: np.random.Generator = None
 ) -> pd.DataFrame:
     """
     Aloca alunos em escolas mantendo coesão de grupo quando possível.
@@ -171,30 +180,80 @@ def _alocar_em_escolas(
        - Primeira alocação define "região principal" do grupo
        - Demais alunos tentam ir para região principal primeiro
        - Se não houver vaga, busca outras regiões
+    3. Definida a região principal, os demais alunos do grupo são alocados em lote
+       por sexo (vetores de vagas), exceto com dispersão por cidade, que exige
+       decisão aluno a aluno
+    
+    O gerador rng é compartilhado por todos os grupos da execução (ordem aleatória
+    da dispersão por nome). Se omitido, usa um gerador novo com SEMENTE_PADRAO.
     """
+    if rng is None:
+        rng = np.random.default_rng(SEMENTE_PADRAO)
+    
     # Preparar resultado
     df_result = df_alunos.copy()
-    df_result['Escola_Alocada'] = ''
-    df_result['Regiao_Escola'] = 0
-    df_result['Score_Match'] = 0.0
-    df_result['Match_Tier'] = ''
+    n_alunos = len(df_result)
+    escola_alocada = np.full(n_alunos, '', dtype=object)
+    regiao_escola = np.zeros(n_alunos, dtype=np.int64)
+    score_match = np.zeros(n_alunos, dtype=np.float64)
+    match_tier = np.full(n_alunos, '', dtype=object)
     
     # Verificar se coluna Cidade existe
     tem_cidade = 'Cidade' in df_result.columns
+    usar_dispersao_cidade = dispersar_por_cidade and tem_cidade
     
     # Regiões em ordem crescente
     regioes = sorted(df_escolas['Numero_Regiao'].dropna().astype(int).unique())
     
+    # Escolas e cidades codificadas como inteiros (posição na planilha / ordem de aparição)
+    nomes_escolas, escolas_por_regiao = _indexar_escolas(df_escolas)
+    codigos_cidade, n_cidades = _codificar_cidades(df_result) if usar_dispersao_cidade else (None, 0)
+    
+    # Sexo (F/M) e posição de cada aluno no resultado
+    sexos = df_result['Sexo_Padrao'].astype(str).str.upper().str[0].to_numpy()
+    posicoes = pd.Series(np.arange(n_alunos), index=df_result.index)
+    
     # Rastrear região principal de cada grupo
     regiao_principal: Dict[str, int] = {}
     
+    # Sequência de escolas (região principal primeiro) por região principal, para o lote
+    sequencias: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+    
+    def registrar(pos: int, grupo: str, codigo_escola: int, regiao: int):
+        """Grava a alocação de um aluno e calcula score/tier."""
+        if codigo_escola < 0:
+            # Não conseguiu alocar
+            match_tier[pos] = 'nao_alocado'
+            score_match[pos] = SCORE_NAO_ALOCADO
+            return
+        
+        escola_alocada[pos] = nomes_escolas[codigo_escola]
+        regiao_escola[pos] = regiao
+        
+        if grupo not in regiao_principal:
+            # Primeira escola do grupo - define região principal
+            regiao_principal[grupo] = regiao
+            match_tier[pos] = 'primeira_escola'
+            score_match[pos] = SCORE_PRIMEIRA_ESCOLA
+        elif regiao == regiao_principal[grupo]:
+            # Mesma região principal - coesão mantida
+            match_tier[pos] = 'mesma_regiao'
+            score_match[pos] = SCORE_MESMA_REGIAO
+        else:
+            # Região diferente - quebra de coesão
+            match_tier[pos] = 'outra_regiao'
+            score_match[pos] = SCORE_OUTRA_REGIAO
+    
     # Processar cada intake
     for intake in [1, 2]:
         # Preparar capacidades disponíveis para este intake
-        capacidades = _preparar_capacidades(df_escolas, intake)
+        capacidades = _preparar_capacidades(df_escolas, intake, nomes_escolas)
         
-        # Rastrear alocações por cidade e escola (para dispersão)
-        cidade_escola_count = defaultdict(lambda: defaultdict(int))
+        # Matriz cidade x escola com alocações já feitas (para dispersão)
+        cidade_escola_count = (
+            np.zeros((n_cidades, len(nomes_escolas)), dtype=np.int32)
+            if usar_dispersao_cidade else None
+        )
         
         # Filtrar alunos deste intake e ordenar
         df_intake = df_result[df_result['Intake'] == intake].copy()
@@ -206,13 +265,17 @@ def _alocar_em_escolas(
             alunos_grupo = _ordenar_alunos_grupo(
                 alunos_grupo, 
                 dispersar_por_nome=agrupar_por_nome,
-                dispersar_por_cidade=dispersar_por_cidade and tem_cidade
+                dispersar_por_cidade=usar_dispersao_cidade,
+                rng=rng
             )
+            pos_grupo = posicoes[alunos_grupo.index].to_numpy()
             
-            # Para cada aluno do grupo
-            for idx, aluno in alunos_grupo.iterrows():
-                sexo = str(aluno['Sexo_Padrao']).upper()[0]
-                cidade = str(aluno.get('Cidade', '')) if tem_cidade else ''
+            # Aluno a aluno enquanto a região principal não estiver definida
+            # (ou sempre, se a dispersão por cidade estiver ativa)
+            i = 0
+            while i < len(pos_grupo) and (usar_dispersao_cidade or grupo not in regiao_principal):
+                pos = pos_grupo[i]
+                cidade = codigos_cidade.iloc[pos] if usar_dispersao_cidade else -1
                 
                 # Definir ordem de regiões a tentar
                 if grupo in regiao_principal:
@@ -221,58 +284,165 @@ def _alocar_em_escolas(
                     ordem_regioes = [reg_principal] + [r for r in regioes if r != reg_principal]
                 else:
                     # Primeira alocação do grupo: tenta regiões em ordem crescente
-                    ordem_regioes = regioes[:]
+                    ordem_regioes = regioes
                 
                 # Tentar alocar em alguma região
-                alocado = False
+                codigo_escola, regiao_alocada = -1, 0
                 for regiao in ordem_regioes:
-                    escola_alocada = _tentar_alocar_em_regiao(
-                        regiao, sexo, capacidades, df_escolas,
-                        cidade=cidade if dispersar_por_cidade and tem_cidade else None,
-                        cidade_escola_count=cidade_escola_count if dispersar_por_cidade and tem_cidade else None
+                    codigo_escola = _tentar_alocar_em_regiao(
+                        regiao, sexos[pos], capacidades, escolas_por_regiao,
+                        cidade=cidade,
+                        cidade_escola_count=cidade_escola_count
                     )
-                    
-                    if escola_alocada:
-                        # Sucesso! Registrar alocação
-                        df_result.loc[idx, 'Escola_Alocada'] = escola_alocada
-                        df_result.loc[idx, 'Regiao_Escola'] = regiao
-                        
-                        # Atualizar contador de cidade-escola
-                        if dispersar_por_cidade and tem_cidade and cidade:
-                            cidade_escola_count[cidade][escola_alocada] += 1
-                        
-                        # Calcular score e tier
-                        if grupo not in regiao_principal:
-                            # Primeira escola do grupo - define região principal
-                            regiao_principal[grupo] = regiao
-                            df_result.loc[idx, 'Match_Tier'] = 'primeira_escola'
-                            df_result.loc[idx, 'Score_Match'] = SCORE_PRIMEIRA_ESCOLA
-                        elif regiao == regiao_principal[grupo]:
-                            # Mesma região principal - coesão mantida
-                            df_result.loc[idx, 'Match_Tier'] = 'mesma_regiao'
-                            df_result.loc[idx, 'Score_Match'] = SCORE_MESMA_REGIAO
-                        else:
-                            # Região diferente - quebra de coesão
-                            df_result.loc[idx, 'Match_Tier'] = 'outra_regiao'
-                            df_result.loc[idx, 'Score_Match'] = SCORE_OUTRA_REGIAO
-                        
-                        # Consumir vaga
-                        capacidades[escola_alocada][sexo] -= 1
-                        alocado = True
+                    if codigo_escola >= 0:
+                        regiao_alocada = regiao
+                        # Consumir vaga e atualizar contador de cidade-escola
+                        capacidades[sexos[pos]][codigo_escola] -= 1
+                        if cidade >= 0:
+                            cidade_escola_count[cidade, codigo_escola] += 1
                         break
                 
-                if not alocado:
-                    # Não conseguiu alocar
-                    df_result.loc[idx, 'Match_Tier'] = 'nao_alocado'
-                    df_result.loc[idx, 'Score_Match'] = SCORE_NAO_ALOCADO
+                registrar(pos, grupo, codigo_escola, regiao_alocada)
+                i += 1
+            
+            if i >= len(pos_grupo):
+                continue
+            
+            # Demais alunos do grupo: preenchimento em lote por sexo, mantendo a ordem.
+            # Todos compartilham a mesma ordem de regiões (principal primeiro).
+            reg_principal = regiao_principal[grupo]
+            if reg_principal not in sequencias:
+                ordem_regioes = [reg_principal] + [r for r in regioes if r != reg_principal]
+                sequencias[reg_principal] = _sequencia_escolas(ordem_regioes, escolas_por_regiao, len(nomes_escolas))
+            seq_escolas, regiao_por_escola = sequencias[reg_principal]
+            
+            restantes = pos_grupo[i:]
+            for sexo in pd.unique(sexos[restantes]):
+                pos_sexo = restantes[sexos[restantes] == sexo]
+                vagas = capacidades.get(sexo)
+                if vagas is None:
+                    codigos = np.full(len(pos_sexo), -1, dtype=np.int64)
+                else:
+                    codigos = _alocar_em_lote(len(pos_sexo), vagas, seq_escolas)
+                
+                alocados = codigos >= 0
+                pos_ok = pos_sexo[alocados]
+                regioes_ok = regiao_por_escola[codigos[alocados]]
+                
+                escola_alocada[pos_ok] = np.asarray(nomes_escolas, dtype=object)[codigos[alocados]]
+                regiao_escola[pos_ok] = regioes_ok
+                mesma = regioes_ok == reg_principal
+                match_tier[pos_ok] = np.where(mesma, 'mesma_regiao', 'outra_regiao')
+                score_match[pos_ok] = np.where(mesma, SCORE_MESMA_REGIAO, SCORE_OUTRA_REGIAO)
+                
+                pos_falha = pos_sexo[~alocados]
+                match_tier[pos_falha] = 'nao_alocado'
+                score_match[pos_falha] = SCORE_NAO_ALOCADO
+    
+    df_result['Escola_Alocada'] = escola_alocada
+    df_result['Regiao_Escola'] = regiao_escola
+    df_result['Score_Match'] = score_match
+    df_result['Match_Tier'] = match_tier
     
     return df_result
 
 
+def _sequencia_escolas(
+    ordem_regioes: List[int], 
+    escolas_por_regiao: Dict[int, np.ndarray],
+    n_escolas: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Concatena as escolas das regiões na ordem em que um aluno as tentaria.
+    
+    Escolas repetidas em mais de uma região ficam apenas na primeira ocorrência.
+    
+    Returns:
+        (codigos_escola em ordem de tentativa, região atribuída a cada código de escola)
+    """
+    partes = [escolas_por_regiao.get(r, np.empty(0, dtype=np.int64)) for r in ordem_regioes]
+    codigos = np.concatenate(partes) if partes else np.empty(0, dtype=np.int64)
+    regioes = np.repeat(np.asarray(ordem_regioes, dtype=np.int64), [len(p) for p in partes])
+    
+    _, primeira = np.unique(codigos, return_index=True)
+    manter = np.sort(primeira)
+    
+    regiao_por_escola = np.zeros(n_escolas, dtype=np.int64)
+    regiao_por_escola[codigos[manter]] = regioes[manter]
+    return codigos[manter], regiao_por_escola
+
+
+def _alocar_em_lote(n: int, vagas: np.ndarray, seq_escolas: np.ndarray) -> np.ndarray:
+    """
+    Aloca n alunos de um mesmo sexo percorrendo seq_escolas em ordem.
+    
+    Equivale a alocar um aluno por vez na primeira escola da sequência com vaga:
+    cada escola recebe alunos até esgotar suas vagas, depois passa para a próxima.
+    O vetor de vagas é atualizado no lugar.
+    
+    Returns:
+        Código da escola de cada aluno (-1 para quem ficou sem vaga)
+    """
+    resultado = np.full(n, -1, dtype=np.int64)
+    if n == 0 or not len(seq_escolas):
+        return resultado
+    
+    cap = np.maximum(vagas[seq_escolas], 0)
+    acumulado = np.cumsum(cap)
+    k = int(min(n, acumulado[-1]))
+    
+    # Aluno j vai para a primeira escola cujo acumulado de vagas ultrapassa j
+    resultado[:k] = seq_escolas[np.searchsorted(acumulado, np.arange(k), side='right')]
+    
+    # Vagas consumidas em cada escola da sequência
+    consumido = np.clip(k - (acumulado - cap), 0, cap)
+    vagas[seq_escolas] -= consumido
+    return resultado
+
+
+def _indexar_escolas(df_escolas: pd.DataFrame) -> Tuple[List[str], Dict[int, np.ndarray]]:
+    """
+    Codifica escolas como inteiros para uso em vetores de capacidade e contagem.
+    
+    Returns:
+        (nomes_escolas, escolas_por_regiao):
+        - nomes_escolas: nomes únicos na ordem da planilha (código = posição na lista)
+        - escolas_por_regiao: Dict[regiao] = array de códigos na ordem da planilha
+    """
+    nomes_escolas = list(dict.fromkeys(df_escolas['Escola'].tolist()))
+    codigo = {nome: i for i, nome in enumerate(nomes_escolas)}
+    
+    escolas_por_regiao: Dict[int, List[int]] = {}
+    for regiao, nome in zip(df_escolas['Numero_Regiao'], df_escolas['Escola']):
+        if pd.isna(regiao):
+            continue
+        codigos = escolas_por_regiao.setdefault(int(regiao), [])
+        if codigo[nome] not in codigos:
+            codigos.append(codigo[nome])
+    
+    return nomes_escolas, {r: np.array(c, dtype=np.int64) for r, c in escolas_por_regiao.items()}
+
+
+def _codificar_cidades(df_alunos: pd.DataFrame) -> Tuple[pd.Series, int]:
+    """
+    Codifica a coluna Cidade como inteiros (0..n_cidades-1).
+    
+    Cidades vazias recebem -1 e não participam da dispersão.
+    
+    Returns:
+        (codigos indexados como df_alunos, n_cidades)
+    """
+    cidades = df_alunos['Cidade'].astype(str)
+    codigos, uniques = pd.factorize(cidades)
+    codigos = np.where(cidades.to_numpy() == '', -1, codigos)
+    return pd.Series(codigos, index=df_alunos.index), len(uniques)
+
+
 def _ordenar_alunos_grupo(
     alunos_grupo: pd.DataFrame,
     dispersar_por_nome: bool = False,
-    dispersar_por_cidade: bool = False
+    dispersar_por_cidade: bool = False,
+    rng: np.random.Generator = None
 ) -> pd.DataFrame:
     """
     Aplica ordenação especial aos alunos de um grupo.
@@ -281,6 +451,7 @@ def _ordenar_alunos_grupo(
         alunos_grupo: DataFrame com alunos do grupo
         dispersar_por_nome: Se True, embaralha ordem aleatoriamente para dispersar nomes iguais
         dispersar_por_cidade: Se True, ordena para maximizar dispersão de cidades
+        rng: Gerador aleatório da execução (padrão: novo gerador com SEMENTE_PADRAO)
     
     Returns:
         DataFrame reordenado
@@ -294,8 +465,9 @@ def _ordenar_alunos_grupo(
     if dispersar_por_nome:
         # Embaralha completamente a ordem para dispersar nomes iguais
         # Cada aluno recebe um número aleatório único
-        np.random.seed(42)  # Para reprodutibilidade
-        df['_ordem_aleatoria'] = np.random.random(len(df))
+        if rng is None:
+            rng = np.random.default_rng(SEMENTE_PADRAO)  # Para reprodutibilidade
+        df['_ordem_aleatoria'] = rng.random(len(df))
         df = df.sort_values('_ordem_aleatoria')
         df = df.drop(columns=['_ordem_aleatoria'])
     
@@ -316,70 +488,76 @@ def _ordenar_alunos_grupo(
 def _tentar_alocar_em_regiao(
     regiao: int, 
     sexo: str, 
-    capacidades: Dict, 
-    df_escolas: pd.DataFrame,
-    cidade: str = None,
-    cidade_escola_count: Dict = None
-) -> str:
+    capacidades: Dict[str, np.ndarray], 
+    escolas_por_regiao: Dict[int, np.ndarray],
+    cidade: int = -1,
+    cidade_escola_count: np.ndarray = None
+) -> int:
     """
     Tenta alocar aluno em alguma escola da região.
     
-    Se dispersar_por_cidade estiver ativo, prioriza escolas com menos alunos da mesma cidade.
+    Se dispersar_por_cidade estiver ativo, prioriza escolas com menos alunos da mesma cidade
+    (empate resolvido pela ordem da planilha).
     
     Args:
         regiao: Número da região
         sexo: 'F' ou 'M'
-        capacidades: Dict com vagas disponíveis
-        df_escolas: DataFrame com escolas
-        cidade: Cidade do aluno (opcional, para dispersão)
-        cidade_escola_count: Dict contando alunos por cidade e escola (opcional)
+        capacidades: Dict[sexo] = vetor de vagas disponíveis por código de escola
+        escolas_por_regiao: Dict[regiao] = array de códigos de escola (ordem da planilha)
+        cidade: Código da cidade do aluno (-1 desativa a dispersão)
+        cidade_escola_count: Matriz cidade x escola com alunos já alocados (opcional)
     
     Returns:
-        Nome da escola se conseguiu alocar, string vazio caso contrário
+        Código da escola se conseguiu alocar, -1 caso contrário
     """
-    # Escolas da região na ordem da planilha
-    escolas_regiao = df_escolas[df_escolas['Numero_Regiao'] == regiao]['Escola'].tolist()
+    escolas_regiao = escolas_por_regiao.get(regiao)
+    vagas = capacidades.get(sexo)
+    if escolas_regiao is None or vagas is None:
+        return -1
     
     # Filtrar escolas com vaga disponível
-    escolas_com_vaga = [e for e in escolas_regiao if capacidades.get(e, {}).get(sexo, 0) > 0]
+    escolas_com_vaga = escolas_regiao[vagas[escolas_regiao] > 0]
     
-    if not escolas_com_vaga:
-        return ''
+    if not len(escolas_com_vaga):
+        return -1
     
     # Se dispersão por cidade estiver ativa e cidade for informada
-    if cidade and cidade_escola_count is not None:
-        # Ordenar escolas pela quantidade de alunos da mesma cidade (crescente)
-        escolas_com_vaga.sort(key=lambda e: cidade_escola_count[cidade][e])
+    if cidade >= 0 and cidade_escola_count is not None:
+        # Escola com menos alunos da mesma cidade (argmin retorna a primeira no empate)
+        return int(escolas_com_vaga[np.argmin(cidade_escola_count[cidade, escolas_com_vaga])])
     
-    # Retorna primeira escola disponível (ou a com menos alunos da cidade)
-    return escolas_com_vaga[0]
+    # Retorna primeira escola disponível
+    return int(escolas_com_vaga[0])
 
 
-def _preparar_capacidades(df_escolas: pd.DataFrame, intake: int) -> Dict:
+def _preparar_capacidades(
+    df_escolas: pd.DataFrame, 
+    intake: int, 
+    nomes_escolas: List[str]
+) -> Dict[str, np.ndarray]:
     """
-    Prepara dicionário com capacidades disponíveis por escola e sexo.
+    Prepara vetores com capacidades disponíveis por sexo, indexados pelo código da escola.
     
     Returns:
-        Dict[escola] = {'F': vagas_fem, 'M': vagas_masc, 'Regiao': numero}
+        Dict[sexo] = array de vagas, onde posição i corresponde a nomes_escolas[i]
     """
     if intake == 1:
         col_f, col_m = 'F_1', 'M_1'
     else:
         col_f, col_m = 'F_2', 'M_2'
     
+    codigo = {nome: i for i, nome in enumerate(nomes_escolas)}
+    codigos = df_escolas['Escola'].map(codigo).to_numpy()
+    
     capacidades = {}
-    for _, escola in df_escolas.iterrows():
-        nome = escola['Escola']
-        
+    for sexo, col in (('F', col_f), ('M', col_m)):
         # Usar colunas específicas do intake ou fallback para F/M gerais
-        vagas_f = pd.to_numeric(escola.get(col_f, escola.get('F', 0)), errors='coerce')
-        vagas_m = pd.to_numeric(escola.get(col_m, escola.get('M', 0)), errors='coerce')
-        
-        capacidades[nome] = {
-            'F': int(vagas_f or 0),
-            'M': int(vagas_m or 0),
-            'Regiao': int(escola['Numero_Regiao'])
-        }
+        col = col if col in df_escolas.columns else sexo
+        vagas = np.zeros(len(nomes_escolas), dtype=np.int64)
+        if col in df_escolas.columns:
+            # Escolas repetidas: prevalece a última linha da planilha
+            vagas[codigos] = pd.to_numeric(df_escolas[col], errors='coerce').fillna(0).astype(int).to_numpy()
+        capacidades[sexo] = vagas
     
     return capacidades
 
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+GRIFFE HUB - Cache de Resultados da Alocação
+
+Memoiza alocar_estudantes pela impressão digital das entradas
+(alunos, escolas e config). O cache vive no processo, então é compartilhado
+por todas as sessões Streamlit, e é limitado por LRU.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Tuple
+import pandas as pd
+
+from .algorithm import alocar_estudantes
+from .historico import hash_config, hash_dataframe
+
+# Quantidade máxima de resultados mantidos em memória
+TAMANHO_CACHE = 16
+
+_cache: "OrderedDict[Tuple[str, str, str], pd.DataFrame]" = OrderedDict()
+_lock = threading.Lock()
+_estatisticas = {'acertos': 0, 'falhas': 0}
+
+
+def alocar_estudantes_cache(df_alunos: pd.DataFrame, df_escolas: pd.DataFrame, config: Dict) -> pd.DataFrame:
+    """
+    Mesma interface de alocar_estudantes, reaproveitando resultados de entradas idênticas.
+
+    Sempre devolve uma cópia, para que quem chama possa alterar o resultado
+    sem corromper o cache.
+    """
+    chave = (hash_dataframe(df_alunos), hash_dataframe(df_escolas), hash_config(config))
+
+    with _lock:
+        resultado = _cache.get(chave)
+        if resultado is not None:
+            _cache.move_to_end(chave)
+            _estatisticas['acertos'] += 1
+            return resultado.copy()
+        _estatisticas['falhas'] += 1
+
+    # Calcula fora do lock: execuções com entradas diferentes rodam em paralelo
+    resultado = alocar_estudantes(df_alunos, df_escolas, config)
+
+    with _lock:
+        _cache[chave] = resultado
+        _cache.move_to_end(chave)
+        while len(_cache) > TAMANHO_CACHE:
+            _cache.popitem(last=False)
+
+    return resultado.copy()
+
+
+def limpar_cache():
+    """Remove todos os resultados memoizados."""
+    with _lock:
+        _cache.clear()
+        _estatisticas['acertos'] = 0
+        _estatisticas['falhas'] = 0
+
+
+def estatisticas_cache() -> Dict[str, int]:
+    """Retorna acertos, falhas e quantidade de entradas do cache."""
+    with _lock:
+        return {**_estatisticas, 'entradas': len(_cache)}
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+GRIFFE HUB - Histórico de Execuções da Alocação
+
+Persiste resultados de alocar_estudantes como snapshots colunares compactos (.npz)
+e compara duas execuções de forma vetorizada.
+
+FORMATO DO SNAPSHOT:
+- Colunas de texto: códigos inteiros (int32) + vetor de valores únicos
+- Colunas numéricas: vetor numpy direto
+- Metadados (JSON): id, data, config, hash da config e impressões digitais das entradas
+
+IDENTIFICAÇÃO DOS ALUNOS:
+Cada aluno recebe uma 'Chave' = Nome + Grupo (+ contador para homônimos no mesmo grupo),
+usada para alinhar as duas execuções na comparação.
+"""
+
+import hashlib
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Tuple
+import numpy as np
+import pandas as pd
+
+from shared.configuracao import PROCESSED_DIR
+
+# Pasta padrão dos snapshots
+HISTORICO_DIR = PROCESSED_DIR / "alocacao"
+
+# Colunas persistidas (as ausentes no resultado são ignoradas)
+COLUNAS_SNAPSHOT = [
+    'Chave', 'Nome', 'Grupo', 'Sexo_Padrao', 'Cidade', 'Intake',
+    'Escola_Alocada', 'Regiao_Escola', 'Score_Match', 'Match_Tier',
+]
+
+_META = '__meta__'
+
+
+# ============================================================================
+# IMPRESSÕES DIGITAIS
+# ============================================================================
+
+def hash_dataframe(df: pd.DataFrame) -> str:
+    """
+    Hash estável do conteúdo de um DataFrame (colunas, tipos e valores).
+
+    Usa pd.util.hash_pandas_object, que processa cada coluna de forma vetorizada.
+    """
+    h = hashlib.sha256()
+    h.update(json.dumps([str(c) for c in df.columns]).encode('utf-8'))
+    h.update(json.dumps([str(t) for t in df.dtypes]).encode('utf-8'))
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()[:32]
+
+
+def hash_config(config: Dict) -> str:
+    """Hash estável de um dict de configuração (independe da ordem das chaves)."""
+    texto = json.dumps(config, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()[:32]
+
+
+# ============================================================================
+# SNAPSHOTS
+# ============================================================================
+
+def salvar_execucao(
+    df_resultado: pd.DataFrame,
+    df_alunos: pd.DataFrame,
+    df_escolas: pd.DataFrame,
+    config: Dict,
+    descricao: str = '',
+    diretorio: Path = None
+) -> Path:
+    """
+    Salva o resultado de uma alocação como snapshot colunar.
+
+    Args:
+        df_resultado: DataFrame retornado por alocar_estudantes
+        df_alunos: DataFrame de alunos usado na execução
+        df_escolas: DataFrame de escolas usado na execução
+        config: Configuração com que a alocação foi executada (não a
+            configuração atual da sessão, que pode ter mudado depois)
+        descricao: Texto livre para identificar a execução
+        diretorio: Pasta de destino (padrão: HISTORICO_DIR)
+
+    Returns:
+        Caminho do arquivo .npz criado
+    """
+    diretorio = Path(diretorio or HISTORICO_DIR)
+    diretorio.mkdir(parents=True, exist_ok=True)
+
+    agora = datetime.now()
+    meta = {
+        'id': f"{agora.strftime('%Y%m%d_%H%M%S')}_{hash_config(config)[:8]}",
+        'criado_em': agora.isoformat(timespec='seconds'),
+        'descricao': descricao,
+        'config': config,
+        'hash_config': hash_config(config),
+        'hash_alunos': hash_dataframe(df_alunos),
+        'hash_escolas': hash_dataframe(df_escolas),
+        'total_alunos': int(len(df_resultado)),
+    }
+
+    df = df_resultado.copy()
+    df['Chave'] = _gerar_chaves(df)
+
+    arrays = {_META: np.array(json.dumps(meta, default=str, ensure_ascii=False))}
+    for coluna in COLUNAS_SNAPSHOT:
+        if coluna not in df.columns:
+            continue
+        serie = df[coluna]
+        if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+            arrays[f"{coluna}__num"] = serie.to_numpy()
+        else:
+            codigos, valores = pd.factorize(serie.astype(str))
+            arrays[f"{coluna}__cod"] = codigos.astype(np.int32)
+            arrays[f"{coluna}__val"] = np.asarray(valores, dtype=str)
+
+    caminho = diretorio / f"{meta['id']}.npz"
+    np.savez_compressed(caminho, **arrays)
+    return caminho
+
+
+def carregar_execucao(caminho: Path) -> Tuple[pd.DataFrame, Dict]:
+    """
+    Carrega um snapshot salvo por salvar_execucao.
+
+    Returns:
+        (DataFrame com as colunas persistidas, metadados)
+    """
+    with np.load(caminho, allow_pickle=False) as dados:
+        meta = json.loads(str(dados[_META]))
+        colunas = {}
+        for coluna in COLUNAS_SNAPSHOT:
+            if f"{coluna}__num" in dados.files:
+                colunas[coluna] = dados[f"{coluna}__num"]
+            elif f"{coluna}__cod" in dados.files:
+                valores = dados[f"{coluna}__val"].astype(object)
+                colunas[coluna] = valores[dados[f"{coluna}__cod"]]
+    return pd.DataFrame(colunas), meta
+
+
+def listar_execucoes(diretorio: Path = None) -> List[Dict]:
+    """
+    Lista metadados das execuções salvas, da mais recente para a mais antiga.
+
+    Cada item inclui a chave 'caminho' com o arquivo do snapshot.
+    """
+    diretorio = Path(diretorio or HISTORICO_DIR)
+    if not diretorio.exists():
+        return []
+
+    execucoes = []
+    for caminho in diretorio.glob('*.npz'):
+        try:
+            with np.load(caminho, allow_pickle=False) as dados:
+                meta = json.loads(str(dados[_META]))
+        except (OSError, KeyError, ValueError):
+            continue
+        meta['caminho'] = caminho
+        execucoes.append(meta)
+
+    return sorted(execucoes, key=lambda m: m.get('criado_em', ''), reverse=True)
+
+
+# ============================================================================
+# COMPARAÇÃO
+# ============================================================================
+
+def comparar_execucoes(antes: pd.DataFrame, depois: pd.DataFrame) -> Dict:
+    """
+    Compara duas execuções alinhando alunos pela coluna 'Chave'.
+
+    Args:
+        antes: Snapshot mais antigo (carregar_execucao)
+        depois: Snapshot mais recente (carregar_execucao)
+
+    Returns:
+        Dict com:
+            - 'resumo': Dict com contagens
+            - 'movidos': alunos que mudaram de escola (ou de intake)
+            - 'tiers': alunos cujo Match_Tier mudou
+            - 'coesao': coesão por grupo antes/depois e delta
+            - 'novos' / 'removidos': alunos presentes em apenas uma execução
+    """
+    a = antes.set_index('Chave')
+    d = depois.set_index('Chave')
+
+    comuns = a.index.intersection(d.index)
+    a_c = a.loc[comuns]
+    d_c = d.loc[comuns]
+
+    mudou_escola = (
+        (a_c['Escola_Alocada'].to_numpy() != d_c['Escola_Alocada'].to_numpy())
+        | (a_c['Intake'].to_numpy() != d_c['Intake'].to_numpy())
+    )
+    movidos = pd.DataFrame({
+        'Nome': d_c['Nome'].to_numpy(),
+        'Grupo': d_c['Grupo'].to_numpy(),
+        'Intake_Antes': a_c['Intake'].to_numpy(),
+        'Intake_Depois': d_c['Intake'].to_numpy(),
+        'Escola_Antes': a_c['Escola_Alocada'].to_numpy(),
+        'Escola_Depois': d_c['Escola_Alocada'].to_numpy(),
+        'Regiao_Antes': a_c['Regiao_Escola'].to_numpy(),
+        'Regiao_Depois': d_c['Regiao_Escola'].to_numpy(),
+    }, index=comuns)[mudou_escola]
+
+    mudou_tier = a_c['Match_Tier'].to_numpy() != d_c['Match_Tier'].to_numpy()
+    tiers = pd.DataFrame({
+        'Nome': d_c['Nome'].to_numpy(),
+        'Grupo': d_c['Grupo'].to_numpy(),
+        'Tier_Antes': a_c['Match_Tier'].to_numpy(),
+        'Tier_Depois': d_c['Match_Tier'].to_numpy(),
+    }, index=comuns)[mudou_tier]
+
+    coesao = _coesao_por_grupo(antes).join(
+        _coesao_por_grupo(depois), how='outer', lsuffix='_Antes', rsuffix='_Depois'
+    )
+    coesao['Delta_Coesao'] = (
+        coesao['Coesao_Percentual_Depois'].fillna(0) - coesao['Coesao_Percentual_Antes'].fillna(0)
+    ).round(1)
+
+    novos = d.loc[d.index.difference(a.index), ['Nome', 'Grupo']]
+    removidos = a.loc[a.index.difference(d.index), ['Nome', 'Grupo']]
+
+    return {
+        'resumo': {
+            'alunos_comuns': int(len(comuns)),
+            'movidos': int(mudou_escola.sum()),
+            'tiers_alterados': int(mudou_tier.sum()),
+            'novos': int(len(novos)),
+            'removidos': int(len(removidos)),
+        },
+        'movidos': movidos,
+        'tiers': tiers,
+        'coesao': coesao,
+        'novos': novos,
+        'removidos': removidos,
+    }
+
+
+def _coesao_por_grupo(df: pd.DataFrame) -> pd.DataFrame:
+    """Coesão por grupo, com a mesma fórmula da aba de resultados."""
+    alocados = df[df['Intake'] > 0]
+    coesao = alocados.groupby('Grupo').agg(
+        Total_Alunos=('Nome', 'count'),
+        Regioes_Usadas=('Regiao_Escola', 'nunique'),
+    )
+    coesao['Coesao_Percentual'] = (
+        (coesao['Total_Alunos'] - coesao['Regioes_Usadas'] + 1)
+        / coesao['Total_Alunos'] * 100
+    ).round(1)
+    return coesao
+
+
+def _gerar_chaves(df: pd.DataFrame) -> pd.Series:
+    """Chave do aluno: Nome|Grupo, com sufixo #n para homônimos no mesmo grupo."""
+    base = df['Nome'].astype(str).str.strip() + '|' + df['Grupo'].astype(str).str.strip()
+    ocorrencia = base.groupby(base).cumcount()
+    return base.where(ocorrencia == 0, base + '#' + ocorrencia.astype(str))
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Griffe Hub - DocFill
+Armazém de PDFs endereçado por conteúdo.
+
+Cada PDF preenchido é guardado sob uma chave derivada do template compilado
+(PDF + geometria dos campos) e dos valores da linha nas colunas mapeadas.
+Quando a planilha é corrigida e gerada de novo, só as linhas cujo conteúdo
+mudou precisam ser preenchidas; as demais são reaproveitadas do armazém,
+inclusive entre trabalhos diferentes (ver jobs.py).
+
+ESTRUTURA EM DISCO (PROCESSED_DIR/docfill/pdfs/):
+    <ab>/<chave>.pdf   chave = sha256 hex; <ab> = dois primeiros caracteres
+
+A data de modificação de cada arquivo é atualizada quando ele é reaproveitado,
+então limpar(max_idade_dias) remove apenas o que não é usado há algum tempo.
+"""
+
+import hashlib
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from shared.configuracao import PROCESSED_DIR
+from shared.utils import gravar_atomico
+
+from .filler import TemplateCompilado
+
+# Pasta padrão do armazém
+ARMAZEM_DIR = PROCESSED_DIR / "docfill" / "pdfs"
+
+# Incrementar quando o desenho dos campos mudar (quebra de linha, fonte, etc.):
+# invalida os PDFs gerados pela versão anterior
+VERSAO_LAYOUT = 1
+
+
+def impressao_digital_template(template: TemplateCompilado) -> str:
+    """Hash do template compilado: bytes do PDF + geometria de todos os campos."""
+    h = hashlib.sha256()
+    h.update(f"v{VERSAO_LAYOUT}".encode("ascii"))
+    h.update(hashlib.sha256(template.pdf_bytes).digest())
+    h.update(repr(template.campos).encode("utf-8"))
+    return h.hexdigest()
+
+
+def colunas_template(template: TemplateCompilado) -> Tuple[int, ...]:
+    """Índices das colunas usadas pelos campos: só elas afetam o PDF gerado."""
+    return tuple(sorted({campo.col_idx for campo in template.campos}))
+
+
+class ArmazemPDFs:
+    """Armazém de PDFs preenchidos, endereçado por (template, valores da linha)."""
+
+    def __init__(self, diretorio: Optional[Path] = None):
+        self.diretorio = Path(diretorio or ARMAZEM_DIR)
+
+    @staticmethod
+    def chave(impressao_template: str, valores: List[str]) -> str:
+        """
+        Chave de uma linha: hash da impressão digital do template + valores das
+        colunas mapeadas (colunas_template), na ordem.
+        """
+        h = hashlib.sha256(impressao_template.encode("ascii"))
+        for valor in valores:
+            texto = str(valor).encode("utf-8")
+            # Prefixo de tamanho: ["a", "bc"] e ["ab", "c"] geram chaves diferentes
+            h.update(len(texto).to_bytes(8, "little"))
+            h.update(texto)
+        return h.hexdigest()
+
+    def caminho(self, chave: str) -> Path:
+        return self.diretorio / chave[:2] / f"{chave}.pdf"
+
+    def contem(self, chave: Optional[str]) -> bool:
+        """Indica se a chave está no armazém (e marca o arquivo como usado agora)."""
+        if not chave:
+            return False
+        caminho = self.caminho(chave)
+        try:
+            os.utime(caminho)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def obter(self, chave: str) -> Optional[bytes]:
+        """Bytes do PDF da chave, ou None se não estiver no armazém."""
+        try:
+            dados = self.caminho(chave).read_bytes()
+        except FileNotFoundError:
+            return None
+        self.contem(chave)
+        return dados
+
+    def guardar(self, chave: str, pdf_bytes: bytes) -> Path:
+        """Grava o PDF de forma atômica (arquivo temporário + rename)."""
+        caminho = self.caminho(chave)
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        gravar_atomico(caminho, pdf_bytes)
+        return caminho
+
+    def limpar(self, max_idade_dias: float = 30) -> int:
+        """Remove PDFs não usados há mais de max_idade_dias. Retorna quantos foram removidos."""
+        if not self.diretorio.exists():
+            return 0
+        limite = time.time() - max_idade_dias * 86400
+        removidos = 0
+        for caminho in self.diretorio.glob("*/*.pdf"):
+            try:
+                if caminho.stat().st_mtime < limite:
+                    caminho.unlink()
+                    removidos += 1
+            except FileNotFoundError:
+                continue
+        return removidos
+
+    def estatisticas(self) -> Dict[str, int]:
+        """Quantidade de PDFs e bytes ocupados pelo armazém."""
+        arquivos = 0
+        total_bytes = 0
+        if self.diretorio.exists():
+            for caminho in self.diretorio.glob("*/*.pdf"):
+                try:
+                    total_bytes += caminho.stat().st_size
+                except FileNotFoundError:
+                    continue
+                arquivos += 1
+        return {"arquivos": arquivos, "bytes": total_bytes}
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+Griffe Hub - DocFill
+Benchmarks do preenchimento de PDFs.
+
+1. Quebra de texto em campos longos de texto livre (executar_quebra_texto).
+   Compara a quebra original (remede a linha candidata inteira a cada palavra)
+   com _quebrar_texto (larguras de palavra memoizadas + cache de resultados).
+   Os textos são ASCII para que as duas versões produzam exatamente as mesmas
+   linhas (fitz.get_text_length, usado na versão original, erra a largura de
+   letras acentuadas em algumas versões do PyMuPDF).
+
+2. Formatos de saída (executar_saidas): ZIP com um PDF por linha
+   (gerar_zip_em_disco) x PDF único (gerar_pdf_unico), em tamanho e tempo,
+   com um template que tem uma imagem de fundo repetida em cada documento.
+
+Uso (a partir da raiz do projeto):
+    python backend/docfill/benchmark.py
+"""
+
+import random
+import sys
+import time
+from io import BytesIO
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import fitz  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from docfill.filler import (  # noqa: E402
+    CANVAS_WIDTH,
+    _FONTNAME,
+    _largura_palavra,
+    _quebrar_texto,
+    _quebrar_texto_cache,
+    gerar_pdf_unico,
+    gerar_zip_em_disco,
+)
+
+_VOCABULARIO = (
+    "aluno responsavel escola programa intercambio cidade curso atividade "
+    "periodo matricula documento observacao acompanhamento familia saude "
+    "alimentacao restricao transporte horario contato emergencia autorizacao"
+).split()
+
+
+def _quebrar_texto_original(texto: str, max_largura_pts: float, font_size: float) -> List[str]:
+    """Versão anterior de _quebrar_texto, mantida apenas como referência."""
+    palavras = texto.split()
+    if not palavras:
+        return [texto]
+
+    linhas: List[str] = []
+    linha_atual: List[str] = []
+    for palavra in palavras:
+        candidato = " ".join(linha_atual + [palavra])
+        largura = fitz.get_text_length(candidato, fontname=_FONTNAME, fontsize=font_size)
+        if largura <= max_largura_pts:
+            linha_atual.append(palavra)
+        else:
+            if linha_atual:
+                linhas.append(" ".join(linha_atual))
+            linha_atual = [palavra]
+    if linha_atual:
+        linhas.append(" ".join(linha_atual))
+    return linhas
+
+
+def gerar_textos(n_linhas: int, n_distintos: int, palavras: int, seed: int = 42) -> List[str]:
+    """Textos livres longos; apenas n_distintos valores diferentes se repetem entre as linhas."""
+    rng = random.Random(seed)
+    distintos = [
+        " ".join(rng.choice(_VOCABULARIO) for _ in range(palavras))
+        for _ in range(n_distintos)
+    ]
+    return [rng.choice(distintos) for _ in range(n_linhas)]
+
+
+def _medir(funcao: Callable, textos: List[str], largura: float, font_size: float) -> float:
+    inicio = time.perf_counter()
+    for texto in textos:
+        funcao(texto, largura, font_size)
+    return time.perf_counter() - inicio
+
+
+def executar_quebra_texto(n_linhas: int = 2000, n_distintos: int = 200, palavras: int = 60,
+                          largura: float = 300.0, font_size: float = 10) -> None:
+    textos = gerar_textos(n_linhas, n_distintos, palavras)
+
+    # Mesma quebra nas duas versões
+    for texto in set(textos):
+        assert _quebrar_texto(texto, largura, font_size) == \
+            _quebrar_texto_original(texto, largura, font_size)
+
+    _largura_palavra.cache_clear()
+    _quebrar_texto_cache.cache_clear()
+
+    t_original = _medir(_quebrar_texto_original, textos, largura, font_size)
+    t_frio = _medir(_quebrar_texto_cache.__wrapped__, textos, largura, font_size)
+    t_cache = _medir(_quebrar_texto, textos, largura, font_size)
+
+    print(f"{n_linhas} linhas, {n_distintos} textos distintos, {palavras} palavras cada")
+    print(f"  original (remede a linha):      {t_original * 1000:8.1f} ms")
+    print(f"  larguras memoizadas, sem cache: {t_frio * 1000:8.1f} ms  "
+          f"({t_original / t_frio:.1f}x)")
+    print(f"  larguras + cache de resultados: {t_cache * 1000:8.1f} ms  "
+          f"({t_original / t_cache:.1f}x)")
+
+
+def gerar_template(n_paginas: int = 2, seed: int = 42) -> bytes:
+    """Template A4 com uma imagem de fundo (simula logotipo/timbre) em cada página."""
+    rng = random.Random(seed)
+    img = Image.new("RGB", (400, 120))
+    img.putdata([tuple(rng.randrange(256) for _ in range(3)) for _ in range(400 * 120)])
+    png = BytesIO()
+    img.save(png, format="PNG")
+
+    doc = fitz.open()
+    for p in range(n_paginas):
+        page = doc.new_page(width=595, height=842)
+        page.insert_image(fitz.Rect(40, 30, 340, 120), stream=png.getvalue())
+        page.insert_text((40, 160), f"Formulário - página {p + 1}", fontsize=16)
+    dados = doc.tobytes(garbage=4, deflate=True)
+    doc.close()
+    return dados
+
+
+def executar_saidas(n_linhas: int = 300) -> None:
+    pdf_bytes = gerar_template()
+    headers = ["Nome", "Cidade", "Observacoes"]
+    escala = CANVAS_WIDTH / 595
+    campos = [
+        {"colIndex": 0, "pageNum": 0, "fontSize": 12,
+         "canvas_left": 40 * escala, "canvas_top": 200 * escala,
+         "canvas_width": 300 * escala, "canvas_height": 30 * escala},
+        {"colIndex": 1, "pageNum": 0, "fontSize": 10,
+         "canvas_left": 40 * escala, "canvas_top": 240 * escala,
+         "canvas_width": 300 * escala, "canvas_height": 30 * escala},
+        {"colIndex": 2, "pageNum": 1, "fontSize": 9,
+         "canvas_left": 40 * escala, "canvas_top": 200 * escala,
+         "canvas_width": 500 * escala, "canvas_height": 200 * escala},
+    ]
+    textos = gerar_textos(n_linhas, n_linhas, 40)
+    rows = [[f"Aluno {i}", f"Cidade {i % 50}", textos[i]] for i in range(n_linhas)]
+
+    print(f"{n_linhas} linhas, template de {len(pdf_bytes) / 1024:.0f} KB")
+    resultados = [
+        ("ZIP compactado", lambda: gerar_zip_em_disco(pdf_bytes, campos, rows, headers)),
+        ("ZIP sem compressão", lambda: gerar_zip_em_disco(pdf_bytes, campos, rows, headers,
+                                                          compactar=False)),
+        ("PDF único", lambda: gerar_pdf_unico(pdf_bytes, campos, rows, headers)),
+    ]
+    for nome, gerar in resultados:
+        inicio = time.perf_counter()
+        caminho, ok, erros = gerar()
+        tempo = time.perf_counter() - inicio
+        tamanho = caminho.stat().st_size
+        caminho.unlink()
+        print(f"  {nome:<20} {tamanho / 1024 / 1024:8.2f} MB  {tempo:6.2f} s  "
+              f"({ok} ok, {erros} erros)")
+
+
+if __name__ == "__main__":
+    executar_quebra_texto()
+    print()
+    executar_saidas()
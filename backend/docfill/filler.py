@@ -7,11 +7,20 @@ Dependências:
     pip install pymupdf openpyxl pandas pillow
 """
 
+import csv
+import os
 import re
+import hashlib
 import logging
+import tempfile
+import threading
 import zipfile
-from io import BytesIO
-from typing import Any, Dict, List, Optional, Tuple
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from io import BytesIO, TextIOWrapper
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
 
 import pandas as pd
 from PIL import Image, ImageDraw
@@ -23,6 +32,8 @@ except ImportError as e:
         "PyMuPDF não encontrado. Execute: pip install pymupdf"
     ) from e
 
+from shared.configuracao import TEMP_DIR
+
 
 # ============================================================================
 # LOGGER  (mesmo padrão de setup_logger dos outros módulos do hub)
@@ -61,6 +72,12 @@ CORES_CAMPOS: List[Tuple[int, int, int]] = [
     (234, 179, 8),     # amarelo
 ]
 
+# Linhas enviadas por tarefa ao pool de processos na geração paralela
+LOTE_PARALELO: int = 8
+
+# Páginas rasterizadas mantidas em memória para o canvas de mapeamento
+TAMANHO_CACHE_PAGINAS: int = 32
+
 
 # ============================================================================
 # PLANILHA
@@ -74,6 +91,9 @@ def extrair_planilha(
     Lê planilha Excel (.xlsx / .xls) ou CSV e devolve
     (headers, rows) — tudo como strings.
 
+    Carrega todas as linhas em memória; para planilhas grandes use
+    iterar_planilha, que lê as linhas sob demanda.
+
     Args:
         sheet_bytes: Bytes do arquivo carregado via st.file_uploader
         filename:    Nome original do arquivo (usado para detectar formato)
@@ -82,17 +102,127 @@ def extrair_planilha(
         headers: Lista com os nomes das colunas (1ª linha)
         rows:    Lista de listas; cada sublista é uma linha de dados
     """
+    headers, linhas = iterar_planilha(sheet_bytes, filename)
+    rows = list(linhas)
+
+    logger.info("Planilha '%s': %d colunas, %d linhas", filename, len(headers), len(rows))
+    return headers, rows
+
+
+def iterar_planilha(
+    sheet_bytes: bytes,
+    filename: str,
+) -> Tuple[List[str], Iterator[List[str]]]:
+    """
+    Lê o cabeçalho da planilha e devolve um iterador sobre as linhas de dados.
+
+    .xlsx é lido com openpyxl em modo read-only e .csv com o módulo csv, linha a
+    linha, sem montar um DataFrame; .xls (formato antigo) ainda passa pelo pandas.
+    O resultado segue o que pandas.read_* + fillna("") produzia:
+      - valores como strings; células vazias e marcadores como "NA"/"null" → ""
+      - nomes de colunas "Unnamed: 3" (vazio) e "Nome.1" (repetido)
+      - CSV: linhas em branco ignoradas; Excel: linhas vazias no fim ignoradas
+      - todas as linhas com o número de colunas do cabeçalho (no Excel, valores
+        à direita da última coluna com cabeçalho são ignorados)
+
+    Args:
+        sheet_bytes: Bytes do arquivo carregado via st.file_uploader
+        filename:    Nome original do arquivo (usado para detectar formato)
+
+    Returns:
+        headers: Lista com os nomes das colunas (1ª linha)
+        rows:    Iterador de listas; cada lista é uma linha de dados
+    """
     fname = filename.lower()
-    if fname.endswith(".csv"):
-        df = pd.read_csv(BytesIO(sheet_bytes), dtype=str).fillna("")
-    else:
+    if fname.endswith(".xls"):
         df = pd.read_excel(BytesIO(sheet_bytes), dtype=str).fillna("")
+        headers = [str(h).strip() for h in df.columns.tolist()]
+        return headers, (list(row) for row in df.itertuples(index=False, name=None))
 
-    headers = [str(h).strip() for h in df.columns.tolist()]
-    rows = [list(row) for _, row in df.iterrows()]
+    if fname.endswith(".csv"):
+        texto = TextIOWrapper(BytesIO(sheet_bytes), encoding="utf-8-sig", newline="")
+        brutas = (
+            linha for linha in csv.reader(texto)
+            if linha and (len(linha) > 1 or linha[0].strip())
+        )
+        excel = False
+    else:
+        import openpyxl
+        wb = openpyxl.load_workbook(BytesIO(sheet_bytes), read_only=True, data_only=True)
+        brutas = wb.worksheets[0].iter_rows(values_only=True)
+        excel = True
+
+    # No cabeçalho "NA", "null" etc. são nomes válidos
+    cabecalho = [_valor_celula(v, ausentes=()) for v in next(brutas, ())]
+    if excel:
+        # Células vazias à direita do último cabeçalho não viram colunas
+        while cabecalho and cabecalho[-1] == "":
+            cabecalho.pop()
+    headers = _nomes_colunas(cabecalho)
+    return headers, _linhas_planilha(brutas, len(headers), excel)
+
+
+# Marcadores de valor ausente que o pandas converte em NaN por padrão
+_VALORES_AUSENTES = frozenset({
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None",
+    "n/a", "nan", "null",
+})
+
+
+def _linhas_planilha(brutas, n_colunas: int, excel: bool) -> Iterator[List[str]]:
+    """
+    Converte as linhas brutas em listas de strings com n_colunas.
 
-    logger.info("Planilha '%s': %d colunas, %d linhas", filename, len(headers), len(rows))
-    return headers, rows
+    No Excel, linhas vazias só são descartadas no fim da planilha (as do meio
+    são mantidas, como no pandas); ficam retidas até aparecer uma linha com dados.
+    """
+    vazias_pendentes = 0
+    for linha in brutas:
+        valores = [_valor_celula(v) for v in linha[:n_colunas]]
+        if len(valores) < n_colunas:
+            valores.extend([""] * (n_colunas - len(valores)))
+        if excel:
+            if all(v is None or v == "" for v in linha):
+                vazias_pendentes += 1
+                continue
+            for _ in range(vazias_pendentes):
+                yield [""] * n_colunas
+            vazias_pendentes = 0
+        yield valores
+
+
+def _valor_celula(valor: Any, ausentes=_VALORES_AUSENTES) -> str:
+    """Texto de uma célula como o pandas produz com dtype=str + fillna("") (1.0 → "1")."""
+    if valor is None:
+        return ""
+    if isinstance(valor, str):
+        return "" if valor in ausentes else valor
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return str(valor)
+
+
+def _nomes_colunas(brutos: List[str]) -> List[str]:
+    """
+    Nomes de colunas no formato do pandas: "Unnamed: i" para vazios e sufixos
+    .1, .2 para repetidos (pulando sufixos que já existem como coluna).
+    """
+    nomes = [nome if nome != "" else f"Unnamed: {i}" for i, nome in enumerate(brutos)]
+    sem_nome = [i for i, nome in enumerate(brutos) if nome == ""]
+    ordem = [i for i in range(len(nomes)) if brutos[i] != ""] + sem_nome
+
+    contagem: Dict[str, int] = {}
+    for i in ordem:
+        original = nome = nomes[i]
+        n = contagem.get(nome, 0)
+        while n > 0:
+            contagem[original] = n + 1
+            nome = f"{original}.{n}"
+            n = n + 1 if nome in nomes else contagem.get(nome, 0)
+        nomes[i] = nome
+        contagem[nome] = n + 1
+    return [n.strip() for n in nomes]
 
 
 # ============================================================================
@@ -113,6 +243,15 @@ def _zoom_para_pagina(doc: fitz.Document, page_idx: int) -> float:
     return CANVAS_WIDTH / page.rect.width
 
 
+_cache_paginas: "OrderedDict[Tuple[str, int, int], Tuple[Image.Image, float]]" = OrderedDict()
+_cache_paginas_lock = threading.Lock()
+
+
+def _hash_template(pdf_bytes: bytes) -> str:
+    """Impressão digital curta dos bytes do template (chave do cache de páginas)."""
+    return hashlib.blake2b(pdf_bytes, digest_size=16).hexdigest()
+
+
 def renderizar_pagina(
     pdf_bytes: bytes,
     page_idx: int,
@@ -120,10 +259,33 @@ def renderizar_pagina(
     """
     Renderiza uma página do PDF como imagem PIL sem decorações.
 
+    As páginas ficam num cache LRU em memória por (hash do template, página,
+    CANVAS_WIDTH): os reruns do Streamlit a cada clique no canvas não
+    rasterizam a página de novo. Cada chamada recebe uma cópia da imagem.
+
     Returns:
         img:  Imagem PIL da página
         zoom: Fator de escala usado (pixels por ponto PDF)
     """
+    chave = (_hash_template(pdf_bytes), page_idx, CANVAS_WIDTH)
+    with _cache_paginas_lock:
+        item = _cache_paginas.get(chave)
+        if item is not None:
+            _cache_paginas.move_to_end(chave)
+    if item is None:
+        item = _rasterizar_pagina(pdf_bytes, page_idx)
+        with _cache_paginas_lock:
+            _cache_paginas[chave] = item
+            _cache_paginas.move_to_end(chave)
+            while len(_cache_paginas) > TAMANHO_CACHE_PAGINAS:
+                _cache_paginas.popitem(last=False)
+
+    img, zoom = item
+    return img.copy(), zoom
+
+
+def _rasterizar_pagina(pdf_bytes: bytes, page_idx: int) -> Tuple[Image.Image, float]:
+    """Abre o PDF e rasteriza a página na largura do canvas."""
     doc = fitz.open(stream=pdf_bytes, filetype="pdf")
     zoom = _zoom_para_pagina(doc, page_idx)
     mat = fitz.Matrix(zoom, zoom)
@@ -139,6 +301,22 @@ def renderizar_pagina(
     return img, zoom
 
 
+def limpar_cache_paginas() -> None:
+    """Descarta todas as páginas rasterizadas em cache."""
+    with _cache_paginas_lock:
+        _cache_paginas.clear()
+
+
+@lru_cache(maxsize=1)
+def _fonte_rotulos():
+    """Fonte dos rótulos dos campos (tamanho 11; fallback para a fonte bitmap padrão)."""
+    from PIL import ImageFont
+    try:
+        return ImageFont.load_default(size=11)
+    except (TypeError, AttributeError):
+        return ImageFont.load_default()
+
+
 def renderizar_pagina_com_campos(
     pdf_bytes: bytes,
     page_idx: int,
@@ -148,6 +326,9 @@ def renderizar_pagina_com_campos(
     Renderiza uma página do PDF com os campos já mapeados
     desenhados como retângulos coloridos e anotados.
 
+    A página base vem do cache de renderizar_pagina; aqui só a camada dos
+    campos é redesenhada e composta sobre a região que ela cobre.
+
     Args:
         pdf_bytes: Bytes do PDF template
         page_idx:  Índice da página (0-based)
@@ -158,20 +339,15 @@ def renderizar_pagina_com_campos(
         zoom: Fator de escala (para uso na conversão de coordenadas)
     """
     img, zoom = renderizar_pagina(pdf_bytes, page_idx)
-    img = img.convert("RGBA")
+
+    campos_pagina = [c for c in campos if c.get("pageNum") == page_idx]
+    if not campos_pagina:
+        return img, zoom
 
     overlay = Image.new("RGBA", img.size, (0, 0, 0, 0))
     draw = ImageDraw.Draw(overlay)
+    font = _fonte_rotulos()
 
-    # Tentar fonte com tamanho; fallback para fonte bitmap padrão
-    try:
-        from PIL import ImageFont
-        font = ImageFont.load_default(size=11)
-    except (TypeError, AttributeError):
-        from PIL import ImageFont
-        font = ImageFont.load_default()
-
-    campos_pagina = [c for c in campos if c.get("pageNum") == page_idx]
     for i, campo in enumerate(campos_pagina):
         cor = CORES_CAMPOS[i % len(CORES_CAMPOS)]
         l  = int(campo["canvas_left"])
@@ -190,7 +366,12 @@ def renderizar_pagina_com_campos(
         label = f" [{campo['colName']}] "
         draw.text((l + 3, t + 2), label, fill=(*cor, 255), font=font)
 
-    img = Image.alpha_composite(img, overlay).convert("RGB")
+    # Compor apenas a região coberta pelos campos; o restante da página não muda
+    regiao = overlay.getbbox()
+    if regiao:
+        recorte = img.crop(regiao).convert("RGBA")
+        recorte = Image.alpha_composite(recorte, overlay.crop(regiao)).convert("RGB")
+        img.paste(recorte, regiao[:2])
     return img, zoom
 
 
@@ -198,7 +379,24 @@ def renderizar_pagina_com_campos(
 # QUEBRA DE TEXTO
 # ============================================================================
 
-_FONTNAME = "helv"   # Helvetica built-in — usado em insert_text e get_text_length
+_FONTNAME = "helv"   # Helvetica built-in — usado em insert_text e nas medições (Font.text_length)
+
+
+@lru_cache(maxsize=8)
+def _fonte(fontname: str) -> "fitz.Font":
+    """Objeto de fonte reaproveitado nas medições."""
+    return fitz.Font(fontname)
+
+
+@lru_cache(maxsize=65536)
+def _largura_palavra(palavra: str, fontname: str, font_size: float) -> float:
+    """
+    Largura de uma palavra (ou do espaço) em pontos, memoizada por (fonte, tamanho).
+
+    Mede com fitz.Font.text_length: em algumas versões do PyMuPDF,
+    fitz.get_text_length ignora um caractere a cada letra acentuada.
+    """
+    return _fonte(fontname).text_length(palavra, fontsize=font_size)
 
 
 def _quebrar_texto(
@@ -209,36 +407,157 @@ def _quebrar_texto(
     """
     Quebra um texto em linhas que cabem dentro de max_largura_pts.
 
-    Usa fitz.get_text_length para medir cada fragmento com precisão,
-    evitando a imprecisão do insert_textbox com tabelas de métricas incompletas.
+    Mede cada palavra com as métricas da fonte para ter precisão, evitando a
+    imprecisão do insert_textbox com tabelas de métricas incompletas.
 
     Palavras maiores que a largura máxima são inseridas na própria linha
     (sem truncar o conteúdo, apenas sem garantia de não ultrapassar).
+
+    Valores repetidos entre linhas da planilha (cidades, cursos, datas) são
+    quebrados uma única vez: o resultado fica em cache por (texto, largura, fonte).
+    """
+    return list(_quebrar_texto_cache(texto, max_largura_pts, font_size))
+
+
+@lru_cache(maxsize=8192)
+def _quebrar_texto_cache(
+    texto: str,
+    max_largura_pts: float,
+    font_size: float,
+) -> Tuple[str, ...]:
+    """
+    Implementação de _quebrar_texto.
+
+    A fonte Helvetica embutida não tem kerning, então a largura de uma linha é a
+    soma das larguras das palavras e dos espaços: cada palavra é medida uma vez
+    (_largura_palavra) e a largura da linha candidata é acumulada, em vez de
+    remedir a linha inteira a cada palavra.
     """
     palavras = texto.split()
     if not palavras:
-        return [texto]
+        return (texto,)
+
+    espaco = _largura_palavra(" ", _FONTNAME, font_size)
 
     linhas: List[str] = []
     linha_atual: List[str] = []
+    largura_atual = 0.0
 
     for palavra in palavras:
-        candidato = " ".join(linha_atual + [palavra])
-        largura = fitz.get_text_length(
-            candidato, fontname=_FONTNAME, fontsize=font_size
-        )
+        largura_palavra = _largura_palavra(palavra, _FONTNAME, font_size)
+        largura = largura_atual + espaco + largura_palavra if linha_atual else largura_palavra
         if largura <= max_largura_pts:
             linha_atual.append(palavra)
+            largura_atual = largura
         else:
             if linha_atual:
                 linhas.append(" ".join(linha_atual))
             # Palavra sozinha: insere mesmo se for mais larga que o campo
             linha_atual = [palavra]
+            largura_atual = largura_palavra
 
     if linha_atual:
         linhas.append(" ".join(linha_atual))
 
-    return linhas
+    return tuple(linhas)
+
+
+# ============================================================================
+# TEMPLATE COMPILADO
+# ============================================================================
+
+class CampoCompilado(NamedTuple):
+    """Geometria de um campo já convertida para pontos PDF da sua página."""
+    pagina: int
+    col_idx: int
+    nome_coluna: str
+    font_size: float
+    x0: float
+    y0: float
+    max_largura: float
+    max_altura: float
+    altura_linha: float
+    y_base: float
+
+
+class TemplateCompilado(NamedTuple):
+    """
+    Template pronto para preenchimento: bytes do PDF + campos compilados.
+
+    Só contém tipos simples, então pode ser enviado uma única vez a cada
+    processo do pool em gerar_zip.
+    """
+    pdf_bytes: bytes
+    n_paginas: int
+    campos: Tuple[CampoCompilado, ...]
+
+
+def compilar_template(
+    pdf_bytes: bytes,
+    campos: List[Dict],
+    headers: Optional[List[str]] = None,
+) -> TemplateCompilado:
+    """
+    Converte os campos mapeados (coordenadas de canvas) em coordenadas PDF.
+
+    Zoom de cada página, posição, largura/altura máximas, espaçamento entre
+    linhas e baseline da primeira linha dependem apenas do template e do
+    mapeamento, então são calculados aqui uma vez em vez de a cada linha da
+    planilha. Campos em páginas inexistentes são descartados (com aviso).
+
+    Args:
+        pdf_bytes: Bytes do PDF template
+        campos:    Lista de campos mapeados (gerada pela página Streamlit)
+        headers:   Nomes das colunas (para logging)
+
+    Returns:
+        TemplateCompilado para preencher_pdf / gerar_zip
+    """
+    headers = headers or []
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    try:
+        larguras_paginas = [page.rect.width for page in doc]
+    finally:
+        doc.close()
+
+    compilados: List[CampoCompilado] = []
+    for campo in campos:
+        page_idx = campo.get("pageNum", 0)
+        if page_idx >= len(larguras_paginas):
+            logger.warning(
+                "Página %d não existe no PDF (%d páginas)", page_idx, len(larguras_paginas)
+            )
+            continue
+
+        col_idx   = campo.get("colIndex", 0)
+        font_size = campo.get("fontSize", 10)
+
+        # Mesma fórmula de renderizar_pagina para garantir consistência
+        zoom = CANVAS_WIDTH / larguras_paginas[page_idx]
+
+        # Coordenadas canvas do retângulo do campo
+        cl = campo.get("canvas_left", 0)
+        ct = campo.get("canvas_top",  0)
+        cw = campo.get("canvas_width", 140)
+        ch = campo.get("canvas_height", font_size * 4)
+
+        y0 = ct / zoom
+        compilados.append(CampoCompilado(
+            pagina=page_idx,
+            col_idx=col_idx,
+            nome_coluna=str(headers[col_idx]) if col_idx < len(headers) else str(col_idx),
+            font_size=font_size,
+            x0=cl / zoom,
+            y0=y0,
+            max_largura=cw / zoom,
+            max_altura=ch / zoom,
+            # Espaçamento entre linhas: 1.3× o tamanho da fonte
+            altura_linha=font_size * 1.3,
+            # Baseline da primeira linha (fonte começa ligeiramente abaixo do topo)
+            y_base=y0 + font_size,
+        ))
+
+    return TemplateCompilado(pdf_bytes, len(larguras_paginas), tuple(compilados))
 
 
 # ============================================================================
@@ -250,11 +569,12 @@ def preencher_pdf(
     campos: List[Dict],
     row: List[str],
     headers: List[str],
+    template: Optional[TemplateCompilado] = None,
 ) -> bytes:
     """
     Preenche um PDF template com os valores de UMA linha da planilha.
 
-    O texto é quebrado manualmente usando fitz.get_text_length para garantir
+    O texto é quebrado manualmente medindo com fitz.Font.text_length para garantir
     que cada linha caiba exatamente dentro da largura do campo definido pelo
     usuário. Linhas que ultrapassam a altura do campo são silenciosamente
     descartadas (o texto não vaza para fora do retângulo).
@@ -264,148 +584,409 @@ def preencher_pdf(
         campos:    Lista de campos mapeados (gerada pela página Streamlit)
         row:       Linha de dados da planilha (lista de strings)
         headers:   Nomes das colunas (para logging)
+        template:  Resultado de compilar_template(pdf_bytes, campos, headers).
+                   Ao preencher muitas linhas, compile uma vez e repasse aqui;
+                   se omitido, o template é compilado nesta chamada.
 
     Returns:
         Bytes do PDF preenchido
     """
-    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    if template is None:
+        template = compilar_template(pdf_bytes, campos, headers)
+    return _preencher_compilado(template, row)
 
-    for campo in campos:
-        page_idx = campo.get("pageNum", 0)
-        if page_idx >= len(doc):
-            logger.warning("Página %d não existe no PDF (%d páginas)", page_idx, len(doc))
-            continue
 
-        col_idx = campo.get("colIndex", 0)
-        valor = str(row[col_idx]) if col_idx < len(row) else ""
-        if not valor.strip():
-            continue
+def _preencher_compilado(template: TemplateCompilado, row: List[str]) -> bytes:
+    """Abre o template, desenha os valores da linha e devolve os bytes do PDF."""
+    doc = fitz.open(stream=template.pdf_bytes, filetype="pdf")
+    _desenhar_campos(doc, template, row)
+    buf = BytesIO()
+    doc.save(buf)
+    doc.close()
+    return buf.getvalue()
 
-        page      = doc[page_idx]
-        font_size = campo.get("fontSize", 10)
 
-        # Recalcular zoom para converter coordenadas canvas → pontos PDF.
-        # Usa a mesma fórmula de renderizar_pagina para garantir consistência.
-        zoom = CANVAS_WIDTH / page.rect.width
+def _desenhar_campos(
+    doc,
+    template: TemplateCompilado,
+    row: List[str],
+    deslocamento: int = 0,
+) -> None:
+    """
+    Insere o texto de cada campo compilado nas páginas de `doc`.
 
-        # Coordenadas canvas do retângulo do campo
-        cl = campo.get("canvas_left", 0)
-        ct = campo.get("canvas_top",  0)
-        cw = campo.get("canvas_width", 140)
-        ch = campo.get("canvas_height", font_size * 4)
+    `deslocamento` é o índice em `doc` da primeira página do template (usado
+    quando várias cópias do template estão no mesmo documento).
+    """
+    for campo in template.campos:
+        col_idx = campo.col_idx
+        valor = str(row[col_idx]) if col_idx < len(row) else ""
+        if not valor.strip():
+            continue
 
-        # Dimensões em pontos PDF
-        x0          = cl / zoom
-        y0          = ct / zoom
-        max_largura = cw / zoom   # largura máxima em pontos
-        max_altura  = ch / zoom   # altura máxima em pontos
+        page = doc[deslocamento + campo.pagina]
 
         # Quebrar o texto em linhas que respeitam a largura do campo
-        linhas = _quebrar_texto(valor, max_largura, font_size)
-
-        # Espaçamento entre linhas: 1.3× o tamanho da fonte
-        altura_linha = font_size * 1.3
-
-        # y do baseline da primeira linha (fonte começa ligeiramente abaixo do topo)
-        y_base = y0 + font_size
+        linhas = _quebrar_texto(valor, campo.max_largura, campo.font_size)
 
         for i, linha in enumerate(linhas):
-            y = y_base + i * altura_linha
+            y = campo.y_base + i * campo.altura_linha
             # Parar se o baseline ultrapassar a altura do campo
-            if y > y0 + max_altura:
+            if y > campo.y0 + campo.max_altura:
                 logger.warning(
                     "Campo '%s': %d linha(s) truncada(s) por exceder a altura do campo",
-                    headers[col_idx] if col_idx < len(headers) else col_idx,
+                    campo.nome_coluna,
                     len(linhas) - i,
                 )
                 break
             page.insert_text(
-                fitz.Point(x0, y),
+                fitz.Point(campo.x0, y),
                 linha,
                 fontname=_FONTNAME,
-                fontsize=font_size,
+                fontsize=campo.font_size,
                 color=(0, 0, 0),
             )
 
         logger.debug(
             "Campo '%s' → '%s' | %d linha(s) | pág. %d | rect=(%.1f,%.1f,%.1f,%.1f)",
-            headers[col_idx] if col_idx < len(headers) else col_idx,
+            campo.nome_coluna,
             valor[:30],
             len(linhas),
-            page_idx + 1,
-            x0, y0, x0 + max_largura, y0 + max_altura,
+            campo.pagina + 1,
+            campo.x0, campo.y0,
+            campo.x0 + campo.max_largura, campo.y0 + campo.max_altura,
         )
 
-    buf = BytesIO()
-    doc.save(buf)
-    doc.close()
-    return buf.getvalue()
-
 
 def gerar_zip(
     pdf_bytes: bytes,
     campos: List[Dict],
-    rows: List[List[str]],
+    rows: Iterable[List[str]],
     headers: List[str],
     progress_callback=None,
     nome_pattern: str = "",
+    workers: int = 1,
+    total: Optional[int] = None,
 ) -> Tuple[bytes, int, int]:
     """
     Gera um arquivo ZIP com um PDF preenchido por linha da planilha.
 
+    Mantém o ZIP inteiro em memória; para lotes grandes prefira gerar_zip_em_disco.
+
     Args:
         pdf_bytes:         Bytes do PDF template
         campos:            Lista de campos mapeados
-        rows:              Todas as linhas de dados
+        rows:              Linhas de dados: lista ou iterador (ex.: iterar_planilha),
+                           consumido sob demanda durante a geração
         headers:           Nomes das colunas
         progress_callback: Função opcional f(idx, total, nome) para atualizar progresso
         nome_pattern:      Padrão para nomear cada PDF, ex: "Carta {Nome do Aluno}".
                            Referências {NomeDaColuna} são substituídas pelos valores
                            da linha. Se vazio, usa a primeira coluna como nome.
+        workers:           Número de processos para preencher os PDFs. 1 = serial;
+                           0 ou None = um por CPU. Os PDFs entram no ZIP na ordem
+                           das linhas em qualquer caso.
+        total:             Número de linhas repassado ao progress_callback; se
+                           omitido, usa len(rows) (None para iteradores).
 
     Returns:
         (zip_bytes, total_ok, total_erros)
     """
     buf = BytesIO()
+    total_ok, total_erros = _escrever_zip(
+        buf, zipfile.ZIP_DEFLATED, pdf_bytes, campos, rows, headers,
+        progress_callback, nome_pattern, workers, total,
+    )
+    return buf.getvalue(), total_ok, total_erros
+
+
+def gerar_zip_em_disco(
+    pdf_bytes: bytes,
+    campos: List[Dict],
+    rows: Iterable[List[str]],
+    headers: List[str],
+    progress_callback=None,
+    nome_pattern: str = "",
+    workers: int = 1,
+    compactar: bool = True,
+    destino: Optional[Path] = None,
+    total: Optional[int] = None,
+) -> Tuple[Path, int, int]:
+    """
+    Igual a gerar_zip, mas grava o ZIP direto em um arquivo.
+
+    Cada PDF é escrito no arquivo assim que fica pronto, então a memória usada
+    não cresce com o número de linhas.
+
+    Args:
+        compactar: Se False, usa ZIP_STORED (sem compressão). Economiza CPU;
+                   o ZIP fica maior porque o conteúdo dos PDFs é copiado como está.
+        destino:   Caminho do ZIP. Se omitido, cria um arquivo docfill_*.zip em
+                   TEMP_DIR; quem chama é responsável por removê-lo depois do uso.
+        (demais argumentos: ver gerar_zip)
+
+    Returns:
+        (caminho_zip, total_ok, total_erros)
+    """
+    if destino is None:
+        TEMP_DIR.mkdir(parents=True, exist_ok=True)
+        fd, nome = tempfile.mkstemp(prefix="docfill_", suffix=".zip", dir=TEMP_DIR)
+        os.close(fd)
+        destino = Path(nome)
+    destino = Path(destino)
+
+    compressao = zipfile.ZIP_DEFLATED if compactar else zipfile.ZIP_STORED
+    try:
+        with open(destino, "wb") as arquivo:
+            total_ok, total_erros = _escrever_zip(
+                arquivo, compressao, pdf_bytes, campos, rows, headers,
+                progress_callback, nome_pattern, workers, total,
+            )
+    except BaseException:
+        destino.unlink(missing_ok=True)
+        raise
+
+    return destino, total_ok, total_erros
+
+
+def gerar_pdf_unico(
+    pdf_bytes: bytes,
+    campos: List[Dict],
+    rows: Iterable[List[str]],
+    headers: List[str],
+    progress_callback=None,
+    nome_pattern: str = "",
+    destino: Optional[Path] = None,
+    total: Optional[int] = None,
+) -> Tuple[Path, int, int]:
+    """
+    Gera um único PDF com as páginas do template preenchidas para cada linha, em sequência.
+
+    Para gráficas: um arquivo só, em vez de milhares de PDFs pequenos. Cada linha
+    recebe uma cópia das páginas do template (insert_pdf) e o documento é salvo
+    com garbage=4 + deflate, que unifica fontes e imagens repetidas entre as
+    cópias; o resultado costuma ser bem menor que o ZIP equivalente.
+
+    Args:
+        nome_pattern: Usado apenas no texto do progress_callback e nos logs
+        destino:      Caminho do PDF. Se omitido, cria um arquivo docfill_*.pdf em
+                      TEMP_DIR; quem chama é responsável por removê-lo depois do uso.
+        (demais argumentos: ver gerar_zip)
+
+    Returns:
+        (caminho_pdf, total_ok, total_erros)
+    """
+    if destino is None:
+        TEMP_DIR.mkdir(parents=True, exist_ok=True)
+        fd, nome = tempfile.mkstemp(prefix="docfill_", suffix=".pdf", dir=TEMP_DIR)
+        os.close(fd)
+        destino = Path(nome)
+    destino = Path(destino)
+
+    template = compilar_template(pdf_bytes, campos, headers)
+    if total is None and hasattr(rows, "__len__"):
+        total = len(rows)
     total_ok = 0
     total_erros = 0
 
-    with zipfile.ZipFile(buf, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
-        for i, row in enumerate(rows):
-            # Resolver nome do arquivo para esta linha
-            if nome_pattern:
-                nome_base = _gerar_nome_arquivo(nome_pattern, row, headers, i)
-            else:
-                nome_base = _sanitize(str(row[0])) if row else f"documento_{i + 1}"
+    padrao_nome = _compilar_padrao_nome(nome_pattern, headers)
 
+    base = fitz.open(stream=pdf_bytes, filetype="pdf")
+    saida = fitz.open()
+    try:
+        for i, row in enumerate(rows):
+            nome_base = _nome_base(padrao_nome, row, i)
             if progress_callback:
-                progress_callback(i, len(rows), nome_base)
+                progress_callback(i, total, nome_base)
 
+            inicio = len(saida)
             try:
-                pdf_filled = preencher_pdf(pdf_bytes, campos, row, headers)
-                zf.writestr(f"{nome_base}.pdf", pdf_filled)
+                saida.insert_pdf(base)
+                _desenhar_campos(saida, template, row, deslocamento=inicio)
                 total_ok += 1
             except Exception as exc:
+                # Descarta as páginas parciais desta linha
+                if len(saida) > inicio:
+                    saida.delete_pages(inicio, len(saida) - 1)
                 logger.error("Erro no registro %d (%s): %s", i + 1, nome_base, exc)
                 total_erros += 1
 
+        if len(saida) == 0:
+            # PyMuPDF não salva documentos sem páginas
+            saida.new_page()
+        saida.save(str(destino), garbage=4, deflate=True)
+    except BaseException:
+        destino.unlink(missing_ok=True)
+        raise
+    finally:
+        saida.close()
+        base.close()
+
+    logger.info("PDF único gerado: %d OK, %d erros", total_ok, total_erros)
+    return destino, total_ok, total_erros
+
+
+def _escrever_zip(
+    arquivo,
+    compressao: int,
+    pdf_bytes: bytes,
+    campos: List[Dict],
+    rows: Iterable[List[str]],
+    headers: List[str],
+    progress_callback=None,
+    nome_pattern: str = "",
+    workers: int = 1,
+    total: Optional[int] = None,
+) -> Tuple[int, int]:
+    """Escreve em `arquivo` (caminho ou objeto binário) um ZIP com um PDF por linha."""
+    total_ok = 0
+    total_erros = 0
+    usados: set = set()
+
+    with zipfile.ZipFile(arquivo, mode="w", compression=compressao) as zf:
+        documentos = _gerar_documentos(
+            pdf_bytes, campos, rows, headers, progress_callback, nome_pattern, workers, total
+        )
+        for i, nome_base, pdf_filled, erro in documentos:
+            if erro is None:
+                zf.writestr(f"{_nome_unico(nome_base, usados)}.pdf", pdf_filled)
+                total_ok += 1
+            else:
+                logger.error("Erro no registro %d (%s): %s", i + 1, nome_base, erro)
+                total_erros += 1
+
     logger.info("Geração concluída: %d OK, %d erros", total_ok, total_erros)
-    return buf.getvalue(), total_ok, total_erros
+    return total_ok, total_erros
+
+
+def _gerar_documentos(
+    pdf_bytes: bytes,
+    campos: List[Dict],
+    rows: Iterable[List[str]],
+    headers: List[str],
+    progress_callback=None,
+    nome_pattern: str = "",
+    workers: int = 1,
+    total: Optional[int] = None,
+    pular: Optional[Callable[[int, List[str]], bool]] = None,
+    template: Optional[TemplateCompilado] = None,
+) -> Iterator[Tuple[int, str, Optional[bytes], Optional[str]]]:
+    """
+    Preenche um PDF por linha e devolve (idx, nome_base, pdf_bytes, erro) na ordem das linhas.
+
+    O template é compilado uma vez (compilar_template), a menos que já venha compilado. Com workers > 1 as linhas
+    são divididas em lotes de LOTE_PARALELO e distribuídas num ProcessPoolExecutor.
+    Cada processo recebe o template compilado uma única vez (no inicializador) e
+    só as linhas trafegam por tarefa. No máximo 2 lotes por processo
+    ficam em andamento, então `rows` pode ser um iterador sem carregar tudo em memória.
+
+    progress_callback(idx, total, nome) é chamado uma vez por linha, em ordem.
+    Linhas para as quais pular(idx, row) é verdadeiro não são geradas nem devolvidas
+    (usado para retomar trabalhos interrompidos, ver jobs.py).
+    """
+    if total is None and hasattr(rows, "__len__"):
+        total = len(rows)
+    workers = workers if workers else (os.cpu_count() or 1)
+    if template is None:
+        template = compilar_template(pdf_bytes, campos, headers)
+    padrao_nome = _compilar_padrao_nome(nome_pattern, headers)
+
+    def _nome(i: int, row: List[str]) -> str:
+        return _nome_base(padrao_nome, row, i)
+
+    if workers <= 1:
+        for i, row in enumerate(rows):
+            if pular and pular(i, row):
+                continue
+            nome_base = _nome(i, row)
+            if progress_callback:
+                progress_callback(i, total, nome_base)
+            try:
+                yield i, nome_base, _preencher_compilado(template, row), None
+            except Exception as exc:
+                yield i, nome_base, None, str(exc)
+        return
+
+    def _drenar(lote: List[Tuple[int, str]], futuro) -> Iterator:
+        for (i, nome_base), (pdf_filled, erro) in zip(lote, futuro.result()):
+            if progress_callback:
+                progress_callback(i, total, nome_base)
+            yield i, nome_base, pdf_filled, erro
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_iniciar_worker,
+        initargs=(template,),
+    ) as pool:
+        pendentes = deque()
+        lote_ids: List[Tuple[int, str]] = []
+        lote_rows: List[List[str]] = []
+
+        for i, row in enumerate(rows):
+            if pular and pular(i, row):
+                continue
+            lote_ids.append((i, _nome(i, row)))
+            lote_rows.append(row)
+            if len(lote_rows) < LOTE_PARALELO:
+                continue
+            pendentes.append((lote_ids, pool.submit(_preencher_lote, lote_rows)))
+            lote_ids, lote_rows = [], []
+            while len(pendentes) >= 2 * workers:
+                yield from _drenar(*pendentes.popleft())
+
+        if lote_rows:
+            pendentes.append((lote_ids, pool.submit(_preencher_lote, lote_rows)))
+        while pendentes:
+            yield from _drenar(*pendentes.popleft())
+
+
+# ----------------------------------------------------------------------------
+# Funções executadas nos processos do pool (precisam ser de nível de módulo)
+# ----------------------------------------------------------------------------
+
+_WORKER_TEMPLATE: Dict[str, TemplateCompilado] = {}
+
+
+def _iniciar_worker(template: TemplateCompilado) -> None:
+    """Recebe o template compilado uma vez por processo do pool."""
+    _WORKER_TEMPLATE["template"] = template
+
+
+def _preencher_lote(rows: List[List[str]]) -> List[Tuple[Optional[bytes], Optional[str]]]:
+    """Preenche um lote de linhas no processo do pool; erros voltam como texto."""
+    resultados = []
+    for row in rows:
+        try:
+            pdf_filled = _preencher_compilado(_WORKER_TEMPLATE["template"], row)
+            resultados.append((pdf_filled, None))
+        except Exception as exc:
+            resultados.append((None, str(exc)))
+    return resultados
 
 
 # ============================================================================
 # UTILIDADES
 # ============================================================================
 
+def _nome_base(padrao_nome: Optional[Tuple[Any, ...]], row: List[str], idx: int) -> str:
+    """
+    Nome do PDF de uma linha (sem extensão): padrão informado ou 1ª coluna.
+
+    padrao_nome vem de _compilar_padrao_nome, chamado uma vez por geração.
+    """
+    if padrao_nome is not None:
+        return _gerar_nome_arquivo(padrao_nome, row, idx)
+    return _sanitize(str(row[0])) if row else f"documento_{idx + 1}"
+
+
 def _sanitize(s: str) -> str:
     """Remove caracteres inválidos para nomes de arquivo."""
     return re.sub(r'[\/\\?%*:|"<>]', "_", s)[:80].strip()
 
 
 def _gerar_nome_arquivo(
-    pattern: str,
+    segmentos: Tuple[Any, ...],
     row: List[str],
-    headers: List[str],
     idx: int,
 ) -> str:
     """
@@ -419,13 +1000,66 @@ def _gerar_nome_arquivo(
 
     Qualquer coluna pode ser referenciada com {NomeExatoDaColunaNoHeader}.
     Se o resultado final ficar vazio, usa "documento_<idx+1>" como fallback.
+
+    `segmentos` é o padrão já compilado por _compilar_padrao_nome (uma vez por
+    geração); por linha só as colunas referenciadas são lidas.
     """
-    nome = pattern
-    for i, header in enumerate(headers):
-        valor = row[i] if i < len(row) else ""
-        nome = nome.replace(f"{{{header}}}", valor)
+    partes = []
+    for segmento in segmentos:
+        if isinstance(segmento, int):
+            partes.append(row[segmento] if segmento < len(row) else "")
+        else:
+            partes.append(segmento)
     # Remover espaços extras e aplicar sanitização
-    nome = nome.strip()
+    nome = "".join(partes).strip()
     if not nome:
         nome = f"documento_{idx + 1}"
     return _sanitize(nome)
+
+
+def _compilar_padrao_nome(pattern: str, headers: List[str]) -> Optional[Tuple[Any, ...]]:
+    """
+    Divide o padrão em segmentos: textos fixos (str) e referências a colunas (int).
+
+    Colunas com nome repetido apontam para a primeira ocorrência, e {X} sem
+    coluna correspondente fica como texto, como na substituição original.
+    Padrão vazio devolve None (os PDFs são nomeados pela 1ª coluna).
+    """
+    if not pattern:
+        return None
+    indices: Dict[str, int] = {}
+    for i, header in enumerate(headers):
+        indices.setdefault(header, i)
+    if not indices:
+        return (pattern,)
+
+    # Nomes mais longos primeiro: "{Nome do Aluno}" não é confundido com "{Nome}"
+    referencia = re.compile(
+        r"\{(" + "|".join(re.escape(h) for h in sorted(indices, key=len, reverse=True)) + r")\}"
+    )
+    segmentos: List[Any] = []
+    inicio = 0
+    for m in referencia.finditer(pattern):
+        if m.start() > inicio:
+            segmentos.append(pattern[inicio:m.start()])
+        segmentos.append(indices[m.group(1)])
+        inicio = m.end()
+    if inicio < len(pattern):
+        segmentos.append(pattern[inicio:])
+    return tuple(segmentos)
+
+
+def _nome_unico(nome: str, usados: set) -> str:
+    """
+    Garante nomes distintos no mesmo ZIP: "Carta Ana", "Carta Ana (2)", ...
+
+    A comparação ignora maiúsculas/minúsculas (sistemas de arquivos do Windows
+    e macOS não distinguem). `usados` é atualizado com o nome escolhido.
+    """
+    candidato = nome
+    n = 1
+    while candidato.lower() in usados:
+        n += 1
+        candidato = f"{nome} ({n})"
+    usados.add(candidato.lower())
+    return candidato
@@ -0,0 +1,470 @@
+# -*- coding: utf-8 -*-
+"""
+Griffe Hub - DocFill
+Trabalhos de geração retomáveis.
+
+Um trabalho guarda em disco tudo o que a geração precisa (template, planilha,
+mapeamento e padrão de nome) e um manifesto com as linhas já concluídas. Se a
+sessão Streamlit cair no meio de um lote grande, o trabalho pode ser retomado
+(inclusive em outra sessão) e só as linhas restantes são geradas.
+
+ESTRUTURA EM DISCO (PROCESSED_DIR/docfill/jobs/<job_id>/):
+    manifesto.json     status, {linha: nome do arquivo}, {linha: chave} e erros
+    entrada/           template.pdf, planilha e config.json (campos, padrão de nome)
+
+Quando o trabalho termina, o template e a planilha são apagados (só o
+config.json fica): o ZIP é montado a partir do armazém. Gerar de novo com os
+mesmos arquivos reabre o trabalho e regrava as entradas. limpar_jobs remove
+por idade os trabalhos que ninguém retomou.
+
+Os PDFs ficam no armazém endereçado por conteúdo (armazem.py), compartilhado
+entre trabalhos: numa planilha corrigida, as linhas que não mudaram são
+reaproveitadas de gerações anteriores em vez de preenchidas de novo.
+
+O id do trabalho é um hash das entradas: gerar de novo com os mesmos arquivos e
+mapeamento reabre o mesmo trabalho em vez de começar do zero.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from shared.configuracao import PROCESSED_DIR
+from shared.utils import gravar_atomico
+
+from .armazem import ArmazemPDFs, colunas_template, impressao_digital_template
+from .filler import (
+    TEMP_DIR,
+    _gerar_documentos,
+    _compilar_padrao_nome,
+    _nome_base,
+    _nome_unico,
+    compilar_template,
+    iterar_planilha,
+    setup_logger,
+)
+
+logger = setup_logger(__name__)
+
+# Pasta padrão dos trabalhos
+JOBS_DIR = PROCESSED_DIR / "docfill" / "jobs"
+
+# O manifesto é regravado a cada CHECKPOINT_LINHAS linhas processadas
+CHECKPOINT_LINHAS: int = 50
+
+STATUS_EM_ANDAMENTO = "em_andamento"
+STATUS_CONCLUIDO = "concluido"
+
+# Trabalhos em execução neste processo (sessões Streamlit compartilham o processo)
+_em_execucao: set = set()
+_em_execucao_lock = threading.Lock()
+
+
+def calcular_job_id(
+    pdf_bytes: bytes,
+    campos: List[Dict],
+    sheet_bytes: bytes,
+    nome_pattern: str = "",
+) -> str:
+    """Id do trabalho: hash do template, da planilha, do mapeamento e do padrão de nome."""
+    h = hashlib.sha256()
+    for parte in (
+        pdf_bytes,
+        sheet_bytes,
+        json.dumps(campos, sort_keys=True, default=str).encode("utf-8"),
+        nome_pattern.encode("utf-8"),
+    ):
+        h.update(hashlib.sha256(parte).digest())
+    return h.hexdigest()[:16]
+
+
+class JobDocFill:
+    """
+    Trabalho de geração DocFill persistido em disco.
+
+    Uso:
+        job = JobDocFill.criar(pdf_bytes, campos, sheet_bytes, "dados.xlsx", nome_pattern)
+        ok, erros = job.executar(progress_callback=cb, workers=2)
+        caminho_zip = job.montar_zip()
+    """
+
+    def __init__(self, diretorio: Path, armazem: Optional[ArmazemPDFs] = None):
+        self.diretorio = Path(diretorio)
+        self.armazem = armazem or ArmazemPDFs()
+        self.manifesto: Dict = json.loads(
+            (self.diretorio / "manifesto.json").read_text(encoding="utf-8")
+        )
+
+    # ------------------------------------------------------------------
+    # Criação / abertura
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def criar(
+        cls,
+        pdf_bytes: bytes,
+        campos: List[Dict],
+        sheet_bytes: bytes,
+        sheet_name: str,
+        nome_pattern: str = "",
+        pdf_name: str = "",
+        diretorio_base: Optional[Path] = None,
+        armazem: Optional[ArmazemPDFs] = None,
+    ) -> "JobDocFill":
+        """
+        Cria o trabalho em disco, ou reabre o existente com as mesmas entradas.
+
+        Args:
+            pdf_bytes:      Bytes do PDF template
+            campos:         Lista de campos mapeados
+            sheet_bytes:    Bytes da planilha
+            sheet_name:     Nome original da planilha (define o formato)
+            nome_pattern:   Padrão de nome dos PDFs (ver gerar_zip)
+            pdf_name:       Nome original do template (apenas para exibição)
+            diretorio_base: Pasta dos trabalhos (padrão: JOBS_DIR)
+            armazem:        Armazém de PDFs (padrão: ArmazemPDFs())
+        """
+        base = Path(diretorio_base or JOBS_DIR)
+        job_id = calcular_job_id(pdf_bytes, campos, sheet_bytes, nome_pattern)
+        diretorio = base / job_id
+        if (diretorio / "manifesto.json").exists():
+            logger.info("Reabrindo trabalho %s", job_id)
+            job = cls(diretorio, armazem)
+            job._restaurar_entradas(pdf_bytes, sheet_bytes)
+            return job
+
+        headers, linhas = iterar_planilha(sheet_bytes, sheet_name)
+        total = sum(1 for _ in linhas)
+
+        entrada = diretorio / "entrada"
+        entrada.mkdir(parents=True, exist_ok=True)
+        extensao = Path(sheet_name).suffix.lower() or ".xlsx"
+        gravar_atomico(entrada / "template.pdf", pdf_bytes)
+        gravar_atomico(entrada / f"planilha{extensao}", sheet_bytes)
+        config = {"campos": campos, "headers": headers, "nome_pattern": nome_pattern}
+        gravar_atomico(
+            entrada / "config.json",
+            json.dumps(config, ensure_ascii=False, default=str).encode("utf-8"),
+        )
+
+        agora = datetime.now().isoformat(timespec="seconds")
+        manifesto = {
+            "id": job_id,
+            "criado_em": agora,
+            "atualizado_em": agora,
+            "status": STATUS_EM_ANDAMENTO,
+            "pdf_nome": pdf_name,
+            "planilha_nome": sheet_name,
+            "planilha_arquivo": f"planilha{extensao}",
+            "total": total,
+            "concluidos": {},
+            "chaves": {},
+            "erros": {},
+            "reaproveitados": 0,
+        }
+        gravar_atomico(
+            diretorio / "manifesto.json",
+            json.dumps(manifesto, ensure_ascii=False).encode("utf-8"),
+        )
+        logger.info("Trabalho %s criado: %d linhas", job_id, total)
+        return cls(diretorio, armazem)
+
+    @classmethod
+    def abrir(
+        cls,
+        job_id: str,
+        diretorio_base: Optional[Path] = None,
+        armazem: Optional[ArmazemPDFs] = None,
+    ) -> "JobDocFill":
+        """Abre um trabalho existente pelo id."""
+        diretorio = Path(diretorio_base or JOBS_DIR) / job_id
+        if not (diretorio / "manifesto.json").exists():
+            raise FileNotFoundError(f"Trabalho não encontrado: {job_id}")
+        return cls(diretorio, armazem)
+
+    # ------------------------------------------------------------------
+    # Estado
+    # ------------------------------------------------------------------
+
+    @property
+    def id(self) -> str:
+        return self.manifesto["id"]
+
+    @property
+    def total(self) -> int:
+        return self.manifesto["total"]
+
+    @property
+    def concluidos(self) -> int:
+        return len(self.manifesto["concluidos"])
+
+    @property
+    def finalizado(self) -> bool:
+        return self.manifesto["status"] == STATUS_CONCLUIDO
+
+    @property
+    def entradas_disponiveis(self) -> bool:
+        """False depois que o trabalho terminou e o template e a planilha foram apagados."""
+        return not self.manifesto.get("entradas_removidas", False)
+
+    def _remover_entradas(self) -> None:
+        """Apaga template e planilha (config.json fica): o ZIP sai do armazém."""
+        entrada = self.diretorio / "entrada"
+        (entrada / "template.pdf").unlink(missing_ok=True)
+        (entrada / self.manifesto["planilha_arquivo"]).unlink(missing_ok=True)
+        self.manifesto["entradas_removidas"] = True
+
+    def _restaurar_entradas(self, pdf_bytes: bytes, sheet_bytes: bytes) -> None:
+        """Regrava as entradas apagadas ao terminar (mesmo id = mesmos bytes)."""
+        if self.entradas_disponiveis:
+            return
+        entrada = self.diretorio / "entrada"
+        gravar_atomico(entrada / "template.pdf", pdf_bytes)
+        gravar_atomico(entrada / self.manifesto["planilha_arquivo"], sheet_bytes)
+        self.manifesto["entradas_removidas"] = False
+        self._salvar_manifesto()
+
+    def _salvar_manifesto(self) -> None:
+        self.manifesto["atualizado_em"] = datetime.now().isoformat(timespec="seconds")
+        gravar_atomico(
+            self.diretorio / "manifesto.json",
+            json.dumps(self.manifesto, ensure_ascii=False).encode("utf-8"),
+        )
+
+    # ------------------------------------------------------------------
+    # Execução
+    # ------------------------------------------------------------------
+
+    def executar(
+        self,
+        progress_callback=None,
+        workers: int = 1,
+        reaproveitar: bool = True,
+    ) -> Tuple[int, int]:
+        """
+        Gera os PDFs das linhas ainda não concluídas.
+
+        Linhas já concluídas (no manifesto e com o PDF no armazém) são puladas;
+        linhas que deram erro são tentadas de novo. O manifesto é salvo a cada
+        CHECKPOINT_LINHAS linhas e ao final, mesmo se a geração for interrompida
+        por exceção.
+
+        Args:
+            progress_callback: f(idx, total, nome), chamado para as linhas geradas
+            workers:           Processos em paralelo (ver gerar_zip)
+            reaproveitar:      Se True, linhas cujo PDF já está no armazém (mesmo
+                               template, mesmos valores) não são geradas de novo
+
+        Returns:
+            (total_concluidos, total_erros) considerando todo o trabalho
+        """
+        with _em_execucao_lock:
+            if self.id in _em_execucao:
+                raise RuntimeError(f"O trabalho {self.id} já está em execução")
+            _em_execucao.add(self.id)
+
+        try:
+            return self._executar(progress_callback, workers, reaproveitar)
+        finally:
+            with _em_execucao_lock:
+                _em_execucao.discard(self.id)
+
+    def _executar(self, progress_callback, workers: int, reaproveitar: bool) -> Tuple[int, int]:
+        if not self.entradas_disponiveis:
+            raise FileNotFoundError(
+                f"O trabalho {self.id} já terminou e suas entradas foram apagadas; "
+                "gere de novo com os mesmos arquivos para reabri-lo"
+            )
+        entrada = self.diretorio / "entrada"
+        config = json.loads((entrada / "config.json").read_text(encoding="utf-8"))
+        pdf_bytes = (entrada / "template.pdf").read_bytes()
+        sheet_bytes = (entrada / self.manifesto["planilha_arquivo"]).read_bytes()
+        headers = config["headers"]
+        nome_pattern = config["nome_pattern"]
+        padrao_nome = _compilar_padrao_nome(nome_pattern, headers)
+        _, linhas = iterar_planilha(sheet_bytes, self.manifesto["planilha_arquivo"])
+
+        template = compilar_template(pdf_bytes, config["campos"], headers)
+        impressao = impressao_digital_template(template)
+        colunas = colunas_template(template)
+
+        concluidos: Dict[str, str] = self.manifesto["concluidos"]
+        chaves: Dict[str, str] = self.manifesto["chaves"]
+        erros: Dict[str, str] = self.manifesto["erros"]
+        retomados = len(concluidos)
+        reaproveitados = 0
+        # Chaves das linhas enviadas para geração, até o resultado voltar
+        chaves_pendentes: Dict[int, str] = {}
+
+        def _pular(i: int, row: List[str]) -> bool:
+            nonlocal reaproveitados
+            chave_linha = str(i)
+            if chave_linha in concluidos and self.armazem.contem(chaves.get(chave_linha)):
+                return True
+            concluidos.pop(chave_linha, None)
+
+            chave = ArmazemPDFs.chave(impressao, [row[c] if c < len(row) else "" for c in colunas])
+            if reaproveitar and self.armazem.contem(chave):
+                concluidos[chave_linha] = _nome_base(padrao_nome, row, i)
+                chaves[chave_linha] = chave
+                erros.pop(chave_linha, None)
+                reaproveitados += 1
+                return True
+            chaves_pendentes[i] = chave
+            return False
+
+        documentos = _gerar_documentos(
+            pdf_bytes,
+            config["campos"],
+            linhas,
+            headers,
+            progress_callback,
+            nome_pattern,
+            workers,
+            self.total,
+            pular=_pular,
+            template=template,
+        )
+
+        processadas = 0
+        try:
+            for i, nome_base, pdf_filled, erro in documentos:
+                chave_linha = str(i)
+                chave = chaves_pendentes.pop(i)
+                if erro is None:
+                    self.armazem.guardar(chave, pdf_filled)
+                    concluidos[chave_linha] = nome_base
+                    chaves[chave_linha] = chave
+                    erros.pop(chave_linha, None)
+                else:
+                    logger.error("Erro no registro %d (%s): %s", i + 1, nome_base, erro)
+                    erros[chave_linha] = erro
+                processadas += 1
+                if processadas % CHECKPOINT_LINHAS == 0:
+                    self._salvar_manifesto()
+
+            self.manifesto["status"] = (
+                STATUS_CONCLUIDO if len(concluidos) == self.total else STATUS_EM_ANDAMENTO
+            )
+            if self.finalizado:
+                self._remover_entradas()
+        finally:
+            self.manifesto["reaproveitados"] = reaproveitados
+            self._salvar_manifesto()
+
+        logger.info(
+            "Trabalho %s: %d OK, %d erros (%d já concluídas, %d reaproveitadas do armazém, "
+            "%d geradas nesta execução)",
+            self.id, len(concluidos), len(erros),
+            retomados, reaproveitados, processadas,
+        )
+        return len(concluidos), len(erros)
+
+    def montar_zip(self, destino: Optional[Path] = None, compactar: bool = True) -> Path:
+        """
+        Monta o ZIP com os PDFs concluídos (lidos do armazém), na ordem das linhas.
+
+        Args:
+            destino:   Caminho do ZIP. Se omitido, cria docfill_*.zip em TEMP_DIR;
+                       quem chama é responsável por removê-lo depois do uso.
+            compactar: Se False, usa ZIP_STORED (ver gerar_zip_em_disco)
+        """
+        if destino is None:
+            TEMP_DIR.mkdir(parents=True, exist_ok=True)
+            fd, nome = tempfile.mkstemp(prefix="docfill_", suffix=".zip", dir=TEMP_DIR)
+            os.close(fd)
+            destino = Path(nome)
+        destino = Path(destino)
+
+        compressao = zipfile.ZIP_DEFLATED if compactar else zipfile.ZIP_STORED
+        concluidos = self.manifesto["concluidos"]
+        chaves = self.manifesto["chaves"]
+        usados: set = set()
+        try:
+            with zipfile.ZipFile(destino, mode="w", compression=compressao) as zf:
+                for idx in sorted(concluidos, key=int):
+                    caminho = self.armazem.caminho(chaves[idx])
+                    if not caminho.exists():
+                        raise FileNotFoundError(
+                            f"PDF da linha {int(idx) + 1} não está mais no armazém; "
+                            "gere de novo com os mesmos arquivos para regerá-lo"
+                        )
+                    zf.write(caminho, arcname=f"{_nome_unico(concluidos[idx], usados)}.pdf")
+        except BaseException:
+            destino.unlink(missing_ok=True)
+            raise
+        return destino
+
+
+# ============================================================================
+# GERENCIAMENTO
+# ============================================================================
+
+def listar_jobs(diretorio_base: Optional[Path] = None) -> List[Dict]:
+    """
+    Lista os manifestos dos trabalhos salvos, do mais recente para o mais antigo.
+
+    Cada item traz também 'concluidos_n' e 'erros_n' (as listas completas de
+    linhas ficam fora para a listagem ser leve).
+    """
+    base = Path(diretorio_base or JOBS_DIR)
+    if not base.exists():
+        return []
+
+    jobs = []
+    for caminho in base.glob("*/manifesto.json"):
+        try:
+            manifesto = json.loads(caminho.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        manifesto["concluidos_n"] = len(manifesto.pop("concluidos", {}))
+        manifesto["erros_n"] = len(manifesto.pop("erros", {}))
+        manifesto.pop("chaves", None)
+        jobs.append(manifesto)
+
+    return sorted(jobs, key=lambda m: m.get("atualizado_em", ""), reverse=True)
+
+
+def remover_job(job_id: str, diretorio_base: Optional[Path] = None) -> None:
+    """
+    Apaga o trabalho (manifesto e entradas).
+
+    Os PDFs continuam no armazém, onde podem ser reaproveitados por outros
+    trabalhos; use ArmazemPDFs.limpar para removê-los por idade.
+    """
+    with _em_execucao_lock:
+        if job_id in _em_execucao:
+            raise RuntimeError(f"O trabalho {job_id} está em execução")
+    diretorio = Path(diretorio_base or JOBS_DIR) / job_id
+    if diretorio.exists():
+        shutil.rmtree(diretorio)
+
+
+def limpar_jobs(max_idade_dias: float = 30, diretorio_base: Optional[Path] = None) -> int:
+    """
+    Remove os trabalhos não atualizados há mais de max_idade_dias (concluídos
+    ou interrompidos), exceto os em execução. Retorna quantos foram removidos.
+    """
+    base = Path(diretorio_base or JOBS_DIR)
+    if not base.exists():
+        return 0
+
+    limite = time.time() - max_idade_dias * 86400
+    removidos = 0
+    for caminho in base.glob("*/manifesto.json"):
+        try:
+            if caminho.stat().st_mtime >= limite:
+                continue
+            remover_job(caminho.parent.name, base)
+        except (OSError, RuntimeError):
+            continue
+        removidos += 1
+    return removidos
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+Griffe Hub - Sistema de Passaportes
+Benchmark de ProcessadorDados.normalizar sobre uma planilha sintética de
+solicitantes.
+
+Compara a versão original (apply com lambdas e normalizar_nome com re.sub
+recompilado por célula) com a atual (transformar_texto_serie: máscara de
+ausentes e conversão por coluna, padrões pré-compilados e uma passada por
+valor), e confere que o resultado é idêntico (valores, tipos e ausentes).
+
+Uso (a partir da raiz do projeto):
+    python backend/passaportes/benchmark.py
+"""
+
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from backend.passaportes.data_processor import ProcessadorDados  # noqa: E402
+
+_PRENOMES = "Ana Bruno Cláudia Débora Érica Fábio Gonçalo Íris João Lúcia Márcio Otávio".split()
+_SOBRENOMES = "Silva Souza Conceição Gonçalves Araújo Simões D'Ávila Brandão Lima Pereira-Neto".split()
+_RUIDOS = ["", " ", "  ", ".", "-", "1", "(", "@", "\t", "º"]
+
+
+def gerar_planilha(n_linhas: int = 100000, seed: int = 42) -> pd.DataFrame:
+    """
+    Planilha de solicitantes com os problemas das planilhas reais: nomes em
+    caixa mista com pontuação e espaços sobrando, CPF/telefone/CEP com e sem
+    máscara (alguns lidos como número) e células vazias.
+    """
+    rng = random.Random(seed)
+
+    def nome():
+        if rng.random() < 0.03:
+            return np.nan
+        partes = [rng.choice(_PRENOMES)] + rng.sample(_SOBRENOMES, rng.randint(1, 3))
+        texto = " ".join(partes)
+        if rng.random() < 0.5:
+            texto = texto.lower() if rng.random() < 0.5 else texto.upper()
+        return rng.choice(_RUIDOS) + texto + rng.choice(_RUIDOS)
+
+    def cpf():
+        sorteio = rng.random()
+        digitos = f"{rng.randrange(10 ** 11):011d}"
+        if sorteio < 0.05:
+            return np.nan
+        if sorteio < 0.15:
+            return int(digitos)
+        if sorteio < 0.6:
+            return f"{digitos[:3]}.{digitos[3:6]}.{digitos[6:9]}-{digitos[9:]}"
+        return f" {digitos} " if sorteio < 0.65 else digitos
+
+    def telefone():
+        if rng.random() < 0.05:
+            return np.nan
+        ddd, numero = rng.randint(11, 99), rng.randrange(10 ** 9)
+        return rng.choice([
+            f"({ddd}) {numero // 10000:05d}-{numero % 10000:04d}",
+            f"{ddd}{numero:09d}",
+            f" {ddd} {numero:09d} ",
+        ])
+
+    def cep():
+        if rng.random() < 0.05:
+            return np.nan
+        numero = rng.randrange(10 ** 8)
+        return f"{numero // 1000:05d}-{numero % 1000:03d}" if rng.random() < 0.7 else f"{numero:08d}"
+
+    return pd.DataFrame({
+        'Nome': [nome() for _ in range(n_linhas)],
+        'CPF': [cpf() for _ in range(n_linhas)],
+        'Data_Nascimento': ['01/02/2008'] * n_linhas,
+        'Mae': [nome() for _ in range(n_linhas)],
+        'Pai': [nome() for _ in range(n_linhas)],
+        'Email': [f"solicitante{i}@exemplo.com" for i in range(n_linhas)],
+        'Telefone': [telefone() for _ in range(n_linhas)],
+        'CEP': [cep() for _ in range(n_linhas)],
+        'Cidade': ['São Paulo'] * n_linhas,
+        'UF': ['SP'] * n_linhas,
+    })
+
+
+def _normalizar_nome_original(nome: str) -> str:
+    """Versão anterior de normalizar_nome, mantida apenas como referência."""
+    if not nome:
+        return ""
+    nome = re.sub(r"[^A-ZÁÉÍÓÚÂÊÔÃÕÇ/\s\-']", "", nome, flags=re.IGNORECASE)
+    nome = re.sub(r"\s+", " ", nome).strip() if nome else nome
+    nome = nome.strip("-").strip()
+    return nome.upper()
+
+
+def _normalizar_original(processador: ProcessadorDados, df: pd.DataFrame) -> pd.DataFrame:
+    """Versão anterior de ProcessadorDados.normalizar, mantida apenas como referência."""
+    df_norm = pd.DataFrame()
+    for campo in processador.mapeamento_colunas.keys():
+        coluna_origem = processador.identificar_coluna(df.columns.tolist(), campo)
+        df_norm[campo] = df[coluna_origem] if coluna_origem else None
+
+    for campo in ['nome', 'nome_mae', 'nome_pai']:
+        df_norm[campo] = df_norm[campo].apply(
+            lambda x: _normalizar_nome_original(str(x)) if pd.notna(x) else x
+        )
+    df_norm['cpf'] = df_norm['cpf'].apply(
+        lambda x: str(x).replace('.', '').replace('-', '').strip() if pd.notna(x) else x
+    )
+    df_norm['telefone'] = df_norm['telefone'].apply(
+        lambda x: str(x).replace('(', '').replace(')', '').replace('-', '').replace(' ', '').strip()
+        if pd.notna(x) else x
+    )
+    df_norm['cep'] = df_norm['cep'].apply(
+        lambda x: str(x).replace('-', '').strip() if pd.notna(x) else x
+    )
+    return df_norm
+
+
+def executar_normalizacao(n_linhas: int = 100000) -> None:
+    df = gerar_planilha(n_linhas)
+    processador = ProcessadorDados()
+
+    inicio = time.perf_counter()
+    original = _normalizar_original(processador, df)
+    t_original = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    atual = processador.normalizar(df)
+    t_atual = time.perf_counter() - inicio
+
+    pd.testing.assert_frame_equal(original, atual)
+
+    print(f"{n_linhas} solicitantes")
+    print(f"  apply + lambdas:   {t_original * 1000:8.1f} ms")
+    print(f"  por coluna:        {t_atual * 1000:8.1f} ms  ({t_original / t_atual:.1f}x)")
+
+
+if __name__ == "__main__":
+    executar_normalizacao()
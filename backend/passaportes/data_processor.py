@@ -5,7 +5,7 @@ Griffe Hub - Processador de Dados de Passaportes
 
 import pandas as pd
 from typing import Dict, List
-from backend.shared.utils import setup_logger, normalizar_nome
+from backend.shared.utils import setup_logger, normalizar_nomes_serie, transformar_texto_serie
 
 logger = setup_logger(__name__)
 
@@ -80,38 +80,29 @@ class ProcessadorDados:
                 logger.debug(f"Campo '{campo}' não encontrado")
         
         # Normalizar nomes
-        if 'nome' in df_norm.columns:
-            df_norm['nome'] = df_norm['nome'].apply(
-                lambda x: normalizar_nome(str(x)) if pd.notna(x) else x
-            )
-        
-        if 'nome_mae' in df_norm.columns:
-            df_norm['nome_mae'] = df_norm['nome_mae'].apply(
-                lambda x: normalizar_nome(str(x)) if pd.notna(x) else x
-            )
-        
-        if 'nome_pai' in df_norm.columns:
-            df_norm['nome_pai'] = df_norm['nome_pai'].apply(
-                lambda x: normalizar_nome(str(x)) if pd.notna(x) else x
-            )
+        for campo_nome in ['nome', 'nome_mae', 'nome_pai']:
+            if campo_nome in df_norm.columns:
+                df_norm[campo_nome] = normalizar_nomes_serie(df_norm[campo_nome])
         
         # Normalizar CPF (remover pontuação)
         if 'cpf' in df_norm.columns:
-            df_norm['cpf'] = df_norm['cpf'].apply(
-                lambda x: str(x).replace('.', '').replace('-', '').strip() if pd.notna(x) else x
+            df_norm['cpf'] = transformar_texto_serie(
+                df_norm['cpf'],
+                lambda x: x.replace('.', '').replace('-', '').strip()
             )
         
         # Normalizar telefone
         if 'telefone' in df_norm.columns:
-            df_norm['telefone'] = df_norm['telefone'].apply(
-                lambda x: str(x).replace('(', '').replace(')', '').replace('-', '').replace(' ', '').strip() 
-                if pd.notna(x) else x
+            df_norm['telefone'] = transformar_texto_serie(
+                df_norm['telefone'],
+                lambda x: x.replace('(', '').replace(')', '').replace('-', '').replace(' ', '').strip()
             )
         
         # Normalizar CEP
         if 'cep' in df_norm.columns:
-            df_norm['cep'] = df_norm['cep'].apply(
-                lambda x: str(x).replace('-', '').strip() if pd.notna(x) else x
+            df_norm['cep'] = transformar_texto_serie(
+                df_norm['cep'],
+                lambda x: x.replace('-', '').strip()
             )
         
         logger.info(f"Normalização concluída: {len(df_norm)} registros")
@@ -3,20 +3,59 @@
 Backend - Revisor de Matrículas
 """
 
+from .anexos import (
+    PROXIMOS_ESTUDANTES,
+    ArmazenamentoHTTP,
+    ArmazenamentoLocal,
+    CacheAnexos,
+    PrefetcherAnexos,
+    campos_anexo,
+    extrair_links,
+    links_anexos,
+    obter_prefetcher
+)
+from .busca import IndiceBusca, dobrar_texto
+from .cache import CachePlanilhas
+from .completude import calcular_completude, exportar_completude
 from .excel_reader import ExcelReader
 from .field_mapping import (
     FORM_MATRICULA_SECTIONS,
     FORM_INICIAL_SECTIONS,
     FORM_MEDICO_SECTIONS,
     UNIFIED_SECTIONS,
-    get_field_label
+    campos_referenciados,
+    get_field_label,
+    normalizar_cabecalho
 )
+from .reconciliacao import Reconciliacao, reconciliar_identidades
+from .resolucao import CampoResolvido, PlanoResolucao, valor_campo
 
 __all__ = [
+    'ArmazenamentoHTTP',
+    'ArmazenamentoLocal',
+    'CacheAnexos',
+    'CachePlanilhas',
+    'CampoResolvido',
     'ExcelReader',
     'FORM_MATRICULA_SECTIONS',
     'FORM_INICIAL_SECTIONS',
     'FORM_MEDICO_SECTIONS',
+    'IndiceBusca',
+    'PROXIMOS_ESTUDANTES',
+    'PlanoResolucao',
+    'PrefetcherAnexos',
+    'Reconciliacao',
     'UNIFIED_SECTIONS',
-    'get_field_label'
+    'calcular_completude',
+    'campos_anexo',
+    'campos_referenciados',
+    'dobrar_texto',
+    'exportar_completude',
+    'extrair_links',
+    'get_field_label',
+    'links_anexos',
+    'normalizar_cabecalho',
+    'obter_prefetcher',
+    'reconciliar_identidades',
+    'valor_campo'
 ]
\ No newline at end of file
@@ -0,0 +1,407 @@
+# -*- coding: utf-8 -*-
+"""
+Backend - Pré-carregamento de anexos do Revisor de Matrículas
+
+Campos "ANEXO:" guardam links para os documentos enviados pelo estudante.
+Quando um estudante é selecionado, PrefetcherAnexos baixa em segundo plano
+os anexos dos próximos estudantes da lista para um cache em disco, junto
+com uma miniatura. Ao avançar, os documentos já estão disponíveis.
+
+ORIGEM DOS ARQUIVOS (plugável):
+- ArmazenamentoHTTP: baixa o link (urllib, sem dependências extras); só
+  http:// e https://, inclusive nos redirecionamentos
+- ArmazenamentoLocal: procura o arquivo em uma pasta local (exportação dos
+  anexos), pelo caminho do link ou pelo id/nome do arquivo no link; links
+  file:// só são lidos por ele e apenas dentro dessa pasta
+Qualquer objeto com obter(link) -> bytes serve como armazenamento.
+
+CACHE (PROCESSED_DIR/revisor_matriculas/anexos/):
+    <ab>/<sha256 do link>.bin   conteúdo
+    <ab>/<sha256 do link>.png   miniatura (imagens e primeira página de PDFs)
+Limitado por MAX_BYTES_CACHE: os arquivos usados há mais tempo saem primeiro.
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from shared.configuracao import PROCESSED_DIR
+from shared.utils import gravar_atomico
+
+from .completude import eh_anexo
+from .resolucao import CampoResolvido, valor_campo
+
+# Pasta padrão do cache de anexos
+ANEXOS_DIR = PROCESSED_DIR / "revisor_matriculas" / "anexos"
+
+# Tamanho máximo do cache em disco
+MAX_BYTES_CACHE = 500 * 1024 * 1024
+
+# Anexos maiores que isso não são baixados
+MAX_BYTES_ANEXO = 25 * 1024 * 1024
+
+# Lado maior da miniatura, em pixels
+TAMANHO_MINIATURA = 240
+
+# Estudantes à frente do selecionado cujos anexos são pré-carregados
+PROXIMOS_ESTUDANTES = 3
+
+# Segundos até um link que falhou poder ser tentado de novo
+TTL_FALHA = 300
+
+# Esquemas que o ArmazenamentoHTTP aceita (file:// é só do ArmazenamentoLocal)
+ESQUEMAS_HTTP = ('http', 'https')
+
+_LINK = re.compile(r'(?:https?|file)://[^\s,;]+')
+
+
+def extrair_links(valor) -> List[str]:
+    """Links de um valor de campo "ANEXO:" (pode haver vários, separados por vírgula)"""
+    if not isinstance(valor, str):
+        return []
+    return _LINK.findall(valor)
+
+
+def campos_anexo(*planos) -> List[CampoResolvido]:
+    """
+    Campos "ANEXO:" com coluna na planilha, sem repetição.
+
+    Args:
+        planos: planos compilados (compilar_grupos, compilar_secoes); dicts e
+            listas aninhados de CampoResolvido
+    """
+    campos: List[CampoResolvido] = []
+    vistos = set()
+
+    def percorrer(no):
+        if isinstance(no, CampoResolvido):
+            chave = (no.form, no.coluna)
+            if no.coluna is not None and chave not in vistos and eh_anexo(no.campo):
+                vistos.add(chave)
+                campos.append(no)
+        elif isinstance(no, dict):
+            for filho in no.values():
+                percorrer(filho)
+        elif isinstance(no, (list, tuple)):
+            for filho in no:
+                percorrer(filho)
+
+    for plano in planos:
+        percorrer(plano)
+    return campos
+
+
+def links_anexos(linhas: Dict[str, Optional[Sequence]], campos: Iterable[CampoResolvido]) -> List[str]:
+    """Links dos anexos de um estudante (linhas de ExcelReader.get_student_rows*), em ordem"""
+    links: List[str] = []
+    for campo in campos:
+        for link in extrair_links(valor_campo(linhas, campo)):
+            if link not in links:
+                links.append(link)
+    return links
+
+
+# ============================================================================
+# ARMAZENAMENTOS
+# ============================================================================
+
+class _RedirecionamentoHTTP(urllib.request.HTTPRedirectHandler):
+    """Segue redirecionamentos apenas para http(s) (o padrão do urllib aceita ftp)"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        if urllib.parse.urlsplit(newurl).scheme.lower() not in ESQUEMAS_HTTP:
+            raise urllib.error.HTTPError(
+                newurl, code, f"Redirecionamento para esquema não permitido: {newurl}", headers, fp
+            )
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+class ArmazenamentoHTTP:
+    """Baixa anexos por HTTP(S); outros esquemas (file://, ftp://) são recusados"""
+
+    def __init__(self, timeout: float = 15):
+        self.timeout = timeout
+        self._abridor = urllib.request.build_opener(_RedirecionamentoHTTP)
+
+    def obter(self, link: str) -> bytes:
+        if urllib.parse.urlsplit(link).scheme.lower() not in ESQUEMAS_HTTP:
+            raise ValueError(f"Esquema não permitido para download: {link}")
+        requisicao = urllib.request.Request(link, headers={'User-Agent': 'GriffeHub/1.0'})
+        with self._abridor.open(requisicao, timeout=self.timeout) as resposta:
+            dados = resposta.read(MAX_BYTES_ANEXO + 1)
+        if len(dados) > MAX_BYTES_ANEXO:
+            raise ValueError(f"Anexo maior que {MAX_BYTES_ANEXO // (1024 * 1024)} MB")
+        return dados
+
+
+class ArmazenamentoLocal:
+    """
+    Lê anexos de uma pasta local.
+
+    file:// e caminhos dentro da pasta são lidos diretamente. Para links
+    HTTP, procura um arquivo cujo nome (ou nome sem extensão) seja o
+    parâmetro 'id' do link (Google Drive) ou o último trecho do caminho.
+    """
+
+    def __init__(self, raiz: Path):
+        self.raiz = Path(raiz).resolve()
+
+    def caminho(self, link: str) -> Optional[Path]:
+        partes = urllib.parse.urlsplit(link)
+        if partes.scheme == 'file':
+            candidato = Path(urllib.parse.unquote(partes.path)).resolve()
+            return candidato if candidato.is_relative_to(self.raiz) and candidato.is_file() else None
+
+        consulta = urllib.parse.parse_qs(partes.query)
+        segmentos = [s for s in partes.path.split('/') if s and s not in ('view', 'open')]
+        nomes = consulta.get('id', []) + segmentos[-1:]
+        for nome in nomes:
+            nome = Path(urllib.parse.unquote(nome)).name
+            if not nome:
+                continue
+            if (self.raiz / nome).is_file():
+                return self.raiz / nome
+            encontrados = sorted(self.raiz.glob(f"{_escapar_glob(nome)}.*"))
+            if encontrados:
+                return encontrados[0]
+        return None
+
+    def obter(self, link: str) -> bytes:
+        caminho = self.caminho(link)
+        if caminho is None:
+            raise FileNotFoundError(f"Anexo não encontrado em {self.raiz}: {link}")
+        return caminho.read_bytes()
+
+
+def _escapar_glob(nome: str) -> str:
+    return re.sub(r'([\[\]*?])', r'[\1]', nome)
+
+
+# ============================================================================
+# CACHE EM DISCO
+# ============================================================================
+
+def gerar_miniatura(dados: bytes) -> Optional[bytes]:
+    """PNG reduzido de uma imagem ou da primeira página de um PDF (None para outros tipos)"""
+    from PIL import Image
+
+    try:
+        if dados[:5] == b'%PDF-':
+            import fitz
+
+            with fitz.open(stream=dados, filetype='pdf') as doc:
+                if doc.page_count == 0:
+                    return None
+                pagina = doc[0]
+                zoom = TAMANHO_MINIATURA / max(pagina.rect.width, pagina.rect.height)
+                pix = pagina.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+                img = Image.open(BytesIO(pix.tobytes('png')))
+        else:
+            img = Image.open(BytesIO(dados))
+            img.draft('RGB', (TAMANHO_MINIATURA, TAMANHO_MINIATURA))
+        img = img.convert('RGB')
+        img.thumbnail((TAMANHO_MINIATURA, TAMANHO_MINIATURA))
+        saida = BytesIO()
+        img.save(saida, format='PNG', optimize=True)
+        return saida.getvalue()
+    except Exception:
+        # Formato não suportado ou arquivo corrompido: fica sem miniatura
+        return None
+
+
+class CacheAnexos:
+    """Cache LRU em disco de anexos e miniaturas, endereçado pelo link"""
+
+    def __init__(self, diretorio: Optional[Path] = None, max_bytes: int = MAX_BYTES_CACHE):
+        self.diretorio = Path(diretorio or ANEXOS_DIR)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _base(self, link: str) -> Path:
+        chave = hashlib.sha256(link.encode('utf-8')).hexdigest()
+        return self.diretorio / chave[:2] / chave
+
+    def contem(self, link: str) -> bool:
+        return self._base(link).with_suffix('.bin').exists()
+
+    def obter(self, link: str) -> Optional[bytes]:
+        return self._ler(self._base(link).with_suffix('.bin'))
+
+    def miniatura(self, link: str) -> Optional[bytes]:
+        return self._ler(self._base(link).with_suffix('.png'))
+
+    def guardar(self, link: str, dados: bytes, miniatura: Optional[bytes] = None):
+        base = self._base(link)
+        base.parent.mkdir(parents=True, exist_ok=True)
+        if miniatura is not None:
+            gravar_atomico(base.with_suffix('.png'), miniatura)
+        # Conteúdo por último: contem() só fica verdadeiro com a miniatura pronta
+        gravar_atomico(base.with_suffix('.bin'), dados)
+        self._limitar()
+
+    def _ler(self, caminho: Path) -> Optional[bytes]:
+        try:
+            dados = caminho.read_bytes()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(caminho)
+        except OSError:
+            pass
+        return dados
+
+    def _limitar(self):
+        with self._lock:
+            arquivos = []
+            total = 0
+            for caminho in self.diretorio.glob('*/*.bin'):
+                try:
+                    info = caminho.stat()
+                except FileNotFoundError:
+                    continue
+                miniatura = caminho.with_suffix('.png')
+                tamanho = info.st_size + (miniatura.stat().st_size if miniatura.exists() else 0)
+                arquivos.append((info.st_mtime, tamanho, caminho))
+                total += tamanho
+            if total <= self.max_bytes:
+                return
+            for _, tamanho, caminho in sorted(arquivos):
+                caminho.unlink(missing_ok=True)
+                caminho.with_suffix('.png').unlink(missing_ok=True)
+                total -= tamanho
+                if total <= self.max_bytes:
+                    break
+
+    def estatisticas(self) -> Dict[str, int]:
+        """Quantidade de anexos e bytes ocupados (conteúdo + miniaturas)"""
+        arquivos = 0
+        total = 0
+        for caminho in self.diretorio.glob('*/*.*'):
+            try:
+                total += caminho.stat().st_size
+            except FileNotFoundError:
+                continue
+            if caminho.suffix == '.bin':
+                arquivos += 1
+        return {'arquivos': arquivos, 'bytes': total}
+
+
+# ============================================================================
+# PREFETCHER
+# ============================================================================
+
+class PrefetcherAnexos:
+    """
+    Baixa anexos em segundo plano (ThreadPoolExecutor) para o CacheAnexos.
+
+    Um mesmo link nunca é baixado duas vezes ao mesmo tempo; links que falharam
+    só são tentados de novo depois de TTL_FALHA segundos ou de limpar_falhas()
+    (ver falhas: link -> (instante da falha, erro)).
+    """
+
+    def __init__(
+        self,
+        armazenamento=None,
+        cache: Optional[CacheAnexos] = None,
+        max_workers: int = 4,
+        ttl_falha: float = TTL_FALHA,
+    ):
+        self.armazenamento = armazenamento or ArmazenamentoHTTP()
+        self.ttl_falha = ttl_falha
+        self.cache = cache or CacheAnexos()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='anexos')
+        self._lock = threading.Lock()
+        self._em_andamento: Dict[str, Future] = {}
+        self.falhas: Dict[str, Tuple[float, str]] = {}
+
+    def prefetch(self, links: Iterable[str]) -> int:
+        """Agenda o download dos links ainda fora do cache. Retorna quantos foram agendados."""
+        agendados = 0
+        for link in links:
+            _, novo = self._agendar(link)
+            agendados += novo
+        return agendados
+
+    def _agendar(self, link: str) -> Tuple[Optional[Future], bool]:
+        """(download em andamento para o link ou None, se foi agendado agora)"""
+        with self._lock:
+            if link in self._em_andamento:
+                return self._em_andamento[link], False
+            falha = self.falhas.get(link)
+            if falha is not None:
+                if time.monotonic() - falha[0] < self.ttl_falha:
+                    return None, False
+                del self.falhas[link]
+            if self.cache.contem(link):
+                return None, False
+            futuro = self._executor.submit(self._baixar, link)
+            self._em_andamento[link] = futuro
+            return futuro, True
+
+    def _baixar(self, link: str):
+        try:
+            dados = self.armazenamento.obter(link)
+            self.cache.guardar(link, dados, gerar_miniatura(dados))
+        except Exception as e:
+            with self._lock:
+                self.falhas[link] = (time.monotonic(), str(e))
+        finally:
+            with self._lock:
+                self._em_andamento.pop(link, None)
+
+    def obter(self, link: str, timeout: Optional[float] = None) -> Optional[bytes]:
+        """Conteúdo do anexo: do cache, esperando um download em andamento ou baixando agora"""
+        dados = self.cache.obter(link)
+        if dados is not None:
+            return dados
+        futuro, _ = self._agendar(link)
+        if futuro is not None:
+            futuro.result(timeout=timeout)
+        return self.cache.obter(link)
+
+    def miniatura(self, link: str) -> Optional[bytes]:
+        """Miniatura já disponível no cache (não espera downloads)"""
+        return self.cache.miniatura(link)
+
+    def limpar_falhas(self) -> int:
+        """Permite tentar de novo todos os links que falharam. Retorna quantos eram."""
+        with self._lock:
+            quantidade = len(self.falhas)
+            self.falhas.clear()
+            return quantidade
+
+    def pendentes(self) -> int:
+        with self._lock:
+            return len(self._em_andamento)
+
+    def encerrar(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_prefetcher: Optional[PrefetcherAnexos] = None
+_prefetcher_lock = threading.Lock()
+
+
+def obter_prefetcher() -> PrefetcherAnexos:
+    """
+    Prefetcher compartilhado pelo processo (todas as sessões Streamlit).
+
+    Com a variável de ambiente REVISOR_ANEXOS_DIR definida, lê os anexos
+    dessa pasta (ArmazenamentoLocal); senão, baixa por HTTP.
+    """
+    global _prefetcher
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            pasta_local = os.getenv('REVISOR_ANEXOS_DIR')
+            armazenamento = ArmazenamentoLocal(Path(pasta_local)) if pasta_local else ArmazenamentoHTTP()
+            _prefetcher = PrefetcherAnexos(armazenamento)
+        return _prefetcher
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+Griffe Hub - Revisor de Matrículas
+Benchmarks do ExcelReader sobre planilhas sintéticas.
+
+1. Lista de estudantes (executar_lista_estudantes): versão original com
+   iterrows() x _build_student_list vetorizado (concat + groupby), que também
+   marca em quais formulários cada estudante aparece.
+2. Busca de um estudante (executar_busca): máscaras .str.strip() == nome por
+   sheet x índice (nome, email) montado no carregamento.
+3. Busca textual (executar_busca_texto): filtro da página (list comprehension
+   com normalize_text por estudante a cada tecla) x IndiceBusca, com 50k
+   estudantes.
+
+Uso (a partir da raiz do projeto):
+    python backend/revisor_matriculas/benchmark.py
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from revisor_matriculas.busca import IndiceBusca  # noqa: E402
+from revisor_matriculas.excel_reader import ExcelReader  # noqa: E402
+from shared.utils import remover_acentos  # noqa: E402
+
+_PRENOMES = "Ana Bruno Carla Daniel Eduarda Felipe Gabriela Heitor Isabela João Larissa Mateus".split()
+_SOBRENOMES = "Silva Souza Oliveira Santos Pereira Costa Rodrigues Almeida Nascimento Lima".split()
+
+
+def gerar_sheets(n_linhas: int = 20000, seed: int = 42) -> List[pd.DataFrame]:
+    """
+    Três sheets com n_linhas cada, sobre um mesmo universo de estudantes:
+    parte dos estudantes não envia todos os formulários e alguns nomes vêm
+    com espaços sobrando, como nas exportações reais.
+    """
+    rng = random.Random(seed)
+    universo = [
+        (f"{rng.choice(_PRENOMES)} {rng.choice(_SOBRENOMES)} {rng.choice(_SOBRENOMES)} {i}",
+         f"estudante{i}@exemplo.com")
+        for i in range(int(n_linhas * 1.2))
+    ]
+    sheets = []
+    for _ in range(3):
+        amostra = rng.sample(universo, n_linhas)
+        nomes = [nome + " " if rng.random() < 0.1 else nome for nome, _ in amostra]
+        emails = [email if rng.random() > 0.02 else np.nan for _, email in amostra]
+        df = pd.DataFrame({'NOME COMPLETO': nomes, 'EMAIL': emails})
+        for c in range(40):
+            df[f'CAMPO {c}'] = f'valor {c}'
+        sheets.append(df)
+    return sheets
+
+
+def _lista_original(reader: ExcelReader) -> List[Tuple[str, str]]:
+    """Versão anterior de _build_student_list, mantida apenas como referência."""
+    students_set = set()
+    for df in [reader.df_matricula, reader.df_inicial, reader.df_medico]:
+        if df is not None and len(df) > 0:
+            for _, row in df.iterrows():
+                nome = row.get('NOME COMPLETO', '')
+                email = row.get('EMAIL', '')
+                if pd.notna(nome) and nome:
+                    students_set.add((str(nome).strip(), str(email).strip() if pd.notna(email) else ''))
+    return sorted(list(students_set), key=lambda x: x[0])
+
+
+def _busca_original(reader: ExcelReader, nome: str, email: str) -> Dict:
+    """Versão anterior de get_student_data, mantida apenas como referência."""
+    data = {}
+    for form, df in reader._sheets():
+        mask = (df['NOME COMPLETO'].str.strip() == nome.strip())
+        if email:
+            mask = mask & (df['EMAIL'].str.strip() == email.strip())
+        matches = df[mask]
+        data[form] = matches.iloc[0].to_dict() if len(matches) > 0 else {}
+    return data
+
+
+def _criar_reader(n_linhas: int) -> ExcelReader:
+    reader = ExcelReader('')
+    reader.df_matricula, reader.df_inicial, reader.df_medico = gerar_sheets(n_linhas)
+    return reader
+
+
+def executar_lista_estudantes(n_linhas: int = 20000) -> None:
+    reader = _criar_reader(n_linhas)
+
+    inicio = time.perf_counter()
+    original = _lista_original(reader)
+    t_original = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    reader._build_student_list()
+    t_vetorizado = time.perf_counter() - inicio
+
+    assert sorted(original) == reader.students
+
+    print(f"{n_linhas} linhas por sheet, {len(reader.students)} estudantes únicos")
+    print(f"  iterrows():           {t_original * 1000:8.1f} ms")
+    print(f"  vetorizado + presença: {t_vetorizado * 1000:7.1f} ms  ({t_original / t_vetorizado:.1f}x)")
+
+
+def executar_busca(n_linhas: int = 20000, n_buscas: int = 200) -> None:
+    reader = _criar_reader(n_linhas)
+    reader._build_student_list()
+
+    inicio = time.perf_counter()
+    reader._build_indices()
+    t_indice = time.perf_counter() - inicio
+
+    estudantes = random.Random(0).sample(reader.students, n_buscas)
+    inicio = time.perf_counter()
+    for nome, email in estudantes:
+        _busca_original(reader, nome, email)
+    t_original = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for nome, email in estudantes:
+        reader.get_student_data(nome, email)
+    t_indice_busca = time.perf_counter() - inicio
+
+    print(f"{n_buscas} buscas, {n_linhas} linhas por sheet (índice montado em {t_indice * 1000:.1f} ms)")
+    print(f"  máscaras .str.strip(): {t_original / n_buscas * 1000:8.3f} ms por estudante")
+    print(f"  índice (nome, email):  {t_indice_busca / n_buscas * 1000:8.3f} ms por estudante")
+
+
+def _normalize_text(text) -> str:
+    """Filtro da página antes do IndiceBusca (minúsculo e sem acentos), mantido apenas como referência."""
+    if not text:
+        return ""
+    return remover_acentos(str(text).lower())
+
+
+def executar_busca_texto(n_estudantes: int = 50000) -> None:
+    rng = random.Random(7)
+    estudantes = sorted({
+        (f"{rng.choice(_PRENOMES)} {rng.choice(_SOBRENOMES)} {rng.choice(_SOBRENOMES)} {i}",
+         f"estudante{i}@exemplo.com")
+        for i in range(n_estudantes)
+    })
+    students = [{'nome': nome, 'email': email} for nome, email in estudantes]
+
+    inicio = time.perf_counter()
+    indice = IndiceBusca(students)
+    t_indice = time.perf_counter() - inicio
+
+    print(f"{n_estudantes} estudantes (índice montado em {t_indice * 1000:.0f} ms)")
+    for consulta in ["joão", "SILVA ALMEIDA", "estudante4242@", "larisa", "gabriela costa 123"]:
+        inicio = time.perf_counter()
+        antigos = [
+            s for s in students
+            if _normalize_text(consulta) in _normalize_text(s['nome'])
+            or _normalize_text(consulta) in _normalize_text(s.get('email', ''))
+        ]
+        t_original = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        resultado = indice.buscar(consulta)
+        t_busca = time.perf_counter() - inicio
+
+        # Os resultados antigos são exatamente os primeiros do índice
+        assert [students[i] for i in resultado[:len(antigos)]] == antigos
+        print(f"  {consulta!r:22} antigo {len(antigos):5} em {t_original * 1000:6.1f} ms | "
+              f"índice {len(resultado):5} em {t_busca * 1000:5.2f} ms "
+              f"({len(resultado) - len(antigos)} aproximados)")
+
+
+if __name__ == "__main__":
+    executar_lista_estudantes()
+    print()
+    executar_busca()
+    print()
+    executar_busca_texto()
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Backend - Busca de estudantes por nome e email
+
+IndiceBusca é montado uma vez por planilha e responde a cada tecla digitada
+em poucos milissegundos, mesmo com dezenas de milhares de estudantes.
+
+- Textos e consultas são "dobrados": sem acentos, minúsculos e com espaços
+  colapsados ("João  SILVA" == "joao silva").
+- Primeiro vêm os estudantes em que a consulta aparece como trecho do nome,
+  depois os em que aparece só no email (mesma regra da busca antiga, sem
+  depender de acento ou caixa). A varredura é feita em uma única string com
+  todos os nomes (str.find em C), e não estudante a estudante.
+- Depois, resultados aproximados por trigramas (tolera erros de digitação
+  e letras trocadas): fração dos trigramas da consulta presentes no nome ou
+  email do estudante, acima de LIMIAR_APROXIMADO, da maior para a menor.
+"""
+
+import re
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from shared.utils import remover_acentos
+
+# Fração mínima de trigramas da consulta presentes para um resultado aproximado
+LIMIAR_APROXIMADO = 0.5
+
+_SEPARADORES = re.compile(r'[^0-9a-z]+')
+
+
+def dobrar_texto(texto) -> str:
+    """Texto sem acentos, minúsculo e com espaços colapsados"""
+    if not texto:
+        return ''
+    return remover_acentos(texto).lower()
+
+
+def trigramas(texto_dobrado: str) -> set:
+    """Trigramas de cada palavra com bordas ("  j", " jo", "joa", ..., "ao ")"""
+    resultado = set()
+    for palavra in _SEPARADORES.split(texto_dobrado):
+        if palavra:
+            palavra = f"  {palavra} "
+            resultado.update(palavra[i:i + 3] for i in range(len(palavra) - 2))
+    return resultado
+
+
+class _TextoConcatenado:
+    """Todos os textos em uma string, para achar trechos com str.find"""
+
+    def __init__(self, textos: Sequence[str]):
+        self.texto = '\n'.join(textos)
+        self.inicios: List[int] = []
+        pos = 0
+        for t in textos:
+            self.inicios.append(pos)
+            pos += len(t) + 1
+
+    def contendo(self, trecho: str) -> List[int]:
+        """Índices dos textos que contêm o trecho, em ordem"""
+        encontrados = []
+        pos = self.texto.find(trecho)
+        while pos != -1:
+            i = bisect_right(self.inicios, pos) - 1
+            encontrados.append(i)
+            # Pula para o próximo texto: só interessa uma ocorrência por texto
+            proximo = self.inicios[i + 1] if i + 1 < len(self.inicios) else len(self.texto)
+            pos = self.texto.find(trecho, proximo)
+        return encontrados
+
+
+class IndiceBusca:
+    """Índice de busca sobre a lista de estudantes (nome, email)"""
+
+    def __init__(self, estudantes: Iterable):
+        """
+        Args:
+            estudantes: pares (nome, email) ou dicts com 'nome' e 'email',
+                na ordem em que os resultados devem ser devolvidos (índices)
+        """
+        pares: List[Tuple[str, str]] = [
+            (e.get('nome', ''), e.get('email', '')) if isinstance(e, dict) else (e[0], e[1])
+            for e in estudantes
+        ]
+        self.n = len(pares)
+        nomes = [dobrar_texto(nome) for nome, _ in pares]
+        emails = [dobrar_texto(email) for _, email in pares]
+        self._nomes = _TextoConcatenado(nomes)
+        self._emails = _TextoConcatenado(emails)
+
+        postagens: Dict[str, List[int]] = {}
+        for i, (nome, email) in enumerate(zip(nomes, emails)):
+            for tri in trigramas(f"{nome} {email}"):
+                postagens.setdefault(tri, []).append(i)
+        self._postagens = {tri: np.asarray(ids, dtype=np.int32) for tri, ids in postagens.items()}
+
+    def buscar(self, consulta: str, limite_aproximados: int = 50) -> List[int]:
+        """
+        Índices dos estudantes que correspondem à consulta, em ordem de relevância.
+
+        Consulta vazia devolve todos, na ordem original.
+        """
+        consulta = dobrar_texto(consulta)
+        if not consulta:
+            return list(range(self.n))
+
+        por_nome = self._nomes.contendo(consulta)
+        vistos = set(por_nome)
+        por_email = [i for i in self._emails.contendo(consulta) if i not in vistos]
+        vistos.update(por_email)
+        return por_nome + por_email + self._aproximados(consulta, vistos, limite_aproximados)
+
+    def _aproximados(self, consulta: str, excluir: set, limite: int) -> List[int]:
+        tris = trigramas(consulta)
+        listas = [self._postagens[t] for t in tris if t in self._postagens]
+        if not tris or not listas or limite <= 0:
+            return []
+
+        # Quantos trigramas da consulta cada estudante contém
+        contagem = np.bincount(np.concatenate(listas), minlength=self.n)
+        minimo = max(1, int(np.ceil(LIMIAR_APROXIMADO * len(tris))))
+        candidatos = np.flatnonzero(contagem >= minimo)
+        if excluir:
+            candidatos = candidatos[~np.isin(candidatos, np.fromiter(excluir, dtype=np.int64))]
+        if len(candidatos) == 0:
+            return []
+
+        # Maior pontuação primeiro; empates na ordem original (lexsort é estável)
+        ordem = np.lexsort((candidatos, -contagem[candidatos]))
+        return candidatos[ordem[:limite]].tolist()
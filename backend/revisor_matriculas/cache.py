@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Backend - Cache em disco das planilhas de matrícula já processadas
+
+Guarda as três sheets lidas, a lista de estudantes e os índices de busca do
+ExcelReader, para que reabrir a mesma exportação (em outra sessão Streamlit
+ou outro processo) não precise reler o Excel.
+
+ESTRUTURA EM DISCO (PROCESSED_DIR/revisor_matriculas/):
+    <chave>.pkl   chave = hash do conteúdo da planilha + colunas lidas
+
+Só o conteúdo do arquivo entra na chave: a mesma exportação enviada de novo
+(novo arquivo temporário, outra data de modificação) reaproveita o cache.
+Caminho, mtime e tamanho servem apenas para não recalcular o hash de um
+arquivo que não mudou dentro do mesmo processo.
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from shared.configuracao import PROCESSED_DIR
+from shared.utils import gravar_atomico
+
+# Pasta padrão do cache
+CACHE_DIR = PROCESSED_DIR / "revisor_matriculas"
+
+# Quantidade de planilhas mantidas (as usadas há mais tempo são removidas)
+MAX_ARQUIVOS = 5
+
+# Incrementar quando o conteúdo salvo pelo ExcelReader mudar
+VERSAO_CACHE = 3
+
+# Hashes memoizados por processo (os usados há mais tempo saem primeiro)
+MAX_HASHES = 256
+
+_hashes: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+_hashes_lock = threading.Lock()
+
+
+def hash_arquivo(caminho) -> str:
+    """
+    sha256 do conteúdo do arquivo.
+
+    Memoizado por (caminho, mtime, tamanho) no processo, até MAX_HASHES
+    arquivos: arquivos inalterados não são relidos.
+    """
+    caminho = Path(caminho)
+    info = caminho.stat()
+    chave = (str(caminho.resolve()), info.st_mtime_ns, info.st_size)
+    with _hashes_lock:
+        if chave in _hashes:
+            _hashes.move_to_end(chave)
+            return _hashes[chave]
+
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloco)
+    resultado = h.hexdigest()
+
+    with _hashes_lock:
+        _hashes[chave] = resultado
+        while len(_hashes) > MAX_HASHES:
+            _hashes.popitem(last=False)
+    return resultado
+
+
+def chave_cache(hash_planilha: str, parametros: Any) -> str:
+    """Chave do cache: versão + hash da planilha + parâmetros de leitura (repr estável)."""
+    h = hashlib.sha256(f"v{VERSAO_CACHE}|{hash_planilha}|".encode('ascii'))
+    h.update(repr(parametros).encode('utf-8'))
+    return h.hexdigest()[:32]
+
+
+class CachePlanilhas:
+    """Cache em disco dos dados processados pelo ExcelReader."""
+
+    def __init__(self, diretorio: Optional[Path] = None, max_arquivos: int = MAX_ARQUIVOS):
+        self.diretorio = Path(diretorio or CACHE_DIR)
+        self.max_arquivos = max_arquivos
+
+    def caminho(self, chave: str) -> Path:
+        return self.diretorio / f"{chave}.pkl"
+
+    def carregar(self, chave: str) -> Optional[Dict[str, Any]]:
+        """Dados salvos para a chave, ou None se não houver (ou o arquivo estiver corrompido)."""
+        caminho = self.caminho(chave)
+        try:
+            with open(caminho, 'rb') as f:
+                dados = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+            print(f"Cache de planilha ignorado ({caminho.name}): {e}")
+            return None
+        try:
+            # Marca como usado agora: a limpeza remove os menos recentes
+            os.utime(caminho)
+        except OSError:
+            pass
+        return dados
+
+    def salvar(self, chave: str, dados: Dict[str, Any]) -> Path:
+        """Grava de forma atômica (arquivo temporário + rename) e aplica o limite de arquivos."""
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        caminho = self.caminho(chave)
+        gravar_atomico(caminho, pickle.dumps(dados, protocol=pickle.HIGHEST_PROTOCOL))
+        self._limitar()
+        return caminho
+
+    def limpar(self) -> int:
+        """Remove todos os arquivos do cache. Retorna quantos foram removidos."""
+        removidos = 0
+        for caminho in self.diretorio.glob('*.pkl'):
+            caminho.unlink(missing_ok=True)
+            removidos += 1
+        return removidos
+
+    def _limitar(self):
+        arquivos = []
+        for caminho in self.diretorio.glob('*.pkl'):
+            try:
+                arquivos.append((caminho.stat().st_mtime, caminho))
+            except FileNotFoundError:
+                continue
+        arquivos.sort(reverse=True)
+        for _, caminho in arquivos[self.max_arquivos:]:
+            caminho.unlink(missing_ok=True)
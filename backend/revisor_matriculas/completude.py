@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Backend - Relatório de completude das matrículas
+
+Calcula, para todos os estudantes da planilha de uma vez, o que falta em
+cada formulário: campos obrigatórios vazios, anexos (campos "ANEXO:") não
+enviados e a cobertura de preenchimento por formulário.
+
+REGRAS:
+- Campos de cada formulário: os de FORM_*_SECTIONS, resolvidos pelo plano
+  de resolução (campos sem coluna na sheet ficam fora e são listados à parte)
+- Condicionais (não obrigatórios): texto, sem o prefixo "ANEXO:", começando
+  com "SE ", "CASO ", "(APENAS" ou "EM CASO"
+- Preenchido: célula não vazia e com algum texto além de espaços
+- Faltas só contam nos formulários que o estudante enviou; formulários não
+  enviados aparecem em "Formulários Faltando" e zeram a cobertura
+"""
+
+from io import BytesIO
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from .excel_reader import ExcelReader
+from .field_mapping import (
+    FORM_INICIAL_SECTIONS,
+    FORM_MATRICULA_SECTIONS,
+    FORM_MEDICO_SECTIONS,
+    normalizar_cabecalho,
+)
+
+PREFIXOS_CONDICIONAIS = ('SE ', 'CASO ', '(APENAS', 'EM CASO')
+
+ROTULOS = {'matricula': 'Matrícula', 'inicial': 'Inicial', 'medico': 'Médico'}
+
+SECOES = {
+    'matricula': FORM_MATRICULA_SECTIONS,
+    'inicial': FORM_INICIAL_SECTIONS,
+    'medico': FORM_MEDICO_SECTIONS,
+}
+
+
+def eh_anexo(campo: str) -> bool:
+    return normalizar_cabecalho(campo).startswith('ANEXO:')
+
+
+def eh_obrigatorio(campo: str) -> bool:
+    """Campos condicionais ("SE SIM, ...", "CASO TENHA ...") não são obrigatórios"""
+    texto = normalizar_cabecalho(campo)
+    if texto.startswith('ANEXO:'):
+        texto = texto[len('ANEXO:'):].strip()
+    return not texto.startswith(PREFIXOS_CONDICIONAIS)
+
+
+def _preenchidos(df: pd.DataFrame, colunas: List[int]) -> np.ndarray:
+    """Matriz (linhas da sheet x colunas) indicando células preenchidas"""
+    matriz = np.zeros((len(df), len(colunas)), dtype=bool)
+    for j, c in enumerate(colunas):
+        serie = df.iloc[:, c]
+        matriz[:, j] = (serie.notna() & serie.astype(str).str.strip().ne('')).to_numpy()
+    return matriz
+
+
+def calcular_completude(reader: ExcelReader) -> Dict:
+    """
+    Completude de todos os estudantes de um ExcelReader carregado.
+
+    Returns:
+        Dict com:
+            - 'resumo': DataFrame por estudante (Nome, Email, Completude (%),
+              formulários faltando, cobertura por formulário, obrigatórios
+              e anexos faltando), do menos para o mais completo
+            - 'campos': DataFrame por campo (formulário, tipo, preenchidos,
+              enviados, taxa)
+            - 'sem_coluna': campos dos mapeamentos sem coluna na planilha
+    """
+    n = len(reader.students)
+    nomes = [nome for nome, _ in reader.students]
+    emails = [email for _, email in reader.students]
+
+    resumo = {'Nome': nomes, 'Email': emails}
+    faltando_formularios = [[] for _ in range(n)]
+    total_exigidos = np.zeros(n, dtype=np.int64)
+    total_ok = np.zeros(n, dtype=np.int64)
+    n_obrigatorios = np.zeros(n, dtype=np.int64)
+    n_anexos = np.zeros(n, dtype=np.int64)
+    listas_obrigatorios = [[] for _ in range(n)]
+    listas_anexos = [[] for _ in range(n)]
+    linhas_campos = []
+    sem_coluna = []
+
+    for form, df in reader._sheets():
+        # Campos únicos do formulário com coluna na sheet
+        campos = []
+        vistos = set()
+        for lista in reader.plano.compilar_secoes(SECOES[form], form).values():
+            for campo in lista:
+                if campo.coluna is None:
+                    sem_coluna.append(f"{ROTULOS[form]}: {campo.campo}")
+                elif campo.coluna not in vistos:
+                    vistos.add(campo.coluna)
+                    campos.append(campo)
+
+        posicoes = reader.get_student_positions(form)
+        enviado = posicoes >= 0
+        for i in np.flatnonzero(~enviado):
+            faltando_formularios[i].append(ROTULOS[form])
+
+        matriz = np.zeros((n, len(campos)), dtype=bool)
+        if df is not None and campos:
+            matriz[enviado] = _preenchidos(df, [c.coluna for c in campos])[posicoes[enviado]]
+
+        obrigatorio = np.array([eh_obrigatorio(c.campo) for c in campos], dtype=bool)
+        anexo = np.array([eh_anexo(c.campo) for c in campos], dtype=bool)
+        # Estudante sem o formulário: todos os obrigatórios faltam na completude geral
+        total_exigidos += int(obrigatorio.sum())
+        total_ok += matriz[:, obrigatorio].sum(axis=1)
+
+        falta = ~matriz & enviado[:, None]
+        falta_obrigatorio = falta & (obrigatorio & ~anexo)
+        falta_anexo = falta & (obrigatorio & anexo)
+        n_obrigatorios += falta_obrigatorio.sum(axis=1)
+        n_anexos += falta_anexo.sum(axis=1)
+
+        rotulos_campos = np.array([c.campo for c in campos], dtype=object)
+        for i in np.flatnonzero(falta_obrigatorio.any(axis=1)):
+            listas_obrigatorios[i].extend(rotulos_campos[falta_obrigatorio[i]])
+        for i in np.flatnonzero(falta_anexo.any(axis=1)):
+            listas_anexos[i].extend(
+                c.replace('ANEXO:', '').strip() for c in rotulos_campos[falta_anexo[i]]
+            )
+
+        cobertura = matriz.mean(axis=1) * 100 if campos else np.zeros(n)
+        resumo[f'{ROTULOS[form]} (%)'] = np.where(enviado, cobertura, 0).round(1)
+
+        preenchidos = matriz[enviado].sum(axis=0)
+        n_enviados = int(enviado.sum())
+        for j, campo in enumerate(campos):
+            linhas_campos.append({
+                'Formulário': ROTULOS[form],
+                'Campo': campo.campo,
+                'Tipo': ('Anexo' if anexo[j] else 'Obrigatório') if obrigatorio[j] else 'Condicional',
+                'Preenchidos': int(preenchidos[j]),
+                'Enviados': n_enviados,
+                'Taxa (%)': round(preenchidos[j] / n_enviados * 100, 1) if n_enviados else 0.0,
+            })
+
+    completude = np.divide(
+        total_ok * 100, total_exigidos,
+        out=np.full(n, 100.0), where=total_exigidos > 0,
+    ).round(1)
+    df_resumo = pd.DataFrame(resumo)
+    df_resumo.insert(2, 'Completude (%)', completude)
+    df_resumo.insert(3, 'Formulários Faltando', [', '.join(f) for f in faltando_formularios])
+    df_resumo['Obrigatórios Faltando'] = n_obrigatorios
+    df_resumo['Anexos Faltando'] = n_anexos
+    df_resumo['Campos Obrigatórios Faltando'] = ['; '.join(c) for c in listas_obrigatorios]
+    df_resumo['Anexos Não Enviados'] = ['; '.join(c) for c in listas_anexos]
+    df_resumo = df_resumo.sort_values(
+        ['Completude (%)', 'Nome'], kind='mergesort'
+    ).reset_index(drop=True)
+
+    return {
+        'resumo': df_resumo,
+        'campos': pd.DataFrame(linhas_campos, columns=[
+            'Formulário', 'Campo', 'Tipo', 'Preenchidos', 'Enviados', 'Taxa (%)'
+        ]),
+        'sem_coluna': sem_coluna,
+    }
+
+
+def exportar_completude(relatorio: Dict) -> bytes:
+    """Planilha .xlsx com as abas Resumo e Campos do relatório"""
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        relatorio['resumo'].to_excel(writer, sheet_name='Resumo', index=False)
+        relatorio['campos'].to_excel(writer, sheet_name='Campos', index=False)
+    return output.getvalue()
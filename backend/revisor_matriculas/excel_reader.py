@@ -3,75 +3,426 @@
 Backend - Leitor de Excel para Revisão de Matrículas
 """
 
+import pickle
+import time
+import numpy as np
 import pandas as pd
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .cache import CachePlanilhas, chave_cache, hash_arquivo
+from .field_mapping import campos_referenciados, normalizar_cabecalho
+from .reconciliacao import Reconciliacao, reconciliar_identidades
+from .resolucao import PlanoResolucao
+
+try:
+    import python_calamine  # noqa: F401
+    # Leitor em Rust suportado pelo pandas >= 2.2: bem mais rápido que o openpyxl
+    ENGINE_EXCEL = 'calamine'
+except ImportError:
+    ENGINE_EXCEL = None  # padrão do pandas (openpyxl)
+
+# Índices de uma sheet: (nome, email) -> posição e nome -> posição (primeira ocorrência)
+IndiceSheet = Tuple[Dict[Tuple[str, str], int], Dict[str, int]]
+
+# Formulários (sheets) na ordem usada pelos dados do estudante
+FORMULARIOS = ['matricula', 'inicial', 'medico']
+
+# Sheet da planilha de cada formulário
+SHEETS = {
+    'matricula': 'Form_Matrícula',
+    'inicial': 'Form_Inicial',
+    'medico': 'Form_Médico',
+}
 
 class ExcelReader:
     """Classe para ler e processar dados da planilha de matrículas"""
     
-    def __init__(self, excel_file_path: str):
+    def __init__(
+        self,
+        excel_file_path: str,
+        grupos_extras: Optional[Dict[str, Dict[str, Iterable[Tuple[str, str]]]]] = None,
+        somente_referenciadas: bool = True,
+        usar_cache: bool = True,
+        reconciliar: bool = True
+    ):
         """
         Inicializa o leitor de Excel
         
         Args:
             excel_file_path: Caminho para o arquivo Excel
+            grupos_extras: Mapeamentos adicionais de campos exibidos
+                ({grupo: {subseção: [(campo, fonte), ...]}}), cujas colunas
+                também devem ser lidas
+            somente_referenciadas: Lê apenas as colunas usadas pelos mapeamentos
+                (campos_referenciados); False lê todas as colunas
+            usar_cache: Reaproveita/grava os dados processados em disco
+                (CachePlanilhas), compartilhados entre sessões e processos
+            reconciliar: Junta variações de (nome, email) do mesmo estudante
+                entre as sheets em um id (reconciliacao.py)
         """
         self.excel_file = excel_file_path
+        self.somente_referenciadas = somente_referenciadas
+        self._colunas: Dict[str, Set[str]] = {
+            form: {normalizar_cabecalho(c) for c in campos}
+            for form, campos in campos_referenciados(grupos_extras).items()
+        }
+        self.usar_cache = usar_cache
+        self.reconciliar = reconciliar
+        self.reconciliacao: Optional[Reconciliacao] = None
+        self._id_por_nome: Dict[str, str] = {}
+        self.cache = CachePlanilhas()
+        self.do_cache = False
+        self.sheet_names: List[str] = []
+        self.tempo_carga: Optional[float] = None
         self.df_matricula = None
         self.df_inicial = None
         self.df_medico = None
         self.students = []
+        self.df_students = pd.DataFrame(columns=['nome', 'email'] + FORMULARIOS)
+        self._indices: Dict[str, IndiceSheet] = {}
+        self.plano: Optional[PlanoResolucao] = None
+        self._matrizes: Dict[str, np.ndarray] = {}
         
     def load_data(self) -> bool:
         """
         Carrega os dados das 3 sheets principais
         
+        A planilha é aberta uma única vez (shared strings e estilos são lidos
+        uma vez para as três sheets) e, com python-calamine instalado, lida pelo
+        engine calamine. Registra self.sheet_names e
+        self.tempo_carga (segundos).
+        
+        Com usar_cache, uma planilha de mesmo conteúdo já processada é
+        restaurada do cache em disco (self.do_cache = True) sem reler o Excel.
+        
         Returns:
             True se carregou com sucesso, False caso contrário
         """
+        inicio = time.perf_counter()
+        self.do_cache = False
         try:
-            self.df_matricula = pd.read_excel(self.excel_file, sheet_name='Form_Matrícula')
-            self.df_inicial = pd.read_excel(self.excel_file, sheet_name='Form_Inicial')
-            self.df_medico = pd.read_excel(self.excel_file, sheet_name='Form_Médico')
+            chave = self._chave_cache() if self.usar_cache else None
+            if chave:
+                dados = self.cache.carregar(chave)
+                if dados is not None:
+                    self._restaurar(dados)
+                    self._build_plano()
+                    self.do_cache = True
+                    self.tempo_carga = time.perf_counter() - inicio
+                    return True
+            
+            with pd.ExcelFile(self.excel_file, engine=ENGINE_EXCEL) as xls:
+                self.sheet_names = list(xls.sheet_names)
+                dfs = {
+                    form: xls.parse(sheet, usecols=self._filtro_colunas(form))
+                    for form, sheet in SHEETS.items()
+                }
+            self.df_matricula = dfs['matricula']
+            self.df_inicial = dfs['inicial']
+            self.df_medico = dfs['medico']
             
             # Criar lista de estudantes únicos
             self._build_student_list()
+            self._build_indices()
+            self._build_plano()
+            if self.reconciliar:
+                self._build_reconciliacao()
             
+            if chave:
+                try:
+                    self.cache.salvar(chave, self._snapshot())
+                except (OSError, pickle.PicklingError) as e:
+                    print(f"Erro ao salvar cache da planilha: {e}")
+            
+            self.tempo_carga = time.perf_counter() - inicio
             return True
         except Exception as e:
             print(f"Erro ao carregar dados: {e}")
             return False
     
+    def _chave_cache(self) -> str:
+        """Chave no cache: conteúdo da planilha + colunas que serão lidas"""
+        parametros = (
+            self.somente_referenciadas,
+            self.reconciliar,
+            tuple((form, tuple(sorted(self._colunas[form]))) for form in FORMULARIOS),
+        )
+        return chave_cache(hash_arquivo(self.excel_file), parametros)
+    
+    def _snapshot(self) -> Dict:
+        """Estado processado da planilha, como é gravado no cache"""
+        return {
+            'sheet_names': self.sheet_names,
+            'df_matricula': self.df_matricula,
+            'df_inicial': self.df_inicial,
+            'df_medico': self.df_medico,
+            'df_students': self.df_students,
+            'students': self.students,
+            'indices': self._indices,
+            'reconciliacao': self.reconciliacao,
+            'id_por_nome': self._id_por_nome,
+        }
+    
+    def _restaurar(self, dados: Dict):
+        """Aplica um estado lido do cache (ver _snapshot)"""
+        self.sheet_names = dados['sheet_names']
+        self.df_matricula = dados['df_matricula']
+        self.df_inicial = dados['df_inicial']
+        self.df_medico = dados['df_medico']
+        self.df_students = dados['df_students']
+        self.students = dados['students']
+        self._indices = dados['indices']
+        self.reconciliacao = dados['reconciliacao']
+        self._id_por_nome = dados['id_por_nome']
+    
+    def _filtro_colunas(self, form: str):
+        """usecols de uma sheet: colunas referenciadas, comparando cabeçalhos normalizados"""
+        if not self.somente_referenciadas:
+            return None
+        colunas = self._colunas[form]
+        return lambda coluna: normalizar_cabecalho(coluna) in colunas
+    
     def _build_student_list(self):
-        """Cria lista de estudantes únicos baseado em NOME COMPLETO e EMAIL"""
-        students_set = set()
-        
-        # Coletar de todas as sheets
-        for df in [self.df_matricula, self.df_inicial, self.df_medico]:
-            if df is not None and len(df) > 0:
-                for _, row in df.iterrows():
-                    nome = row.get('NOME COMPLETO', '')
-                    email = row.get('EMAIL', '')
-                    
-                    if pd.notna(nome) and nome:
-                        students_set.add((str(nome).strip(), str(email).strip() if pd.notna(email) else ''))
-        
-        # Ordenar por nome
-        self.students = sorted(list(students_set), key=lambda x: x[0])
+        """
+        Cria lista de estudantes únicos baseado em NOME COMPLETO e EMAIL
+
+        Também marca em quais formulários cada estudante aparece
+        (self.df_students: nome, email, matricula, inicial, medico).
+        Descarta a reconciliação anterior (ver _build_reconciliacao).
+        """
+        self.reconciliacao = None
+        self._id_por_nome = {}
+        partes = []
+        for form, df in self._sheets():
+            if df is None or len(df) == 0 or 'NOME COMPLETO' not in df.columns:
+                continue
+            nomes = df['NOME COMPLETO']
+            validos = nomes.notna() & nomes.astype(bool)
+            if 'EMAIL' in df.columns:
+                emails = df.loc[validos, 'EMAIL']
+                emails = emails.astype(str).str.strip().where(emails.notna(), '')
+            else:
+                emails = pd.Series('', index=nomes.index[validos])
+            partes.append(pd.DataFrame({
+                'nome': nomes[validos].astype(str).str.strip(),
+                'email': emails,
+                'form': form,
+            }))
+
+        if not partes:
+            self.df_students = pd.DataFrame(columns=['nome', 'email'] + FORMULARIOS)
+            self.students = []
+            return
+
+        todos = pd.concat(partes, ignore_index=True)
+        # groupby ordena por (nome, email) e marca presença por formulário de uma vez
+        presenca = (
+            pd.get_dummies(todos['form'], dtype=bool)
+            .groupby([todos['nome'], todos['email']])
+            .any()
+            .reindex(columns=FORMULARIOS, fill_value=False)
+        )
+        self.df_students = presenca.reset_index()
+        self.students = list(zip(self.df_students['nome'], self.df_students['email']))
     
+    def _sheets(self) -> List[Tuple[str, Optional[pd.DataFrame]]]:
+        """Sheets na ordem usada pelos dados do estudante"""
+        return list(zip(FORMULARIOS, [self.df_matricula, self.df_inicial, self.df_medico]))
+
+    def _build_indices(self):
+        """
+        Indexa cada sheet por (NOME COMPLETO, EMAIL) e por NOME COMPLETO, já sem
+        espaços nas pontas, apontando para a primeira linha de cada chave.
+
+        Células que não são texto (vazias, números) não entram no índice, assim
+        como não casavam na comparação com .str.strip() feita antes.
+        """
+        self._indices = {}
+        for form, df in self._sheets():
+            por_chave: Dict[Tuple[str, str], int] = {}
+            por_nome: Dict[str, int] = {}
+            if df is not None and 'NOME COMPLETO' in df.columns:
+                nomes = df['NOME COMPLETO'].tolist()
+                emails = df['EMAIL'].tolist() if 'EMAIL' in df.columns else [None] * len(nomes)
+                for pos, (nome, email) in enumerate(zip(nomes, emails)):
+                    if not isinstance(nome, str):
+                        continue
+                    nome = nome.strip()
+                    por_nome.setdefault(nome, pos)
+                    if isinstance(email, str):
+                        por_chave.setdefault((nome, email.strip()), pos)
+            self._indices[form] = (por_chave, por_nome)
+
+    def _build_plano(self):
+        """Resolve cabeçalhos -> posições de coluna uma vez por planilha (ver resolucao.py)"""
+        self.plano = PlanoResolucao({
+            form: list(df.columns) if df is not None else []
+            for form, df in self._sheets()
+        })
+        self._matrizes = {}
+
+    def _matriz(self, form: str, df: pd.DataFrame) -> np.ndarray:
+        """Valores da sheet como matriz de objetos, montada no primeiro acesso"""
+        matriz = self._matrizes.get(form)
+        if matriz is None:
+            matriz = df.to_numpy(dtype=object)
+            self._matrizes[form] = matriz
+        return matriz
+
+    def _build_reconciliacao(self):
+        """
+        Agrupa variações de (nome, email) do mesmo estudante entre as sheets
+        (ver reconciliacao.py) e refaz a lista de estudantes com um id por
+        estudante: df_students passa a ter a coluna 'id'.
+        """
+        self.reconciliacao = reconciliar_identidades(self._sheets())
+        ids = sorted(
+            self.reconciliacao.representante,
+            key=lambda i: self.reconciliacao.representante[i],
+        )
+        posicoes = self.reconciliacao.posicoes
+        self.df_students = pd.DataFrame({
+            'id': ids,
+            'nome': [self.reconciliacao.representante[i][0] for i in ids],
+            'email': [self.reconciliacao.representante[i][1] for i in ids],
+            **{form: [form in posicoes[i] for i in ids] for form in FORMULARIOS},
+        }, columns=['id', 'nome', 'email'] + FORMULARIOS)
+        self.students = list(zip(self.df_students['nome'], self.df_students['email']))
+        self._id_por_nome = {}
+        for (nome, _), id_estudante in self.reconciliacao.id_por_par.items():
+            self._id_por_nome.setdefault(nome, id_estudante)
+
     def get_students(self) -> List[Dict[str, str]]:
         """
         Retorna lista de estudantes
         
         Returns:
-            Lista de dicionários com nome e email de cada estudante
+            Lista de dicionários com nome, email, 'formularios'
+            ({'matricula': bool, 'inicial': bool, 'medico': bool}) e, com a
+            reconciliação ativa, o 'id' de cada estudante
+        """
+        presenca = self.df_students[FORMULARIOS].to_numpy()
+        estudantes = [
+            {'nome': nome, 'email': email, 'formularios': dict(zip(FORMULARIOS, flags))}
+            for (nome, email), flags in zip(self.students, presenca.tolist())
+        ]
+        if 'id' in self.df_students.columns:
+            for estudante, id_estudante in zip(estudantes, self.df_students['id'].tolist()):
+                estudante['id'] = id_estudante
+        return estudantes
+    
+    def get_student_id(self, nome: str, email: str) -> Optional[str]:
+        """Id reconciliado do estudante com esse (nome, email), ou None"""
+        if self.reconciliacao is None:
+            return None
+        nome = nome.strip()
+        email = email.strip() if email else ''
+        id_estudante = self.reconciliacao.id_por_par.get((nome, email))
+        if id_estudante is None and not email:
+            id_estudante = self._id_por_nome.get(nome)
+        return id_estudante
+    
+    def get_student_variants(self, student_id: str) -> List[Tuple[str, str]]:
+        """Pares (nome, email) reunidos no estudante pela reconciliação"""
+        if self.reconciliacao is None:
+            return []
+        return sorted(self.reconciliacao.membros.get(student_id, []))
+    
+    def _positions(self, nome: str, email: str) -> Dict[str, Optional[int]]:
+        """Posição do estudante em cada sheet: pelo id reconciliado ou, sem ele, pelo índice exato"""
+        id_estudante = self.get_student_id(nome, email)
+        if id_estudante is not None:
+            return self._positions_by_id(id_estudante)
+
+        if not self._indices:
+            self._build_indices()
+        nome = nome.strip()
+        email = email.strip() if email else ''
+        posicoes: Dict[str, Optional[int]] = {}
+        for form, df in self._sheets():
+            posicoes[form] = None
+            if df is None:
+                continue
+            por_chave, por_nome = self._indices[form]
+            posicoes[form] = por_chave.get((nome, email)) if email else por_nome.get(nome)
+        return posicoes
+    
+    def _positions_by_id(self, student_id: str, envio: int = 0) -> Dict[str, Optional[int]]:
+        """
+        Posição do estudante em cada sheet. Com o formulário enviado mais de
+        uma vez, `envio` escolhe a linha (0 = primeira; além do último, o último).
+        """
+        encontradas = self.reconciliacao.posicoes.get(student_id, {}) if self.reconciliacao else {}
+        posicoes: Dict[str, Optional[int]] = {}
+        for form in FORMULARIOS:
+            lista = encontradas.get(form)
+            posicoes[form] = lista[min(envio, len(lista) - 1)] if lista else None
+        return posicoes
+    
+    def get_student_submissions(self, student_id: str) -> Dict[str, int]:
+        """Quantas linhas (envios) o estudante tem em cada sheet"""
+        encontradas = self.reconciliacao.posicoes.get(student_id, {}) if self.reconciliacao else {}
+        return {form: len(encontradas.get(form, [])) for form in FORMULARIOS}
+    
+    def get_student_positions(self, form: str) -> np.ndarray:
+        """
+        Posição na sheet do formulário de cada estudante de self.students
+        (-1 para quem não enviou o formulário), na mesma ordem da lista.
+        Com mais de um envio, vale a primeira linha.
+        """
+        if self.reconciliacao is not None:
+            return np.array(
+                [self.reconciliacao.posicoes[i].get(form, [-1])[0] for i in self.df_students['id']],
+                dtype=np.int64,
+            )
+        if not self._indices:
+            self._build_indices()
+        por_chave, por_nome = self._indices[form]
+        return np.array(
+            [por_chave.get((nome, email), -1) if email else por_nome.get(nome, -1)
+             for nome, email in self.students],
+            dtype=np.int64,
+        )
+
+    def _rows(self, posicoes: Dict[str, Optional[int]]) -> Dict[str, Optional[np.ndarray]]:
+        linhas: Dict[str, Optional[np.ndarray]] = {}
+        for form, df in self._sheets():
+            pos = posicoes.get(form)
+            linhas[form] = self._matriz(form, df)[pos] if df is not None and pos is not None else None
+        return linhas
+    
+    def _data(self, posicoes: Dict[str, Optional[int]]) -> Dict:
+        data = {
+            'matricula': {},
+            'inicial': {},
+            'medico': {}
+        }
+        for form, df in self._sheets():
+            pos = posicoes.get(form)
+            if df is not None and pos is not None:
+                data[form] = df.iloc[pos].to_dict()
+        return data
+    
+    def get_student_rows(self, nome: str, email: str) -> Dict[str, Optional[np.ndarray]]:
+        """
+        Linha de cada formulário do estudante, como vetor de valores na ordem
+        das colunas da sheet (None se não houver registro).
+
+        Usada com os campos compilados por self.plano (resolucao.valor_campo).
         """
-        return [{'nome': nome, 'email': email} for nome, email in self.students]
+        return self._rows(self._positions(nome, email))
+    
+    def get_student_rows_by_id(self, student_id: str, envio: int = 0) -> Dict[str, Optional[np.ndarray]]:
+        """Como get_student_rows, a partir do id reconciliado (envio: ver _positions_by_id)"""
+        return self._rows(self._positions_by_id(student_id, envio))
     
     def get_student_data(self, nome: str, email: str) -> Dict:
         """
         Busca dados de um estudante específico em todas as sheets
         
+        Com a reconciliação ativa, traz também os registros do mesmo
+        estudante com outra grafia de nome/email nas demais sheets.
+        
         Args:
             nome: Nome completo do estudante
             email: Email do estudante
@@ -79,40 +430,13 @@ class ExcelReader:
         Returns:
             Dicionário com os dados do estudante organizados por formulário
         """
-        data = {
-            'matricula': {},
-            'inicial': {},
-            'medico': {}
-        }
-        
-        # Buscar em Form_Matrícula
-        if self.df_matricula is not None:
-            mask = (self.df_matricula['NOME COMPLETO'].str.strip() == nome.strip())
-            if email:
-                mask = mask & (self.df_matricula['EMAIL'].str.strip() == email.strip())
-            
-            matches = self.df_matricula[mask]
-            if len(matches) > 0:
-                data['matricula'] = matches.iloc[0].to_dict()
-        
-        # Buscar em Form_Inicial
-        if self.df_inicial is not None:
-            mask = (self.df_inicial['NOME COMPLETO'].str.strip() == nome.strip())
-            if email:
-                mask = mask & (self.df_inicial['EMAIL'].str.strip() == email.strip())
-            
-            matches = self.df_inicial[mask]
-            if len(matches) > 0:
-                data['inicial'] = matches.iloc[0].to_dict()
-        
-        # Buscar em Form_Médico
-        if self.df_medico is not None:
-            mask = (self.df_medico['NOME COMPLETO'].str.strip() == nome.strip())
-            if email:
-                mask = mask & (self.df_medico['EMAIL'].str.strip() == email.strip())
-            
-            matches = self.df_medico[mask]
-            if len(matches) > 0:
-                data['medico'] = matches.iloc[0].to_dict()
+        return self._data(self._positions(nome, email))
+    
+    def get_student_data_by_id(self, student_id: str) -> Dict:
+        """
+        Dados do estudante pelo id reconciliado (get_students()[i]['id'])
         
-        return data
\ No newline at end of file
+        Returns:
+            Dicionário com os dados do estudante organizados por formulário
+        """
+        return self._data(self._positions_by_id(student_id))
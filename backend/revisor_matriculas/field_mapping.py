@@ -4,6 +4,10 @@ Mapeamento de campos para exibição organizada
 Baseado na estrutura dos formulários reais
 """
 
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from shared.utils import remover_acentos
+
 # Mapeamento de campos do formulário de matrícula (Atlantic/NSISP)
 # Organizado na ordem de preenchimento dos formulários
 FORM_MATRICULA_SECTIONS = {
@@ -587,4 +591,55 @@ def get_field_label(field_name: str) -> str:
     if label:
         label = label[0].upper() + label[1:].lower()
     
-    return label
\ No newline at end of file
+    return label
+
+
+# ============================================================================
+# COLUNAS REFERENCIADAS
+# ============================================================================
+
+# Rótulo da fonte usado nos mapeamentos -> chave do formulário no ExcelReader
+FONTES = {'Matrícula': 'matricula', 'Inicial': 'inicial', 'Médico': 'medico'}
+
+# Colunas lidas em todos os formulários, além das seções:
+# identificação do estudante (CPF usado na reconciliação) e o cabeçalho exibido pelas páginas
+COLUNAS_BASE = ['NOME COMPLETO', 'EMAIL', 'NUMERO DO CPF DO ESTUDANTE', 'GRUPO', 'PROGRAMA', 'STATUS']
+
+def normalizar_cabecalho(texto) -> str:
+    """
+    Forma canônica de um cabeçalho para comparação: sem acentos, maiúsculo e
+    com espaços colapsados ("Cidade  de nascimento " == "CIDADE DE NASCIMENTO").
+    """
+    return remover_acentos(texto).upper()
+
+
+def campos_referenciados(
+    grupos_extras: Optional[Dict[str, Dict[str, Iterable[Tuple[str, str]]]]] = None
+) -> Dict[str, Set[str]]:
+    """
+    Colunas usadas por formulário ('matricula', 'inicial', 'medico').
+
+    Junta COLUNAS_BASE, FORM_*_SECTIONS e UNIFIED_SECTIONS. grupos_extras
+    recebe mapeamentos no formato {grupo: {subseção: [(campo, fonte), ...]}},
+    como o HIERARCHICAL_GROUPS da página do revisor.
+
+    Returns:
+        Dict formulário -> nomes de colunas (como aparecem nos mapeamentos)
+    """
+    campos = {form: set(COLUNAS_BASE) for form in FONTES.values()}
+    for form, secoes in (
+        ('matricula', FORM_MATRICULA_SECTIONS),
+        ('inicial', FORM_INICIAL_SECTIONS),
+        ('medico', FORM_MEDICO_SECTIONS),
+    ):
+        for fields in secoes.values():
+            campos[form].update(fields)
+
+    pares = [par for secao in UNIFIED_SECTIONS.values() for par in secao['fields']]
+    for subsecoes in (grupos_extras or {}).values():
+        for lista in subsecoes.values():
+            pares.extend(lista)
+    for campo, fonte in pares:
+        if fonte in FONTES:
+            campos[FONTES[fonte]].add(campo)
+    return campos
@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""
+Backend - Reconciliação de identidade entre os formulários
+
+O mesmo estudante pode aparecer com (nome, email) ligeiramente diferentes em
+Form_Matrícula, Form_Inicial e Form_Médico (email digitado errado, acento a
+menos no nome). Esta etapa agrupa essas variações em um único estudante,
+com um id estável usado por todas as buscas do ExcelReader.
+
+ETAPAS:
+1. Cada par exato (nome, email) das três sheets é um registro; o CPF do
+   estudante, quando a sheet tem a coluna, é anexado ao registro.
+2. Blocagem: só são comparados registros que compartilham uma chave de
+   bloco (CPF, email, nome dobrado ou primeiro + último nome). Blocos com
+   mais de MAX_BLOCO registros (nomes muito comuns, emails genéricos) não
+   são comparados par a par; isso evita O(n²).
+3. Pontuação de cada par candidato (blocos de CPF primeiro):
+   - mesmo CPF: mesmo estudante
+   - CPFs diferentes: nunca o mesmo estudante, comparando os CPFs já
+     acumulados nos dois grupos (A com CPF x, B sem CPF e C com CPF y não
+     viram um estudante só por B parecer com os dois)
+   - registros diferentes na mesma sheet: só com CPF em comum (cada
+     estudante envia cada formulário uma vez; homônimos ficam separados)
+   - mesmo email: nomes com similaridade >= SIMILARIDADE_NOME_EMAIL
+   - mesmo nome: emails compatíveis (um vazio ou similaridade >= SIMILARIDADE_EMAIL)
+   - mesmo primeiro + último nome: nomes >= SIMILARIDADE_NOME e emails compatíveis
+4. Union-find junta os pares aceitos. O id de cada grupo vem do menor CPF
+   do grupo ou, sem CPF, do menor (nome dobrado, email): não muda entre
+   recarregamentos da mesma planilha nem quando outras linhas são incluídas.
+"""
+
+import hashlib
+import re
+from difflib import SequenceMatcher
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from .busca import dobrar_texto
+from .field_mapping import normalizar_cabecalho
+
+# Coluna com o CPF do estudante (procurada em todas as sheets)
+COLUNA_CPF = 'NUMERO DO CPF DO ESTUDANTE'
+
+# Blocos (exceto de CPF) maiores que isso não são comparados par a par
+MAX_BLOCO = 50
+
+SIMILARIDADE_NOME = 0.9
+SIMILARIDADE_NOME_EMAIL = 0.8
+SIMILARIDADE_EMAIL = 0.8
+
+# Ordem de preferência do (nome, email) exibido para um estudante
+PRIORIDADE_FORMULARIOS = ['matricula', 'inicial', 'medico']
+
+_NAO_DIGITOS = re.compile(r'\D')
+
+Par = Tuple[str, str]
+
+
+def normalizar_cpf(valor) -> str:
+    """
+    Somente os dígitos do CPF; '' se não for um CPF de 11 dígitos.
+
+    Com 9 ou 10 dígitos completa com zeros à esquerda: o Excel os perde
+    quando o CPF é digitado como número.
+    """
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    digitos = _NAO_DIGITOS.sub('', str(valor))
+    if 9 <= len(digitos) < 11:
+        digitos = digitos.zfill(11)
+    return digitos if len(digitos) == 11 else ''
+
+
+class _UniaoBusca:
+    """Union-find com compressão de caminho; cada raiz guarda os CPFs e formulários do grupo"""
+
+    def __init__(self, cpfs: List[Set[str]], formularios: List[Iterable[str]]):
+        self.pai = list(range(len(cpfs)))
+        self.cpfs = [set(c) for c in cpfs]
+        self.formularios = [set(f) for f in formularios]
+
+    def raiz(self, i: int) -> int:
+        while self.pai[i] != i:
+            self.pai[i] = self.pai[self.pai[i]]
+            i = self.pai[i]
+        return i
+
+    def compativeis(self, a: int, b: int) -> bool:
+        """Se os grupos de a e b podem ser o mesmo estudante (ver etapa 3)"""
+        ra, rb = self.raiz(a), self.raiz(b)
+        if ra == rb:
+            return True
+        cpfs_a, cpfs_b = self.cpfs[ra], self.cpfs[rb]
+        if cpfs_a and cpfs_b:
+            return bool(cpfs_a & cpfs_b)
+        return not (self.formularios[ra] & self.formularios[rb])
+
+    def unir(self, a: int, b: int):
+        ra, rb = self.raiz(a), self.raiz(b)
+        if ra != rb:
+            nova, antiga = min(ra, rb), max(ra, rb)
+            self.pai[antiga] = nova
+            self.cpfs[nova] |= self.cpfs[antiga]
+            self.formularios[nova] |= self.formularios[antiga]
+
+
+class Reconciliacao:
+    """
+    Resultado da reconciliação: grupos de pares (nome, email) por id de estudante
+
+    Atributos:
+        id_por_par: (nome, email) -> id do estudante
+        representante: id -> (nome, email) exibido
+        posicoes: id -> {formulário: posições das linhas do estudante na sheet, em ordem}
+        membros: id -> pares (nome, email) reunidos no estudante
+    """
+
+    def __init__(
+        self,
+        id_por_par: Dict[Par, str],
+        representante: Dict[str, Par],
+        posicoes: Dict[str, Dict[str, List[int]]]
+    ):
+        self.id_por_par = id_por_par
+        self.representante = representante
+        self.posicoes = posicoes
+        self.membros: Dict[str, List[Par]] = {}
+        for par, id_estudante in id_por_par.items():
+            self.membros.setdefault(id_estudante, []).append(par)
+
+    @property
+    def mesclados(self) -> int:
+        """Quantos estudantes juntaram mais de um par (nome, email)"""
+        return sum(1 for pares in self.membros.values() if len(pares) > 1)
+
+
+def _similaridade(a: str, b: str) -> float:
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def _emails_compativeis(a: str, b: str) -> bool:
+    return not a or not b or a == b or _similaridade(a, b) >= SIMILARIDADE_EMAIL
+
+
+def reconciliar_identidades(sheets: Iterable[Tuple[str, Optional[pd.DataFrame]]]) -> Reconciliacao:
+    """
+    Agrupa os pares (nome, email) das sheets em estudantes.
+
+    Args:
+        sheets: pares (formulário, DataFrame), como ExcelReader._sheets()
+
+    Returns:
+        Reconciliacao com o id de cada par (nome, email) e o representante de cada id
+    """
+    pares: List[Par] = []
+    indice: Dict[Par, int] = {}
+    cpfs: List[Set[str]] = []
+    posicoes_par: List[Dict[str, List[int]]] = []
+
+    for form, df in sheets:
+        if df is None or len(df) == 0 or 'NOME COMPLETO' not in df.columns:
+            continue
+        nomes = df['NOME COMPLETO'].tolist()
+        emails = df['EMAIL'].tolist() if 'EMAIL' in df.columns else [None] * len(nomes)
+        coluna_cpf = next(
+            (c for c in df.columns if normalizar_cabecalho(c) == COLUNA_CPF), None
+        )
+        valores_cpf = df[coluna_cpf].tolist() if coluna_cpf is not None else [None] * len(nomes)
+
+        for pos, (nome, email, cpf) in enumerate(zip(nomes, emails, valores_cpf)):
+            # Mesmos critérios de _build_student_list
+            if nome is None or (not isinstance(nome, str) and pd.isna(nome)) or not nome:
+                continue
+            par = (str(nome).strip(), '' if email is None or pd.isna(email) else str(email).strip())
+            i = indice.get(par)
+            if i is None:
+                i = indice[par] = len(pares)
+                pares.append(par)
+                cpfs.append(set())
+                posicoes_par.append({})
+            posicoes_par[i].setdefault(form, []).append(pos)
+            cpf = normalizar_cpf(cpf)
+            if cpf:
+                cpfs[i].add(cpf)
+
+    nomes_dobrados = [dobrar_texto(nome) for nome, _ in pares]
+    emails_dobrados = [email.lower() for _, email in pares]
+
+    blocos: Dict[Tuple[str, str], List[int]] = {}
+    for i in range(len(pares)):
+        for cpf in cpfs[i]:
+            blocos.setdefault(('cpf', cpf), []).append(i)
+        if emails_dobrados[i]:
+            blocos.setdefault(('email', emails_dobrados[i]), []).append(i)
+        tokens = nomes_dobrados[i].split()
+        if tokens:
+            blocos.setdefault(('nome', nomes_dobrados[i]), []).append(i)
+            blocos.setdefault(('extremos', f"{tokens[0]} {tokens[-1]}"), []).append(i)
+
+    uf = _UniaoBusca(cpfs, posicoes_par)
+    # Blocos de CPF primeiro: os grupos já levam seus CPFs para as comparações por nome/email
+    for (tipo, _), membros in sorted(blocos.items(), key=lambda item: item[0][0] != 'cpf'):
+        if len(membros) < 2:
+            continue
+        if tipo == 'cpf':
+            for i in membros[1:]:
+                uf.unir(membros[0], i)
+            continue
+        if len(membros) > MAX_BLOCO:
+            continue
+        for a, b in combinations(membros, 2):
+            if not uf.compativeis(a, b):
+                continue
+            if tipo == 'email':
+                aceito = (nomes_dobrados[a] == nomes_dobrados[b]
+                          or _similaridade(nomes_dobrados[a], nomes_dobrados[b]) >= SIMILARIDADE_NOME_EMAIL)
+            elif tipo == 'nome':
+                aceito = _emails_compativeis(emails_dobrados[a], emails_dobrados[b])
+            else:
+                aceito = (_similaridade(nomes_dobrados[a], nomes_dobrados[b]) >= SIMILARIDADE_NOME
+                          and _emails_compativeis(emails_dobrados[a], emails_dobrados[b]))
+            if aceito:
+                uf.unir(a, b)
+
+    grupos: Dict[int, List[int]] = {}
+    for i in range(len(pares)):
+        grupos.setdefault(uf.raiz(i), []).append(i)
+
+    id_por_par: Dict[Par, str] = {}
+    representante: Dict[str, Par] = {}
+    posicoes: Dict[str, Dict[str, List[int]]] = {}
+    for membros in grupos.values():
+        cpfs_grupo = set().union(*(cpfs[i] for i in membros))
+        if cpfs_grupo:
+            base = f"cpf:{min(cpfs_grupo)}"
+        else:
+            base = "par:" + min(f"{nomes_dobrados[i]}|{emails_dobrados[i]}" for i in membros)
+        id_estudante = 'E' + hashlib.sha1(base.encode('utf-8')).hexdigest()[:10]
+        while id_estudante in representante:
+            # Só acontece com CPFs conflitantes sobre o mesmo nome/email: desempata
+            base += '#'
+            id_estudante = 'E' + hashlib.sha1(base.encode('utf-8')).hexdigest()[:10]
+        posicoes_grupo: Dict[str, List[int]] = {}
+        for i in membros:
+            id_por_par[pares[i]] = id_estudante
+            for form, lista in posicoes_par[i].items():
+                posicoes_grupo.setdefault(form, []).extend(lista)
+        posicoes[id_estudante] = {form: sorted(lista) for form, lista in posicoes_grupo.items()}
+        # Representante: par do formulário de maior prioridade (depois, o de email preenchido)
+        representante[id_estudante] = pares[min(
+            membros,
+            key=lambda i: (
+                min(PRIORIDADE_FORMULARIOS.index(f) for f in posicoes_par[i]),
+                not pares[i][1],
+                i,
+            ),
+        )]
+
+    return Reconciliacao(id_por_par, representante, posicoes)
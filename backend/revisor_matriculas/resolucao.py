@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Backend - Plano de resolução de campos
+
+Resolve, uma única vez por planilha carregada, cada campo dos mapeamentos
+(FORM_*_SECTIONS, UNIFIED_SECTIONS, grupos da página) para o índice da coluna
+correspondente em cada sheet. O nome exato do cabeçalho tem prioridade; se
+não existir, vale o cabeçalho normalizado (normalizar_cabecalho), o que
+tolera variações de acento, caixa e espaços entre exportações.
+
+Com o plano compilado, exibir um estudante é só ler posições da linha
+(ExcelReader.get_student_rows), sem procurar nomes de campo a cada render.
+"""
+
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from .field_mapping import FONTES, normalizar_cabecalho
+
+
+class CampoResolvido(NamedTuple):
+    """Campo de um mapeamento já ligado a uma coluna (None se a sheet não tem a coluna)"""
+    campo: str
+    fonte: str
+    form: str
+    coluna: Optional[int]
+
+
+class PlanoResolucao:
+    """Índice cabeçalho -> posição da coluna, por formulário"""
+
+    def __init__(self, colunas: Dict[str, Sequence]):
+        """
+        Args:
+            colunas: formulário ('matricula', 'inicial', 'medico') -> cabeçalhos da sheet
+        """
+        self._exatos: Dict[str, Dict[str, int]] = {}
+        self._normalizados: Dict[str, Dict[str, int]] = {}
+        for form, cabecalhos in colunas.items():
+            exatos: Dict[str, int] = {}
+            normalizados: Dict[str, int] = {}
+            for i, cabecalho in enumerate(cabecalhos):
+                exatos.setdefault(str(cabecalho), i)
+                normalizados.setdefault(normalizar_cabecalho(cabecalho), i)
+            self._exatos[form] = exatos
+            self._normalizados[form] = normalizados
+
+    def coluna(self, form: str, campo: str) -> Optional[int]:
+        """Posição da coluna do campo na sheet do formulário, ou None"""
+        exatos = self._exatos.get(form)
+        if exatos is None:
+            return None
+        if campo in exatos:
+            return exatos[campo]
+        return self._normalizados[form].get(normalizar_cabecalho(campo))
+
+    def resolver(self, campo: str, fonte: str) -> CampoResolvido:
+        """Resolve um par (campo, fonte) dos mapeamentos ('Matrícula', 'Inicial', 'Médico')"""
+        form = FONTES.get(fonte, '')
+        return CampoResolvido(campo, fonte, form, self.coluna(form, campo))
+
+    def compilar_secoes(self, secoes: Dict[str, Iterable[str]], form: str) -> Dict[str, List[CampoResolvido]]:
+        """Compila um FORM_*_SECTIONS ({seção: [campo, ...]}) de um formulário"""
+        fonte = next((f for f, k in FONTES.items() if k == form), '')
+        return {
+            titulo: [CampoResolvido(campo, fonte, form, self.coluna(form, campo)) for campo in campos]
+            for titulo, campos in secoes.items()
+        }
+
+    def compilar_grupos(
+        self,
+        grupos: Dict[str, Dict[str, Iterable[Tuple[str, str]]]]
+    ) -> Dict[str, Dict[str, List[CampoResolvido]]]:
+        """Compila mapeamentos {grupo: {subseção: [(campo, fonte), ...]}}"""
+        return {
+            grupo: {
+                subsecao: [self.resolver(campo, fonte) for campo, fonte in pares]
+                for subsecao, pares in subsecoes.items()
+            }
+            for grupo, subsecoes in grupos.items()
+        }
+
+    def compilar_unificado(self, secoes: Dict[str, Dict]) -> Dict[str, List[CampoResolvido]]:
+        """Compila o UNIFIED_SECTIONS ({seção: {'fields': [(campo, fonte), ...]}})"""
+        return {
+            titulo: [self.resolver(campo, fonte) for campo, fonte in secao['fields']]
+            for titulo, secao in secoes.items()
+        }
+
+
+def valor_campo(linhas: Dict[str, Optional[Sequence]], campo: CampoResolvido, padrao=""):
+    """
+    Valor de um campo compilado na linha do estudante (ExcelReader.get_student_rows).
+
+    Retorna `padrao` se o estudante não tem registro no formulário ou a sheet
+    não tem a coluna, como o .get(campo, "") usado antes sobre os dicts.
+    """
+    linha = linhas.get(campo.form)
+    if linha is None or campo.coluna is None:
+        return padrao
+    return linha[campo.coluna]
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""
+Griffe Hub - Acesso às configurações centralizadas
+
+Os módulos do backend são importados de dois jeitos: com a raiz do projeto
+no path (backend.docfill...) ou, nas páginas Streamlit, só com a pasta
+backend (docfill..., shared...). Este módulo resolve backend/config.py nos
+dois casos, para que os demais importem as configurações de um único lugar:
+
+    from shared.configuracao import PROCESSED_DIR
+"""
+
+import importlib.util
+from pathlib import Path
+
+try:
+    from backend import config as _config
+except ImportError:
+    # Só a pasta backend no path: carrega o mesmo backend/config.py pelo caminho
+    _spec = importlib.util.spec_from_file_location(
+        "griffe_hub_config", Path(__file__).resolve().parent.parent / "config.py"
+    )
+    _config = importlib.util.module_from_spec(_spec)
+    _spec.loader.exec_module(_config)
+
+DATA_DIR: Path = _config.DATA_DIR
+PROCESSED_DIR: Path = _config.PROCESSED_DIR
+TEMP_DIR: Path = _config.TEMP_DIR
+UPLOADS_DIR: Path = _config.UPLOADS_DIR
+LOG_FILE: Path = _config.LOG_FILE
+LOG_LEVEL: str = _config.LOG_LEVEL
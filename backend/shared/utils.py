@@ -4,10 +4,21 @@ Griffe Hub - Utilitários Compartilhados
 """
 
 import logging
+import os
 import re
-from typing import Optional
+import tempfile
+import unicodedata
+from typing import Callable, Optional
 from pathlib import Path
-from backend.config import LOG_FILE, LOG_LEVEL
+
+import numpy as np
+import pandas as pd
+
+from .configuracao import LOG_FILE, LOG_LEVEL
+
+# Padrões compilados uma vez (normalizar_nome é chamada para cada célula)
+_ESPACOS = re.compile(r"\s+")
+_CARACTERES_INVALIDOS_NOME = re.compile(r"[^A-ZÁÉÍÓÚÂÊÔÃÕÇ/\s\-']", re.IGNORECASE)
 
 def setup_logger(name: str) -> logging.Logger:
     """
@@ -41,7 +52,16 @@ def limpar_espacos(texto: Optional[str]) -> Optional[str]:
     """Remove espaços múltiplos de uma string"""
     if not texto:
         return texto
-    return re.sub(r"\s+", " ", texto).strip()
+    return _ESPACOS.sub(" ", texto).strip()
+
+def remover_acentos(texto) -> str:
+    """
+    Texto sem acentos e com espaços colapsados, mantendo maiúsculas e
+    minúsculas ("  Conceição  da Silva" -> "Conceicao da Silva").
+    """
+    texto = unicodedata.normalize("NFKD", str(texto))
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return _ESPACOS.sub(" ", texto).strip()
 
 def normalizar_nome(nome: str) -> str:
     """
@@ -57,16 +77,74 @@ def normalizar_nome(nome: str) -> str:
         return ""
     
     # Remove caracteres especiais mantendo letras, espaços, / e -
-    nome = re.sub(r"[^A-ZÁÉÍÓÚÂÊÔÃÕÇ/\s\-']", "", nome, flags=re.IGNORECASE)
+    nome = _CARACTERES_INVALIDOS_NOME.sub("", nome)
     
-    # Remove espaços múltiplos
-    nome = limpar_espacos(nome)
+    # Remove espaços múltiplos (mesmo resultado de limpar_espacos: split()
+    # separa pelos mesmos caracteres que \s, sem uma segunda passada de regex)
+    nome = " ".join(nome.split())
     
     # Remove traços no início/fim
     nome = nome.strip("-").strip()
     
     return nome.upper()
 
+def transformar_texto_serie(serie: pd.Series, transformar: Callable[[str], str]) -> pd.Series:
+    """
+    Aplica uma função de texto aos valores preenchidos de uma coluna
+    
+    Mesmo resultado de serie.apply(lambda x: transformar(str(x)) if pd.notna(x) else x):
+    a máscara de ausentes, a conversão para str e a inferência do tipo do
+    resultado são feitas uma vez para a coluna inteira; por célula resta
+    apenas a chamada de `transformar`.
+    
+    Args:
+        serie: Coluna original (valores ausentes são mantidos como estão)
+        transformar: Função str -> str aplicada a cada valor preenchido
+    
+    Returns:
+        Nova Series com o mesmo índice e nome
+    """
+    preenchidos = serie.notna().to_numpy()
+    valores = serie.to_numpy(dtype=object, copy=True)
+    if preenchidos.any():
+        # Via object: str() de cada valor, como no apply (datas inclusive)
+        textos = serie[preenchidos].astype(object).astype(str).tolist()
+        resultado = np.empty(len(textos), dtype=object)
+        resultado[:] = [transformar(texto) for texto in textos]
+        valores[preenchidos] = resultado
+    # Mesma inferência de tipo do resultado de apply
+    return pd.Series(valores, index=serie.index, name=serie.name).infer_objects()
+
+def normalizar_nomes_serie(nomes: pd.Series) -> pd.Series:
+    """
+    normalizar_nome aplicado a uma coluna inteira
+    
+    Args:
+        nomes: Coluna de nomes (valores ausentes são mantidos)
+    
+    Returns:
+        Coluna com os nomes normalizados
+    """
+    return transformar_texto_serie(nomes, normalizar_nome)
+
+def gravar_atomico(caminho: Path, dados: bytes) -> None:
+    """
+    Grava em arquivo temporário na mesma pasta e renomeia: quem lê nunca
+    encontra o arquivo pela metade.
+
+    Args:
+        caminho: Destino (a pasta precisa existir)
+        dados:   Conteúdo do arquivo
+    """
+    fd, tmp = tempfile.mkstemp(dir=caminho.parent, prefix=".tmp_")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(dados)
+        os.replace(tmp, caminho)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
 def validar_arquivo_pdf(arquivo_path: Path) -> bool:
     """
     Valida se o arquivo é um PDF válido
@@ -10,6 +10,7 @@ VERSÃO 2.0 - Com features de agrupamento por nome e dispersão por cidade
 
 import streamlit as st
 import pandas as pd
+import copy
 from datetime import datetime
 from pathlib import Path
 import sys
@@ -32,6 +33,13 @@ try:
         SCORE_MESMA_REGIAO,
         SCORE_OUTRA_REGIAO,
     )
+    from alocacao.cache import alocar_estudantes_cache
+    from alocacao.historico import (
+        salvar_execucao,
+        listar_execucoes,
+        carregar_execucao,
+        comparar_execucoes,
+    )
     BACKEND_DISPONIVEL = True
 except ImportError:
     BACKEND_DISPONIVEL = False
@@ -212,12 +220,17 @@ def inicializar_session_state():
     if 'resultado_alocacao' not in st.session_state:
         st.session_state.resultado_alocacao = None
     
+    # Entradas e configuração com que resultado_alocacao foi gerado
+    if 'execucao_alocacao' not in st.session_state:
+        st.session_state.execucao_alocacao = None
+    
     if 'config' not in st.session_state:
         st.session_state.config = {
             'alunos_intake1': 0,
             'ordem_grupos': [],
             'agrupar_por_nome': False,
             'dispersar_por_cidade': False,
+            'semente_aleatoria': 42,
         }
 
 
@@ -419,6 +432,15 @@ def renderizar_configuracao(df_alunos: pd.DataFrame, df_escolas: pd.DataFrame):
             **Útil para:** Evitar concentração de nomes comuns (Ana, João, Maria)
             """
         )
+        
+        semente_aleatoria = st.number_input(
+            "Semente da ordem aleatória",
+            min_value=0,
+            value=int(config.get('semente_aleatoria', 42)),
+            step=1,
+            disabled=not agrupar_nomes,
+            help="A mesma semente sempre gera a mesma ordem. Troque para testar outro sorteio."
+        )
     
     with col_opt2:
         dispersar_cidades = st.checkbox(
@@ -452,6 +474,7 @@ def renderizar_configuracao(df_alunos: pd.DataFrame, df_escolas: pd.DataFrame):
                 'ordem_grupos': ordem_grupos,
                 'agrupar_por_nome': agrupar_nomes,
                 'dispersar_por_cidade': dispersar_cidades,
+                'semente_aleatoria': int(semente_aleatoria),
             }
             st.success("✅ Configurações salvas!")
             st.rerun()
@@ -463,6 +486,7 @@ def renderizar_configuracao(df_alunos: pd.DataFrame, df_escolas: pd.DataFrame):
                 'ordem_grupos': grupos_disponiveis,
                 'agrupar_por_nome': False,
                 'dispersar_por_cidade': False,
+                'semente_aleatoria': 42,
             }
             st.info("↩️ Configurações resetadas!")
             st.rerun()
@@ -536,13 +560,20 @@ def renderizar_executar(df_alunos: pd.DataFrame, df_escolas: pd.DataFrame):
     if st.button("▶️ EXECUTAR ALOCAÇÃO", type="primary", use_container_width=True):
         with st.spinner("⏳ Processando alocação..."):
             try:
-                resultado = alocar_estudantes(
+                # Entradas idênticas a uma execução anterior reaproveitam o resultado
+                resultado = alocar_estudantes_cache(
                     df_alunos=df_alunos.copy(),
                     df_escolas=df_escolas.copy(),
                     config=config,
                 )
                 
                 st.session_state.resultado_alocacao = resultado
+                # Cópia: a configuração da sessão pode mudar depois da execução
+                st.session_state.execucao_alocacao = {
+                    'config': copy.deepcopy(config),
+                    'df_alunos': df_alunos,
+                    'df_escolas': df_escolas,
+                }
                 st.success("✅ Alocação concluída com sucesso!")
                 st.balloons()
                 st.rerun()
@@ -692,6 +723,102 @@ def renderizar_resultados():
         )
 
 
+# ============================================================================
+# INTERFACE - TAB 5: HISTÓRICO
+# ============================================================================
+
+def renderizar_historico(df_alunos: pd.DataFrame, df_escolas: pd.DataFrame):
+    """Renderiza aba de histórico: salvar execuções e comparar duas delas."""
+    st.header("🕓 Histórico de Execuções")
+    
+    if not BACKEND_DISPONIVEL:
+        st.error("❌ O módulo do algoritmo não está disponível. Verifique a instalação.")
+        return
+    
+    # Salvar execução atual
+    st.subheader("💾 Salvar Execução Atual")
+    
+    if st.session_state.resultado_alocacao is None or st.session_state.execucao_alocacao is None:
+        st.info("👈 Execute a alocação para poder salvá-la no histórico.")
+    else:
+        col_desc, col_btn = st.columns([3, 1])
+        with col_desc:
+            descricao = st.text_input(
+                "Descrição (opcional)",
+                placeholder="Ex: Cenário com dispersão por cidade",
+                key="historico_descricao"
+            )
+        with col_btn:
+            st.markdown("<br>", unsafe_allow_html=True)
+            if st.button("💾 Salvar", type="primary", use_container_width=True):
+                execucao = st.session_state.execucao_alocacao
+                caminho = salvar_execucao(
+                    st.session_state.resultado_alocacao,
+                    execucao['df_alunos'],
+                    execucao['df_escolas'],
+                    config=execucao['config'],
+                    descricao=descricao,
+                )
+                st.success(f"✅ Execução salva: {caminho.stem}")
+    
+    # Comparar execuções
+    st.markdown("---")
+    st.subheader("🔀 Comparar Execuções")
+    
+    execucoes = listar_execucoes()
+    if len(execucoes) < 2:
+        st.info("ℹ️ Salve pelo menos duas execuções para compará-las.")
+        return
+    
+    def _rotulo(i):
+        meta = execucoes[i]
+        rotulo = f"{meta['criado_em'].replace('T', ' ')} · {meta['total_alunos']} alunos"
+        return f"{rotulo} · {meta['descricao']}" if meta.get('descricao') else rotulo
+    
+    col_a, col_b = st.columns(2)
+    with col_a:
+        idx_antes = st.selectbox("Execução base (antes)", range(len(execucoes)), index=1, format_func=_rotulo)
+    with col_b:
+        idx_depois = st.selectbox("Execução comparada (depois)", range(len(execucoes)), index=0, format_func=_rotulo)
+    
+    meta_antes, meta_depois = execucoes[idx_antes], execucoes[idx_depois]
+    if meta_antes['hash_alunos'] != meta_depois['hash_alunos'] or meta_antes['hash_escolas'] != meta_depois['hash_escolas']:
+        st.warning("⚠️ As execuções usaram planilhas de entrada diferentes.")
+    if meta_antes['hash_config'] != meta_depois['hash_config']:
+        st.caption("ℹ️ As execuções usaram configurações diferentes.")
+    
+    antes, _ = carregar_execucao(meta_antes['caminho'])
+    depois, _ = carregar_execucao(meta_depois['caminho'])
+    diff = comparar_execucoes(antes, depois)
+    resumo = diff['resumo']
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Mudaram de Escola", resumo['movidos'])
+    with col2:
+        st.metric("Mudaram de Tier", resumo['tiers_alterados'])
+    with col3:
+        st.metric("Novos", resumo['novos'])
+    with col4:
+        st.metric("Removidos", resumo['removidos'])
+    
+    with st.expander(f"🚚 Alunos que mudaram de escola ({resumo['movidos']})"):
+        st.dataframe(diff['movidos'], use_container_width=True)
+    
+    with st.expander(f"🏷️ Alunos que mudaram de tier ({resumo['tiers_alterados']})"):
+        st.dataframe(diff['tiers'], use_container_width=True)
+    
+    with st.expander("🎯 Coesão por grupo (antes x depois)", expanded=True):
+        st.dataframe(diff['coesao'], use_container_width=True)
+    
+    if resumo['novos'] or resumo['removidos']:
+        with st.expander("👥 Alunos presentes em apenas uma execução"):
+            st.markdown("**Novos**")
+            st.dataframe(diff['novos'], use_container_width=True)
+            st.markdown("**Removidos**")
+            st.dataframe(diff['removidos'], use_container_width=True)
+
+
 # ============================================================================
 # INTERFACE - PÁGINA SEM DADOS
 # ============================================================================
@@ -803,11 +930,12 @@ def main():
     df_alunos = st.session_state.df_alunos
     df_escolas = st.session_state.df_escolas
     
-    tab1, tab2, tab3, tab4 = st.tabs([
+    tab1, tab2, tab3, tab4, tab5 = st.tabs([
         "📊 Visão Geral",
         "⚙️ Configuração",
         "🎯 Executar Alocação",
-        "📋 Resultados"
+        "📋 Resultados",
+        "🕓 Histórico"
     ])
     
     with tab1:
@@ -821,6 +949,9 @@ def main():
     
     with tab4:
         renderizar_resultados()
+    
+    with tab5:
+        renderizar_historico(df_alunos, df_escolas)
 
 
 if __name__ == "__main__":
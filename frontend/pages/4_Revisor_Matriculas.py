@@ -38,11 +38,20 @@ sys.path.insert(0, str(BACKEND_PATH))
 try:
     from revisor_matriculas import (
         ExcelReader,
+        IndiceBusca,
         FORM_MATRICULA_SECTIONS,
         FORM_INICIAL_SECTIONS,
         FORM_MEDICO_SECTIONS,
         UNIFIED_SECTIONS,
-        get_field_label
+        PROXIMOS_ESTUDANTES,
+        calcular_completude,
+        campos_anexo,
+        exportar_completude,
+        extrair_links,
+        get_field_label,
+        links_anexos,
+        obter_prefetcher,
+        valor_campo
     )
 except ImportError as e:
     st.error(f"""
@@ -401,22 +410,13 @@ def format_value(value):
     return str(value)
 
 
-def normalize_text(text):
-    """Normaliza texto para busca (remove acentos)"""
-    if not text:
-        return ""
-    text = str(text).lower()
-    replacements = {
-        'á': 'a', 'à': 'a', 'ã': 'a', 'â': 'a', 'ä': 'a',
-        'é': 'e', 'è': 'e', 'ê': 'e', 'ë': 'e',
-        'í': 'i', 'ì': 'i', 'î': 'i', 'ï': 'i',
-        'ó': 'o', 'ò': 'o', 'õ': 'o', 'ô': 'o', 'ö': 'o',
-        'ú': 'u', 'ù': 'u', 'û': 'u', 'ü': 'u',
-        'ç': 'c', 'ñ': 'n'
-    }
-    for old, new in replacements.items():
-        text = text.replace(old, new)
-    return text
+def render_thumbnails(value):
+    """Miniaturas dos anexos já baixados pelo prefetcher (não espera downloads)"""
+    prefetcher = obter_prefetcher()
+    for link in extrair_links(value):
+        miniatura = prefetcher.miniatura(link)
+        if miniatura:
+            st.image(miniatura, width=160)
 
 
 def render_field_compact(label, value, source=""):
@@ -451,6 +451,7 @@ def render_field_compact(label, value, source=""):
                 f'</div>',
                 unsafe_allow_html=True
             )
+            render_thumbnails(formatted_value)
         else:
             st.markdown(
                 f'<div style="background-color: #f8f9fa; padding: 8px; '
@@ -490,6 +491,7 @@ def render_field(label, value, key):
                     f'</div>',
                     unsafe_allow_html=True
                 )
+                render_thumbnails(formatted_value)
             with col2:
                 st.session_state.button_counter += 1
                 if st.button("📋", key=f"copy_{st.session_state.button_counter}", 
@@ -546,23 +548,35 @@ def render_field(label, value, key):
                     st.code(formatted_value, language=None)
 
 
-def render_section(section_title, fields, data, form_type):
-    """Renderiza uma seção do formulário"""
+def render_section(section_title, fields, linhas, form_type):
+    """Renderiza uma seção do formulário (fields compilados pelo plano de resolução)"""
     st.markdown(f"### {section_title}")
     st.markdown("---")
     
-    for field in fields:
-        value = data.get(field, "")
-        key = f"{form_type}_{field}_{section_title}_{st.session_state.button_counter}"
+    for campo in fields:
+        value = valor_campo(linhas, campo)
+        key = f"{form_type}_{campo.campo}_{section_title}_{st.session_state.button_counter}"
         
-        label = get_field_label(field)
+        label = get_field_label(campo.campo)
         render_field(label, value, key)
     
     st.markdown("<br>", unsafe_allow_html=True)
 
 
-def create_hierarchical_view(student_data):
-    """Cria visualização hierárquica com grupos e subseções"""
+def valor_cabecalho(linhas, campos):
+    """Valor do 1º formulário do estudante que tem a coluna (campos em ordem de prioridade)"""
+    for campo in campos:
+        if linhas.get(campo.form) is not None and campo.coluna is not None:
+            return valor_campo(linhas, campo)
+    return 'N/A'
+
+
+def create_hierarchical_view(linhas, grupos):
+    """
+    Cria visualização hierárquica com grupos e subseções
+    
+    grupos: HIERARCHICAL_GROUPS compilado por reader.plano.compilar_grupos
+    """
     
     # Botões globais
     col1, col2, col_space = st.columns([1, 1, 3])
@@ -580,17 +594,15 @@ def create_hierarchical_view(student_data):
     st.markdown("---")
     
     # Renderizar cada grupo
-    for grupo_nome, subsecoes in HIERARCHICAL_GROUPS.items():
+    for grupo_nome, subsecoes in grupos.items():
         # Contar campos preenchidos no grupo
         total_fields = 0
         filled_fields = 0
         
         for subsecao_nome, campos in subsecoes.items():
-            for field_name, source in campos:
+            for campo in campos:
                 total_fields += 1
-                source_key = {'Matrícula': 'matricula', 'Inicial': 'inicial', 'Médico': 'medico'}.get(source, '')
-                value = student_data.get(source_key, {}).get(field_name, "")
-                if format_value(value):
+                if format_value(valor_campo(linhas, campo)):
                     filled_fields += 1
         
         # Calcular porcentagem
@@ -643,11 +655,9 @@ def create_hierarchical_view(student_data):
         
         for subsecao_nome, campos in subsecoes.items():
             with st.expander(f"📌 {subsecao_nome}", expanded=is_expanded):
-                for field_name, source in campos:
-                    source_key = {'Matrícula': 'matricula', 'Inicial': 'inicial', 'Médico': 'medico'}.get(source, '')
-                    value = student_data.get(source_key, {}).get(field_name, "")
-                    label = get_field_label(field_name)
-                    render_field_compact(label, value, source)
+                for campo in campos:
+                    label = get_field_label(campo.campo)
+                    render_field_compact(label, valor_campo(linhas, campo), campo.fonte)
         
         st.markdown("<br>", unsafe_allow_html=True)
 
@@ -712,16 +722,40 @@ if uploaded_file:
     
     try:
         with st.spinner("Carregando dados da planilha..."):
-            # Verificar sheets disponíveis
-            xls = pd.ExcelFile(tmp_path)
-            available_sheets = xls.sheet_names
+            # A planilha é aberta uma única vez; as sheets disponíveis vêm do próprio reader
+            reader = ExcelReader(tmp_path, grupos_extras=HIERARCHICAL_GROUPS)
+            carregou = reader.load_data()
+            available_sheets = reader.sheet_names
             st.info(f"📊 Sheets encontradas: {', '.join(available_sheets)}")
             
-            reader = ExcelReader(tmp_path)
-            if reader.load_data():
-                st.success(f"✅ Planilha carregada! {len(reader.get_students())} estudantes encontrados.")
+            if carregou:
+                st.success(
+                    f"✅ Planilha carregada! {len(reader.get_students())} estudantes encontrados "
+                    f"({reader.tempo_carga:.1f}s{', do cache' if reader.do_cache else ''})."
+                )
                 st.session_state['reader'] = reader
+                st.session_state.pop('completude', None)
                 st.session_state['students'] = reader.get_students()
+                st.session_state['indice_busca'] = IndiceBusca(st.session_state['students'])
+                # Campos resolvidos para colunas uma única vez por planilha
+                st.session_state['plano_hierarquico'] = reader.plano.compilar_grupos(HIERARCHICAL_GROUPS)
+                st.session_state['plano_formularios'] = {
+                    'matricula': reader.plano.compilar_secoes(FORM_MATRICULA_SECTIONS, 'matricula'),
+                    'inicial': reader.plano.compilar_secoes(FORM_INICIAL_SECTIONS, 'inicial'),
+                    'medico': reader.plano.compilar_secoes(FORM_MEDICO_SECTIONS, 'medico'),
+                }
+                # Métricas do topo: Matrícula, depois Inicial (e Médico, para o status)
+                st.session_state['plano_cabecalho'] = {
+                    rotulo: [reader.plano.resolver(coluna, fonte) for fonte in fontes]
+                    for rotulo, coluna, fontes in [
+                        ("Grupo", 'GRUPO', ['Matrícula', 'Inicial']),
+                        ("Programa", 'PROGRAMA', ['Matrícula', 'Inicial']),
+                        ("Status", 'STATUS', ['Matrícula', 'Inicial', 'Médico']),
+                    ]
+                }
+                st.session_state['campos_anexo'] = campos_anexo(
+                    st.session_state['plano_hierarquico'], st.session_state['plano_formularios']
+                )
             else:
                 st.error("❌ Erro ao carregar planilha. Verifique se as sheets estão corretas.")
                 st.info(f"**Sheets esperadas:** Form_Inicial, Form_Matrícula, Form_Médico")
@@ -730,6 +764,50 @@ if uploaded_file:
         st.error(f"❌ Erro ao processar planilha: {str(e)}")
         st.exception(e)
 
+# ============================================================================
+# RELATÓRIO DE COMPLETUDE
+# ============================================================================
+
+if 'reader' in st.session_state and st.session_state.get('students'):
+    with st.expander("📊 Relatório de Completude (todos os estudantes)", expanded=False):
+        st.caption(
+            "Campos obrigatórios e anexos faltando em cada formulário enviado. "
+            "Perguntas condicionais (\"SE ...\", \"CASO ...\") não contam como obrigatórias."
+        )
+        if st.button("🔄 Gerar relatório", key="gerar_completude"):
+            with st.spinner("Calculando completude..."):
+                st.session_state['completude'] = calcular_completude(st.session_state['reader'])
+        
+        relatorio = st.session_state.get('completude')
+        if relatorio:
+            resumo = relatorio['resumo']
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Estudantes", len(resumo))
+            col2.metric("100% completos", int((resumo['Completude (%)'] >= 100).sum()))
+            col3.metric("Com formulário faltando", int((resumo['Formulários Faltando'] != '').sum()))
+            col4.metric("Com anexo faltando", int((resumo['Anexos Faltando'] > 0).sum()))
+            
+            st.dataframe(resumo, use_container_width=True, hide_index=True, height=350)
+            
+            with st.expander("Preenchimento por campo"):
+                st.dataframe(
+                    relatorio['campos'].sort_values('Taxa (%)'),
+                    use_container_width=True, hide_index=True,
+                )
+            if relatorio['sem_coluna']:
+                st.warning(
+                    f"⚠️ {len(relatorio['sem_coluna'])} campos mapeados não existem na planilha: "
+                    + "; ".join(relatorio['sem_coluna'][:10])
+                    + (" ..." if len(relatorio['sem_coluna']) > 10 else "")
+                )
+            
+            st.download_button(
+                "📥 Baixar relatório (Excel)",
+                data=exportar_completude(relatorio),
+                file_name="completude_matriculas.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            )
+
 # ============================================================================
 # SELEÇÃO DE ALUNO E VISUALIZAÇÃO
 # ============================================================================
@@ -752,12 +830,12 @@ if 'students' in st.session_state and st.session_state['students']:
             st.session_state['search_input'] = ""
             st.rerun()
     
-    # Filtrar estudantes
+    # Filtrar estudantes: trechos do nome/email primeiro, depois aproximados (erros de digitação)
+    if 'indice_busca' not in st.session_state:
+        st.session_state['indice_busca'] = IndiceBusca(st.session_state['students'])
     filtered_students = [
-        s for s in st.session_state['students']
-        if not search_term or 
-        normalize_text(search_term) in normalize_text(s['nome']) or
-        normalize_text(search_term) in normalize_text(s.get('email', ''))
+        st.session_state['students'][i]
+        for i in st.session_state['indice_busca'].buscar(search_term)
     ]
     
     st.caption(f"📊 {len(filtered_students)} de {len(st.session_state['students'])} estudantes")
@@ -781,27 +859,58 @@ if 'students' in st.session_state and st.session_state['students']:
             
             st.markdown("---")
             
-            reader = st.session_state['reader']
-            student_data = reader.get_student_data(nome, email)
-            
-            # Informações principais
-            col1, col2, col3 = st.columns(3)
+            formularios = selected_student.get('formularios')
+            if formularios:
+                st.caption(" · ".join(
+                    f"{'✅' if enviado else '❌'} {rotulo}"
+                    for rotulo, enviado in zip(
+                        ["Matrícula", "Inicial", "Médico"],
+                        [formularios['matricula'], formularios['inicial'], formularios['medico']],
+                    )
+                ))
             
-            with col1:
-                grupo = student_data['matricula'].get('GRUPO', 
-                       student_data['inicial'].get('GRUPO', 'N/A'))
-                st.metric("Grupo", grupo)
+            reader = st.session_state['reader']
+            student_id = selected_student.get('id')
+            if student_id:
+                # Registros do mesmo estudante com outra grafia de nome/email nas outras sheets
+                linhas = reader.get_student_rows_by_id(student_id)
+                variantes = reader.get_student_variants(student_id)
+                if len(variantes) > 1:
+                    st.caption("🔗 Registros reconciliados: " + " · ".join(
+                        f"{n} ({e})" if e else n for n, e in variantes
+                    ))
+                # Mesmo estudante (mesmo CPF ou mesmo nome/email) em mais de uma linha da sheet
+                n_envios = max(reader.get_student_submissions(student_id).values())
+                if n_envios > 1:
+                    envio = st.selectbox(
+                        "📑 Formulário enviado mais de uma vez:",
+                        range(n_envios),
+                        format_func=lambda k: f"{k + 1}º envio",
+                        key=f"envio_{student_id}",
+                    )
+                    linhas = reader.get_student_rows_by_id(student_id, envio)
+            else:
+                linhas = reader.get_student_rows(nome, email)
+            plano_formularios = st.session_state['plano_formularios']
             
-            with col2:
-                programa = student_data['matricula'].get('PROGRAMA', 
-                          student_data['inicial'].get('PROGRAMA', 'N/A'))
-                st.metric("Programa", programa)
+            # Anexos do aluno e dos próximos da lista baixados em segundo plano
+            campos_anexo_planilha = st.session_state.get('campos_anexo', [])
+            if campos_anexo_planilha:
+                links = links_anexos(linhas, campos_anexo_planilha)
+                for proximo in filtered_students[selected_index + 1:selected_index + 1 + PROXIMOS_ESTUDANTES]:
+                    linhas_proximo = (
+                        reader.get_student_rows_by_id(proximo['id']) if proximo.get('id')
+                        else reader.get_student_rows(proximo['nome'], proximo.get('email', ''))
+                    )
+                    links.extend(links_anexos(linhas_proximo, campos_anexo_planilha))
+                obter_prefetcher().prefetch(links)
             
-            with col3:
-                status = student_data['matricula'].get('STATUS', 
-                        student_data['inicial'].get('STATUS',
-                        student_data['medico'].get('STATUS', 'N/A')))
-                st.metric("Status", status)
+            # Informações principais
+            for coluna_metrica, (rotulo, campos) in zip(
+                st.columns(3), st.session_state['plano_cabecalho'].items()
+            ):
+                with coluna_metrica:
+                    st.metric(rotulo, valor_cabecalho(linhas, campos))
             
             st.markdown("---")
             
@@ -815,32 +924,32 @@ if 'students' in st.session_state and st.session_state['students']:
             
             with tab1:
                 st.info("💡 Use os botões 📂 Abrir / 📁 Fechar para controlar os grupos")
-                create_hierarchical_view(student_data)
+                create_hierarchical_view(linhas, st.session_state['plano_hierarquico'])
             
             with tab2:
                 st.header("📝 Formulário de Matrícula")
-                if student_data['matricula']:
-                    for section_title, fields in FORM_MATRICULA_SECTIONS.items():
+                if linhas['matricula'] is not None:
+                    for section_title, fields in plano_formularios['matricula'].items():
                         with st.expander(section_title, expanded=False):
-                            render_section(section_title, fields, student_data['matricula'], 'matricula')
+                            render_section(section_title, fields, linhas, 'matricula')
                 else:
                     st.warning("⚠️ Nenhum dado encontrado")
             
             with tab3:
                 st.header("📄 Formulário Inicial")
-                if student_data['inicial']:
-                    for section_title, fields in FORM_INICIAL_SECTIONS.items():
+                if linhas['inicial'] is not None:
+                    for section_title, fields in plano_formularios['inicial'].items():
                         with st.expander(section_title, expanded=False):
-                            render_section(section_title, fields, student_data['inicial'], 'inicial')
+                            render_section(section_title, fields, linhas, 'inicial')
                 else:
                     st.warning("⚠️ Nenhum dado encontrado")
             
             with tab4:
                 st.header("🏥 Formulário Médico")
-                if student_data['medico']:
-                    for section_title, fields in FORM_MEDICO_SECTIONS.items():
+                if linhas['medico'] is not None:
+                    for section_title, fields in plano_formularios['medico'].items():
                         with st.expander(section_title, expanded=False):
-                            render_section(section_title, fields, student_data['medico'], 'medico')
+                            render_section(section_title, fields, linhas, 'medico')
                 else:
                     st.warning("⚠️ Nenhum dado encontrado")
     else:
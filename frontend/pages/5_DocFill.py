@@ -6,9 +6,10 @@ Preenchimento automático de PDFs com dados de planilha.
 Fluxo em 3 etapas:
   1. Upload do PDF template + planilha de dados
   2. Mapeamento visual: clique em uma coluna e depois clique no PDF para posicioná-la
-  3. Geração em lote: um PDF preenchido por linha → download .zip
+  3. Geração em lote: um PDF preenchido por linha → download .zip (ou PDF único)
 """
 
+import os
 import sys
 from pathlib import Path
 
@@ -28,12 +29,21 @@ sys.path.insert(0, str(BACKEND_PATH))
 try:
     from docfill.filler import (
         CANVAS_WIDTH,
-        extrair_planilha,
-        gerar_zip,
+        gerar_pdf_unico,
         get_total_pages,
+        iterar_planilha,
         preencher_pdf,
         renderizar_pagina_com_campos,
     )
+    from docfill.armazem import ArmazemPDFs
+    from docfill.jobs import (
+        STATUS_EM_ANDAMENTO,
+        JobDocFill,
+        calcular_job_id,
+        limpar_jobs,
+        listar_jobs,
+        remover_job,
+    )
     BACKEND_DISPONIVEL = True
 except ImportError as _err:
     BACKEND_DISPONIVEL = False
@@ -70,7 +80,9 @@ _DEFAULTS = {
     "df_pdf_name":    "",      # nome do arquivo PDF
     "df_n_pages":     0,       # total de páginas do PDF
     "df_headers":     [],      # lista de colunas da planilha
-    "df_rows":        [],      # lista de listas com os dados
+    "df_sheet_bytes": None,    # bytes da planilha (as linhas são lidas sob demanda)
+    "df_rows":        [],      # primeiras linhas da planilha (prévia)
+    "df_n_rows":      0,       # total de linhas de dados
     "df_sheet_name":  "",      # nome do arquivo de planilha
     "df_campos":      [],      # campos mapeados
     "df_page_idx":    0,       # página sendo visualizada (0-based)
@@ -81,6 +93,11 @@ _DEFAULTS = {
     "df_field_height": 30,      # altura do campo em pixels canvas (limita linhas de texto)
     "df_nome_prefixo": "",      # prefixo do nome do arquivo gerado (ex: "Carta")
     "df_nome_col_idx": -1,      # índice da coluna usada no nome (-1 = usar 1ª coluna)
+    "df_workers":      1,       # processos usados na geração (1 = serial)
+    "df_compactar":    True,    # ZIP com compressão (False = ZIP_STORED, mais rápido)
+    "df_reaproveitar": True,    # reaproveitar PDFs de gerações anteriores (armazém)
+    "df_formato":      "zip",   # "zip" (um PDF por linha) ou "unico" (PDF único)
+    "df_saida_path":   None,    # arquivo gerado na última execução (em data/temp)
 }
 
 for _k, _v in _DEFAULTS.items():
@@ -195,6 +212,58 @@ if st.session_state.df_step == 1:
 
     st.header("📁 Etapa 1: Upload de Arquivos")
 
+    # ── GERAÇÕES INTERROMPIDAS ───────────────────────────────────────────────
+    _interrompidos = [j for j in listar_jobs() if j["status"] == STATUS_EM_ANDAMENTO]
+    if _interrompidos:
+        with st.expander(f"⏯️ Gerações interrompidas ({len(_interrompidos)})", expanded=False):
+            st.caption(
+                "Template, planilha e mapeamento ficam salvos: "
+                "retomar gera apenas os PDFs que faltam."
+            )
+            for _j in _interrompidos:
+                _jc1, _jc2, _jc3 = st.columns([4, 1, 1])
+                with _jc1:
+                    st.markdown(
+                        f"**{_j['pdf_nome'] or 'Template'}** + {_j['planilha_nome']} — "
+                        f"{_j['concluidos_n']}/{_j['total']} PDF(s) · "
+                        f"atualizado em {_j['atualizado_em'].replace('T', ' ')}"
+                    )
+                with _jc2:
+                    _retomar = st.button("Retomar", key=f"retomar_{_j['id']}", use_container_width=True)
+                with _jc3:
+                    if st.button("Remover", key=f"remover_{_j['id']}", use_container_width=True):
+                        remover_job(_j["id"])
+                        st.rerun()
+
+                if _retomar:
+                    _prog = st.progress(_j["concluidos_n"] / max(_j["total"], 1))
+                    try:
+                        _job = JobDocFill.abrir(_j["id"])
+                        _ok, _erros = _job.executar(
+                            progress_callback=lambda idx, total, nome: _prog.progress((idx + 1) / total),
+                            workers=int(st.session_state.df_workers),
+                            reaproveitar=st.session_state.df_reaproveitar,
+                        )
+                        if st.session_state.df_saida_path:
+                            Path(st.session_state.df_saida_path).unlink(missing_ok=True)
+                        _zip_path = _job.montar_zip(compactar=st.session_state.df_compactar)
+                        st.session_state.df_saida_path = str(_zip_path)
+                        _prog.progress(1.0)
+                        if _erros:
+                            st.warning(f"⚠️ {_ok} documento(s) gerado(s), {_erros} erro(s).")
+                        else:
+                            st.success(f"✅ {_ok} documento(s) gerado(s) com sucesso!")
+                        with open(_zip_path, "rb") as _zip_file:
+                            st.download_button(
+                                label="📥 Baixar todos os PDFs (.zip)",
+                                data=_zip_file,
+                                file_name="documentos_preenchidos.zip",
+                                mime="application/zip",
+                                key=f"download_{_j['id']}",
+                            )
+                    except Exception as _job_err:
+                        st.error(f"❌ Erro ao retomar a geração: {_job_err}")
+
     col_pdf, col_sheet = st.columns(2)
 
     with col_pdf:
@@ -239,15 +308,22 @@ if st.session_state.df_step == 1:
 
         if uploaded_sheet is not None:
             try:
-                headers, rows = extrair_planilha(
-                    uploaded_sheet.read(), uploaded_sheet.name
-                )
-                st.session_state.df_headers    = headers
-                st.session_state.df_rows       = rows
-                st.session_state.df_sheet_name = uploaded_sheet.name
+                sheet_bytes = uploaded_sheet.read()
+                headers, linhas = iterar_planilha(sheet_bytes, uploaded_sheet.name)
+                # Uma passada só: guarda a prévia e conta o restante sem manter em memória
+                rows, n_rows = [], 0
+                for linha in linhas:
+                    if n_rows < 8:
+                        rows.append(linha)
+                    n_rows += 1
+                st.session_state.df_headers     = headers
+                st.session_state.df_sheet_bytes = sheet_bytes
+                st.session_state.df_rows        = rows
+                st.session_state.df_n_rows      = n_rows
+                st.session_state.df_sheet_name  = uploaded_sheet.name
                 st.success(
                     f"✅ **{uploaded_sheet.name}** carregado  "
-                    f"({len(rows)} registro{'s' if len(rows) != 1 else ''}, "
+                    f"({n_rows} registro{'s' if n_rows != 1 else ''}, "
                     f"{len(headers)} coluna{'s' if len(headers) != 1 else ''})"
                 )
             except Exception as e:
@@ -256,7 +332,7 @@ if st.session_state.df_step == 1:
         elif st.session_state.df_headers:
             st.info(
                 f"📊 Usando arquivo anterior: **{st.session_state.df_sheet_name}** "
-                f"({len(st.session_state.df_rows)} registros)"
+                f"({st.session_state.df_n_rows} registros)"
             )
 
     # Prévia da planilha
@@ -268,7 +344,7 @@ if st.session_state.df_step == 1:
             columns=st.session_state.df_headers,
         )
         st.dataframe(df_preview, use_container_width=True, hide_index=True)
-        _extra = len(st.session_state.df_rows) - 8
+        _extra = st.session_state.df_n_rows - 8
         if _extra > 0:
             st.caption(f"… e mais {_extra} registro(s) não exibidos")
 
@@ -488,7 +564,7 @@ elif st.session_state.df_step == 3:
 
     st.header("⚡ Etapa 3: Geração dos Documentos")
 
-    _n_rows   = len(st.session_state.df_rows)
+    _n_rows   = st.session_state.df_n_rows
     _n_campos = len(st.session_state.df_campos)
 
     _r1, _r2, _r3 = st.columns(3)
@@ -576,8 +652,100 @@ elif st.session_state.df_step == 3:
 
     st.markdown("---")
 
+    # ── FORMATO DE SAÍDA ──────────────────────────────────────────────────────
+    _formatos = {
+        "zip":   "📦 ZIP — um PDF por linha",
+        "unico": "📄 PDF único — todas as linhas em sequência (para impressão)",
+    }
+    st.session_state.df_formato = st.radio(
+        "Formato de saída",
+        options=list(_formatos),
+        format_func=_formatos.get,
+        index=list(_formatos).index(st.session_state.df_formato),
+        horizontal=True,
+        help=(
+            "O PDF único compartilha fontes e imagens do template entre todas as "
+            "páginas e costuma ficar muito menor que o ZIP."
+        ),
+    )
+
+    if st.session_state.df_formato == "zip":
+        _cpus = os.cpu_count() or 1
+        st.session_state.df_workers = st.number_input(
+            "Processos em paralelo",
+            min_value=1,
+            max_value=_cpus,
+            value=min(st.session_state.df_workers, _cpus),
+            step=1,
+            help=(
+                "Quantos processos preenchem PDFs ao mesmo tempo. "
+                "Use mais de 1 para lotes grandes; a ordem dos arquivos no ZIP não muda."
+            ),
+        )
+
+        st.session_state.df_compactar = st.checkbox(
+            "Compactar o ZIP",
+            value=st.session_state.df_compactar,
+            help="Desmarque para gerar mais rápido; o arquivo ZIP fica maior.",
+        )
+
+        st.session_state.df_reaproveitar = st.checkbox(
+            "Reaproveitar PDFs de gerações anteriores",
+            value=st.session_state.df_reaproveitar,
+            help=(
+                "Linhas com os mesmos valores (nas colunas mapeadas) e o mesmo "
+                "template de uma geração anterior não são preenchidas de novo. "
+                "Útil ao corrigir poucas linhas de uma planilha grande."
+            ),
+        )
+
+        with st.expander("🗄️ PDFs guardados para reaproveitamento", expanded=False):
+            _armazem = ArmazemPDFs()
+            _est = _armazem.estatisticas()
+            st.caption(
+                f"{_est['arquivos']} PDF(s), {_est['bytes'] / 1024 / 1024:.1f} MB em disco. "
+                "Limpar também remove as gerações (concluídas ou interrompidas) "
+                "paradas há mais tempo que isso."
+            )
+            _lc1, _lc2 = st.columns([1, 1])
+            with _lc1:
+                _dias = st.number_input(
+                    "Remover os não usados há mais de (dias)",
+                    min_value=0, value=30, step=1,
+                )
+            with _lc2:
+                st.write("")
+                if st.button("🧹 Limpar", use_container_width=True):
+                    _removidos = _armazem.limpar(max_idade_dias=_dias)
+                    _jobs_removidos = limpar_jobs(max_idade_dias=_dias)
+                    st.success(
+                        f"{_removidos} PDF(s) e {_jobs_removidos} geração(ões) removido(s)."
+                    )
+
+        _job_id = calcular_job_id(
+            st.session_state.df_pdf_bytes,
+            st.session_state.df_campos,
+            st.session_state.df_sheet_bytes,
+            _nome_pattern,
+        )
+        try:
+            _job_existente = JobDocFill.abrir(_job_id)
+        except FileNotFoundError:
+            _job_existente = None
+        if _job_existente and not _job_existente.finalizado and _job_existente.concluidos:
+            st.info(
+                f"⏯️ Há uma geração interrompida com estes mesmos arquivos: "
+                f"{_job_existente.concluidos} de {_job_existente.total} PDF(s) já prontos "
+                "serão reaproveitados."
+            )
+
     if st.button("🚀 Gerar todos os PDFs", type="primary", use_container_width=True):
 
+        # O arquivo da geração anterior não é mais oferecido para download
+        if st.session_state.df_saida_path:
+            Path(st.session_state.df_saida_path).unlink(missing_ok=True)
+            st.session_state.df_saida_path = None
+
         _progress = st.progress(0)
         _status   = st.empty()
 
@@ -586,14 +754,42 @@ elif st.session_state.df_step == 3:
             _status.text(f"Gerando: {nome} ({idx + 1}/{total})…")
 
         try:
-            _zip_bytes, _ok, _erros = gerar_zip(
-                pdf_bytes         = st.session_state.df_pdf_bytes,
-                campos            = st.session_state.df_campos,
-                rows              = st.session_state.df_rows,
-                headers           = st.session_state.df_headers,
-                progress_callback = _cb,
-                nome_pattern      = _nome_pattern,
-            )
+            if st.session_state.df_formato == "unico":
+                _saida_path, _ok, _erros = gerar_pdf_unico(
+                    pdf_bytes         = st.session_state.df_pdf_bytes,
+                    campos            = st.session_state.df_campos,
+                    rows              = iterar_planilha(
+                        st.session_state.df_sheet_bytes, st.session_state.df_sheet_name
+                    )[1],
+                    headers           = st.session_state.df_headers,
+                    progress_callback = _cb,
+                    nome_pattern      = _nome_pattern,
+                    total             = st.session_state.df_n_rows,
+                )
+                _download = ("📥 Baixar PDF único", "documentos_preenchidos.pdf", "application/pdf")
+            else:
+                # ZIP: gerado como trabalho retomável (PDFs e progresso ficam em disco)
+                _job = JobDocFill.criar(
+                    pdf_bytes    = st.session_state.df_pdf_bytes,
+                    campos       = st.session_state.df_campos,
+                    sheet_bytes  = st.session_state.df_sheet_bytes,
+                    sheet_name   = st.session_state.df_sheet_name,
+                    nome_pattern = _nome_pattern,
+                    pdf_name     = st.session_state.df_pdf_name,
+                )
+                _ok, _erros = _job.executar(
+                    progress_callback = _cb,
+                    workers           = int(st.session_state.df_workers),
+                    reaproveitar      = st.session_state.df_reaproveitar,
+                )
+                _saida_path = _job.montar_zip(compactar=st.session_state.df_compactar)
+                if _job.manifesto["reaproveitados"]:
+                    st.info(
+                        f"♻️ {_job.manifesto['reaproveitados']} PDF(s) reaproveitado(s) "
+                        "de gerações anteriores."
+                    )
+                _download = ("📥 Baixar todos os PDFs (.zip)", "documentos_preenchidos.zip", "application/zip")
+            st.session_state.df_saida_path = str(_saida_path)
 
             _progress.progress(1.0)
             _status.text("✅ Geração concluída!")
@@ -607,14 +803,16 @@ elif st.session_state.df_step == 3:
                 st.success(f"✅ {_ok} documento(s) gerado(s) com sucesso!")
 
             st.markdown("### 💾 Download")
-            st.download_button(
-                label="📥 Baixar todos os PDFs (.zip)",
-                data=_zip_bytes,
-                file_name="documentos_preenchidos.zip",
-                mime="application/zip",
-                type="primary",
-                use_container_width=True,
-            )
+            _label, _file_name, _mime = _download
+            with open(_saida_path, "rb") as _saida_file:
+                st.download_button(
+                    label=_label,
+                    data=_saida_file,
+                    file_name=_file_name,
+                    mime=_mime,
+                    type="primary",
+                    use_container_width=True,
+                )
 
             with st.expander("📊 Estatísticas", expanded=False):
                 st.markdown(f"""
@@ -622,6 +820,8 @@ elif st.session_state.df_step == 3:
                 |---|---|
                 | Documentos gerados | {_ok} |
                 | Erros | {_erros} |
+                | Formato | {_formatos[st.session_state.df_formato]} |
+                | Tamanho do arquivo | {_saida_path.stat().st_size / 1024 / 1024:.1f} MB |
                 | Campos por documento | {_n_campos} |
                 | Template | {st.session_state.df_pdf_name} |
                 | Planilha | {st.session_state.df_sheet_name} |
@@ -640,6 +840,8 @@ elif st.session_state.df_step == 3:
 
     with _n2:
         if st.button("↩️ Novo Documento (recomeçar)", use_container_width=True):
+            if st.session_state.df_saida_path:
+                Path(st.session_state.df_saida_path).unlink(missing_ok=True)
             for _k in list(st.session_state.keys()):
                 if _k.startswith("df_"):
                     del st.session_state[_k]
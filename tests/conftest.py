@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""Os testes importam os módulos como as páginas Streamlit: com a pasta backend no path."""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""Testes de revisor_matriculas.anexos contra um servidor HTTP local"""
+
+import http.server
+import threading
+import time
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from revisor_matriculas.anexos import (
+    ArmazenamentoHTTP,
+    ArmazenamentoLocal,
+    CacheAnexos,
+    PrefetcherAnexos,
+    extrair_links,
+)
+
+
+def _png(tamanho=(1200, 800)) -> bytes:
+    saida = BytesIO()
+    Image.new('RGB', tamanho, 'red').save(saida, format='PNG')
+    return saida.getvalue()
+
+
+@pytest.fixture
+def servidor(tmp_path):
+    """Servidor HTTP em thread: {caminho: bytes} e redirecionamentos para file:// e ftp://"""
+    segredo = tmp_path / 'segredo.txt'
+    segredo.write_bytes(b'nao pode sair')
+    arquivos = {'/foto.png': _png(), '/doc.txt': b'x' * 5000}
+
+    class Manipulador(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            destinos = {'/redireciona': segredo.as_uri(), '/redireciona-ftp': 'ftp://127.0.0.1/x'}
+            if self.path in destinos:
+                self.send_response(302)
+                self.send_header('Location', destinos[self.path])
+                self.end_headers()
+                return
+            dados = arquivos.get(self.path)
+            if dados is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(dados)))
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Manipulador)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{httpd.server_port}', arquivos, segredo
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _esperar(prefetcher):
+    limite = time.monotonic() + 10
+    while prefetcher.pendentes() and time.monotonic() < limite:
+        time.sleep(0.01)
+
+
+def test_prefetch_baixa_anexos_e_gera_miniaturas(servidor, tmp_path):
+    base, arquivos, _ = servidor
+    cache = CacheAnexos(tmp_path / 'cache')
+    prefetcher = PrefetcherAnexos(ArmazenamentoHTTP(), cache)
+    links = [f'{base}/foto.png', f'{base}/doc.txt', f'{base}/faltando.png']
+
+    assert prefetcher.prefetch(links + links) == 3
+    _esperar(prefetcher)
+
+    assert cache.obter(links[0]) == arquivos['/foto.png']
+    assert max(Image.open(BytesIO(prefetcher.miniatura(links[0]))).size) == 240
+    assert cache.obter(links[1]) == arquivos['/doc.txt']
+    assert prefetcher.miniatura(links[1]) is None
+    assert list(prefetcher.falhas) == [links[2]]
+    prefetcher.encerrar()
+
+
+def test_http_recusa_file_e_redirecionamento_para_file(servidor, tmp_path):
+    base, _, segredo = servidor
+    armazenamento = ArmazenamentoHTTP()
+
+    with pytest.raises(ValueError):
+        armazenamento.obter(segredo.as_uri())
+    with pytest.raises(OSError):
+        armazenamento.obter(f'{base}/redireciona')
+    # ftp:// o urllib seguiria por padrão
+    with pytest.raises(OSError, match='não permitido'):
+        armazenamento.obter(f'{base}/redireciona-ftp')
+
+    prefetcher = PrefetcherAnexos(armazenamento, CacheAnexos(tmp_path / 'cache'))
+    assert prefetcher.obter(segredo.as_uri()) is None
+    assert segredo.as_uri() in prefetcher.falhas
+    prefetcher.encerrar()
+
+
+def test_local_le_file_apenas_dentro_da_pasta(tmp_path):
+    pasta = tmp_path / 'anexos'
+    pasta.mkdir()
+    (pasta / 'rg.pdf').write_bytes(b'%PDF-')
+    (tmp_path / 'fora.txt').write_bytes(b'fora')
+    armazenamento = ArmazenamentoLocal(pasta)
+
+    assert armazenamento.obter((pasta / 'rg.pdf').as_uri()) == b'%PDF-'
+    assert armazenamento.obter('https://drive.google.com/open?id=rg') == b'%PDF-'
+    with pytest.raises(FileNotFoundError):
+        armazenamento.obter((tmp_path / 'fora.txt').as_uri())
+    with pytest.raises(FileNotFoundError):
+        armazenamento.obter((pasta / '..' / 'fora.txt').as_uri())
+
+
+def test_falhas_expiram_e_podem_ser_limpas(servidor, tmp_path):
+    base, arquivos, _ = servidor
+    link = f'{base}/tardio.png'
+    prefetcher = PrefetcherAnexos(ArmazenamentoHTTP(), CacheAnexos(tmp_path / 'cache'), ttl_falha=3600)
+
+    assert prefetcher.obter(link) is None
+    arquivos['/tardio.png'] = _png((10, 10))
+    assert prefetcher.prefetch([link]) == 0
+
+    assert prefetcher.limpar_falhas() == 1
+    assert prefetcher.obter(link) == arquivos['/tardio.png']
+
+    prefetcher.ttl_falha = 0
+    assert prefetcher.obter(f'{base}/outro.png') is None
+    assert prefetcher.prefetch([f'{base}/outro.png']) == 1
+    prefetcher.encerrar()
+
+
+def test_extrair_links():
+    assert extrair_links('https://a/b, https://c/d\nfile:///x') == ['https://a/b', 'https://c/d', 'file:///x']
+    assert extrair_links(None) == []
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""Testes de revisor_matriculas.reconciliacao"""
+
+import pandas as pd
+
+from revisor_matriculas.reconciliacao import COLUNA_CPF, reconciliar_identidades
+
+
+def _sheet(linhas):
+    """Sheet com NOME COMPLETO, EMAIL e CPF a partir de tuplas (nome, email, cpf)"""
+    return pd.DataFrame(linhas, columns=['NOME COMPLETO', 'EMAIL', COLUNA_CPF])
+
+
+def test_cpfs_conflitantes_nao_se_juntam_por_um_registro_sem_cpf():
+    resultado = reconciliar_identidades([
+        ('matricula', _sheet([('Ana Souza', 'ana@exemplo.com', '111.111.111-11')])),
+        ('inicial', _sheet([('Ana Souza', '', None)])),
+        ('medico', _sheet([('Ana Souza', 'ana.souza@exemplo.com', '222.222.222-22')])),
+    ])
+
+    com_x = resultado.id_por_par[('Ana Souza', 'ana@exemplo.com')]
+    sem_cpf = resultado.id_por_par[('Ana Souza', '')]
+    com_y = resultado.id_por_par[('Ana Souza', 'ana.souza@exemplo.com')]
+    assert com_x == sem_cpf
+    assert com_x != com_y
+    assert len(resultado.representante) == 2
+
+
+def test_homonimos_na_mesma_sheet_ficam_separados():
+    resultado = reconciliar_identidades([
+        ('matricula', _sheet([
+            ('João Silva', 'joao.silva@exemplo.com', None),
+            ('João Silva', 'joao.silva2@exemplo.com', None),
+        ])),
+    ])
+
+    primeiro = resultado.id_por_par[('João Silva', 'joao.silva@exemplo.com')]
+    segundo = resultado.id_por_par[('João Silva', 'joao.silva2@exemplo.com')]
+    assert primeiro != segundo
+    assert resultado.posicoes[primeiro] == {'matricula': [0]}
+    assert resultado.posicoes[segundo] == {'matricula': [1]}
+
+
+def test_mesma_sheet_com_mesmo_cpf_mantem_todas_as_linhas():
+    resultado = reconciliar_identidades([
+        ('matricula', _sheet([
+            ('João Silva', 'joao.silva@exemplo.com', '123.456.789-09'),
+            ('Maria Lima', 'maria@exemplo.com', None),
+            ('Joao Silva', 'joao.silva2@exemplo.com', '12345678909'),
+        ])),
+        ('inicial', _sheet([('João Silva', 'joao.silva@exemplo.com', None)])),
+    ])
+
+    id_joao = resultado.id_por_par[('João Silva', 'joao.silva@exemplo.com')]
+    assert resultado.id_por_par[('Joao Silva', 'joao.silva2@exemplo.com')] == id_joao
+    assert resultado.posicoes[id_joao] == {'matricula': [0, 2], 'inicial': [0]}